@@ -0,0 +1,204 @@
+"""
+Micro-benchmarks for the hot paths in library.memory.
+
+Builds a synthetic database for each size (that many triggers and that many facts), plus a corpus of chat
+messages, then times each mem function and the whole per-message pipeline. Every size runs in its own process
+and temporary directory, so nothing is shared between runs and the real memory.sqlite3 is never touched.
+
+Usage (from the repository root):
+    python benchmarks/bench_memory.py --sizes 100 10000 1000000 --output bench.json
+
+The results are printed as a table and, if --output is given, saved as JSON.
+"""
+import subprocess
+import argparse
+import tempfile
+import random
+import json
+import time
+import sys
+import os
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SYLLABLES = [
+    'ka', 'lo', 'mi', 'ne', 'ru', 'sa', 'to', 'vi', 'ba', 'de', 'fi', 'go', 'ha', 'ju', 'pe', 'qu',
+    'tr', 'ain', 'sp', 'ace', 'str', 'on', 'ex', 'ion', 'ing', 'er', 'al', 'ous', 'ty', 'ph',
+]
+CHAT_WORDS = (
+    "the a to and i you it is that of in for this on my me with be have just not so but what do are was lol "
+    "yeah no like can get if your at we all its im dont know out up they one about there now how when good "
+    "think go would time today really got see people was going want make back some well then him her going "
+    "haha thanks game play tonight anyone ok sure right maybe need new work home love nice cool wait why"
+).split()
+
+def make_word(rng, min_syllables=1, max_syllables=4):
+    return ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(min_syllables, max_syllables)))
+
+def build_database(size, rng):
+    """
+    Fills the database in the current directory with 'size' triggers and 'size' facts.
+    :return: The triggers, categories and facts that were added
+    """
+    from library.memory import mem, get_conn
+    mem.modernize()
+
+    category_count = max(4, size // 100)
+    categories = list({make_word(rng, 2, 3) for _ in range(category_count * 2)})[:category_count]
+
+    triggers = set(categories)
+    while len(triggers) < size:
+        word = make_word(rng)
+        # Some multi-word triggers too
+        if rng.random() < 0.1:
+            word += ' ' + make_word(rng)
+        triggers.add(word)
+    triggers = list(triggers)
+
+    facts = [
+        (rng.choice(categories), str(rng.randint(10 ** 17, 10 ** 18)), f"Fact {i}: " + ' '.join(
+            make_word(rng) for _ in range(rng.randint(6, 20))
+        ))
+        for i in range(size)
+    ]
+
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.executemany('''
+            INSERT OR IGNORE INTO triggers (trigger, added_by, category)
+            VALUES (?, '0', ?);
+        ''', ((trigger, categories[i % len(categories)]) for i, trigger in enumerate(triggers)))
+        cur.executemany('''
+            INSERT OR IGNORE INTO category_facts (category, added_by, fact)
+            VALUES (?, ?, ?);
+        ''', facts)
+    return triggers, categories, [fact for _, _, fact in facts]
+
+def build_messages(rng, triggers, count=2000):
+    """
+    Makes chat messages out of common words. About one in twenty has a trigger in it, sometimes misspelt.
+    """
+    messages = []
+    for _ in range(count):
+        words = [rng.choice(CHAT_WORDS) for _ in range(rng.randint(2, 15))]
+        if rng.random() < 0.05:
+            trigger = rng.choice(triggers)
+            if rng.random() < 0.3 and len(trigger) > 4:
+                i = rng.randrange(len(trigger) - 1)
+                trigger = trigger[:i] + trigger[i + 1] + trigger[i] + trigger[i + 2:]
+            words.insert(rng.randrange(len(words) + 1), trigger)
+        messages.append(' '.join(words))
+    return messages
+
+def measure(func, args_list, min_time=1.0, max_calls=100_000):
+    """
+    Calls func with each args in args_list (looping over them) until min_time has passed.
+    :return: ops/sec and latency percentiles in microseconds
+    """
+    latencies = []
+    started = time.perf_counter()
+    i = 0
+    while (time.perf_counter() - started < min_time or not latencies) and len(latencies) < max_calls:
+        args = args_list[i % len(args_list)]
+        call_started = time.perf_counter_ns()
+        func(*args)
+        latencies.append(time.perf_counter_ns() - call_started)
+        i += 1
+
+    total = sum(latencies) / 1e9
+    latencies.sort()
+    return {
+        'calls': len(latencies),
+        'ops_per_sec': len(latencies) / total if total else 0.0,
+        'p50_us': latencies[len(latencies) // 2] / 1000,
+        'p99_us': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] / 1000,
+    }
+
+def run_size(size, seed, min_time):
+    rng = random.Random(seed)
+    sys.path.insert(0, REPO_ROOT)
+    from library.memory import mem
+
+    started = time.perf_counter()
+    triggers, categories, facts = build_database(size, rng)
+    build_time = time.perf_counter() - started
+
+    messages = build_messages(rng, triggers)
+    words = [(word,) for message in messages for word in message.split()]
+
+    # The first calls load the indexes and caches, that's timed on its own
+    started = time.perf_counter()
+    mem.load_indexes()
+    index_load_time = time.perf_counter() - started
+
+    def pipeline(message):
+        match = mem.match_message(message)
+        if match['result']:
+            mem.get_random_fact(match['category'])
+
+    results = {
+        'size': size,
+        'build_seconds': build_time,
+        'index_load_seconds': index_load_time,
+        'functions': {
+            'is_trigger': measure(mem.is_trigger, words, min_time),
+            'find_most_similar': measure(mem.find_most_similar, words, min_time),
+            'get_fact': measure(mem.get_fact, [(category,) for category in categories], min_time),
+            # What the message listener calls, the fact and its author in one go, with a shuffle bag per channel
+            'get_random_fact': measure(
+                mem.get_random_fact, [(category, channel_id) for category in categories for channel_id in (1, 2)],
+                min_time
+            ),
+            'list_all_facts': measure(mem.list_all_facts, [()], min_time, max_calls=20),
+            'match_message': measure(mem.match_message, [(message,) for message in messages], min_time),
+            'pipeline': measure(pipeline, [(message,) for message in messages], min_time),
+        },
+    }
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the library.memory hot paths.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 10_000, 1_000_000],
+                        help="How many triggers and facts to generate, one run per size.")
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--min-time', type=float, default=1.0, help="Seconds to spend timing each function.")
+    parser.add_argument('--output', help="Where to save the results as JSON.")
+    parser.add_argument('--worker', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        print(json.dumps(run_size(args.worker, args.seed, args.min_time)))
+        return
+
+    runs = []
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            process = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--worker', str(size),
+                 '--seed', str(args.seed), '--min-time', str(args.min_time)],
+                cwd=directory, capture_output=True, text=True,
+            )
+        if process.returncode != 0:
+            print(process.stderr, file=sys.stderr)
+            sys.exit(f"The benchmark for size {size} failed.")
+        run = json.loads(process.stdout)
+        runs.append(run)
+
+        print(f"\n{size} triggers/facts (built in {run['build_seconds']:.2f}s, "
+              f"indexes loaded in {run['index_load_seconds']:.3f}s)")
+        print(f"{'function':<20}{'ops/sec':>14}{'p50 us':>12}{'p99 us':>12}")
+        for name, result in run['functions'].items():
+            print(f"{name:<20}{result['ops_per_sec']:>14.1f}{result['p50_us']:>12.1f}{result['p99_us']:>12.1f}")
+
+    report = {
+        'python': sys.version.split()[0],
+        'platform': sys.platform,
+        'seed': args.seed,
+        'runs': runs,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -1,123 +1,172 @@
+from library import startup
+from library.snapshot import shared_snapshot
+from library.importer import import_categories, import_steps, finish_import, new_report
+from library.default_categories import category_fact_dict
+from library.async_memory import amem, run_read, run_write_steps
 from library.memory import mem, get_conn
+from library import config, logs
+import multiprocessing
+import asyncio
 import lightbulb
-import datetime
-import sqlite3
 import logging
 import hikari
 import dotenv
 import os
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    filename=f'logs/{datetime.datetime.now().strftime("%Y-%m-%d")}.log',
-)
+Intents = hikari.Intents.MESSAGE_CONTENT + hikari.Intents.GUILD_MESSAGES
 
-if not os.path.exists('secrets.env'):
-    print("Welcome to bot setup. Please enter your bot token below.")
-    token = input("Token: ")
-    with open('secrets.env', 'w') as f:
-        f.write(f'TOKEN={token}')
-    print("Token has been saved to secrets.env. The bot will now start.")
+SNAPSHOT_PATH = 'memory.snapshot'
 
-if os.path.exists('secrets.env'):
-    dotenv.load_dotenv('secrets.env')
+def setup_token():
+    if not os.path.exists('secrets.env'):
+        print("Welcome to bot setup. Please enter your bot token below.")
+        token = input("Token: ")
+        with open('secrets.env', 'w') as f:
+            f.write(f'TOKEN={token}')
+        print("Token has been saved to secrets.env. The bot will now start.")
 
-Intents = hikari.Intents.MESSAGE_CONTENT + hikari.Intents.GUILD_MESSAGES
+    if os.path.exists('secrets.env'):
+        dotenv.load_dotenv('secrets.env')
+
+def setup_database():
+    # The only part of the database setup that has to happen before connecting, everything else needs the new schema
+    with startup.phase('modernize'):
+        mem.modernize()
+
+def print_seed_report(report):
+    print(f"Database has been updated with {report['inserted']} new facts.")
+    print(f"{report['skipped']} facts already existed in the database and were not added.")
+    if report['near_duplicates']:
+        print(f"{report['near_duplicates']} facts were near duplicates of existing facts and were not added.")
+    if report['removed']:
+        print(f"{report['removed']} facts were removed from category files and were taken out of the database.")
+    print(f"{report['unchanged_files']} category files were unchanged since the last start and were skipped.")
+
+def seed_database() -> dict:
+    """
+    Adds the default categories, plus any from text files in the 'categories' directory, to the database.
+    Used by the main process of sharded mode, the bot seeds in warm_up instead.
+    :return: The report from import_categories
+    """
+    with startup.phase('seed'):
+        report = import_categories(category_fact_dict, 'categories')
+    print_seed_report(report)
+    return report
 
-bot = lightbulb.BotApp(
-    token=os.environ.get("TOKEN"),
-    intents=Intents,
-)
-
-bot.d['colourless'] = hikari.Colour(0x2b2d31)  # Dark theme color of discord used in the embeds
-
-mem.modernize()
-
-# ALl the categories and facts that the bot starts off with.
-category_fact_dict = {
-    'train': [
-        'The first public railway to use steam locomotives was the Stockton and Darlington Railway in 1825.',
-        'Japan\'s Shinkansen, also known as the bullet train, can reach speeds of up to 320 km/h (200 mph).',
-        'The longest railway in the world is the Trans-Siberian Railway, which spans over 9,289 kilometers (5,772 miles).',
-        'The world\'s first underground railway, the London Underground, opened in 1863.',
-        'The fastest train in the world is the Shanghai Maglev, which can reach speeds of up to 431 km/h (267 mph).',
-        'The first electric train was built in 1879 by Siemens & Halske in Berlin, Germany.',
-        'The Glacier Express in Switzerland is known as the slowest express train in the world, taking around 8 hours to travel 291 kilometers (181 miles).'
-    ],
-    'space': [
-        'A day on Venus is longer than a year on Venus.',
-        'There are more stars in the universe than grains of sand on all the Earth\'s beaches.',
-        'The largest volcano in the solar system is Olympus Mons on Mars, which is about 13.6 miles (22 kilometers) high.',
-        'Neutron stars are so dense that a sugar-cube-sized amount of material from one would weigh about a billion tons on Earth.',
-        'The Milky Way galaxy is on a collision course with the Andromeda galaxy, and they are expected to merge in about 4.5 billion years.',
-        'The footprints left by astronauts on the Moon are likely to remain there for millions of years because there is no wind or water to erode them.',
-        'Jupiter has the shortest day of all the planets in the solar system, with a rotation period of just under 10 hours.'
-    ],
-    'literature': [
-        'The longest novel ever written is "In Search of Lost Time" by Marcel Proust, which contains an estimated 1.2 million words.',
-        'William Shakespeare is credited with inventing over 1,700 words in the English language.',
-        'The first book ever written using a typewriter was "The Adventures of Tom Sawyer" by Mark Twain.',
-        'The world\'s most expensive book ever sold is Leonardo da Vinci\'s "Codex Leicester," which was purchased by Bill Gates for $30.8 million in 1994.',
-        'The shortest war in history was between Britain and Zanzibar on August 27, 1896, lasting between 38 and 45 minutes.',
-        'The first novel ever written is considered to be "The Tale of Genji," written by Murasaki Shikibu in the early 11th century.',
-        'The Library of Congress in Washington, D.C., is the largest library in the world, with over 170 million items in its collections.'
-    ],
-    'science': [
-        'Water can boil and freeze at the same time, a phenomenon known as the "triple point".',
-        'Bananas are naturally radioactive due to their high potassium content.',
-        'The speed of light in a vacuum is approximately 299,792 kilometers per second (186,282 miles per second).',
-        'The human body contains about 37.2 trillion cells.',
-        'The DNA in a single human cell, if stretched out, would be about 2 meters (6.5 feet) long.',
-        'The Earth\'s core is as hot as the surface of the Sun, with temperatures reaching up to 5,500 degrees Celsius (9,932 degrees Fahrenheit).',
-        'A single bolt of lightning contains enough energy to toast 100,000 slices of bread.'
-    ]
-}
-
-# Load the categories from text files in the 'categories' directory
-if os.path.exists('categories'):
-    for category in os.listdir('categories'):
-        # If the file type is not .txt, skip it
-        if not category.endswith('.txt'):
-            continue
-        with open(f'categories/{category}', 'r') as f:
-            category = category.replace('.txt', '')
-            category_fact_dict[category] = [line.strip() for line in f.readlines()]
-
-# Add triggers to the database for each category
-for category in category_fact_dict.keys():
+async def warm_up(seed: bool) -> None:
+    """
+    Seeds the database and loads the global trigger indexes, once the bot is connected. Until it's done, messages
+    are only matched against exact one-word triggers (see mem.match_exact).
+    :param seed: False in the worker processes of sharded mode, where the main process seeds the database
+    """
     try:
-        with get_conn() as conn:
-            cur = conn.cursor()
-            cur.execute('''
-                INSERT INTO triggers (trigger, added_by, category)
-                VALUES (?, '1090899298650169385', ?);
-            ''', (category, category))
-    except sqlite3.IntegrityError:
-        continue
-
-# Add default facts to the database
-already_existing_facts_count = 0
-for categories, facts in category_fact_dict.items():
+        if seed:
+            # A batch at a time, so commands that write don't have to wait for the whole import
+            with startup.phase('seed'):
+                report = new_report()
+                await run_write_steps(import_steps(category_fact_dict, 'categories', report))
+                finish_import(report)
+            print_seed_report(report)
+        with startup.phase('warm_indexes'):
+            await amem.load_indexes()
+        with startup.phase('warm_autocomplete'):
+            await run_read(mem.load_autocomplete)
+    except Exception as err:
+        logging.error(err, exc_info=True)
+    finally:
+        # Even if something went wrong here, the full matching loads whatever it's missing by itself
+        startup.warm.set()
+        startup.mark('ready')
+        logging.info(f"Startup report: {startup.report()}")
+
+def create_bot(worker=0, seed=True) -> lightbulb.BotApp:
+    bot = lightbulb.BotApp(
+        token=os.environ.get("TOKEN"),
+        intents=Intents,
+    )
+
+    bot.d['colourless'] = hikari.Colour(0x2b2d31)  # Dark theme color of discord used in the embeds
+    bot.d['worker'] = worker  # Which process this is in sharded mode, 0 otherwise
+
+    # How many servers' trigger indexes are kept in memory at once, the ones that were quiet the longest get dropped
+    mem.limit_guilds(config.get_int('GUILD_CACHE_SIZE', 256))
+    # How many words' fuzzy match results are remembered
+    mem.limit_match_cache(config.get_int('MATCH_CACHE_SIZE', 50_000))
+
+    with startup.phase('load_extensions'):
+        bot.load_extensions_from("extensions")
+        bot.load_extensions_from("extensions/facts")
+        bot.load_extensions_from("extensions/list")
+        bot.load_extensions_from("extensions/trigger")
+
+    @bot.listen(hikari.StartedEvent)
+    async def start_warm_up(_: hikari.StartedEvent) -> None:
+        startup.mark('gateway')
+        # Kept on the bot so the task can't be garbage collected while it's running
+        bot.d['warm_up'] = asyncio.create_task(warm_up(seed))
+
+    return bot
+
+def run_worker(worker: int, shard_ids: list, shard_count: int, generation, publishing) -> None:
+    """
+    Runs one process of the sharded mode. It only connects the shards it was given, and reads the triggers and
+    facts from the shared snapshot instead of loading its own copy.
+    """
+    logs.setup(f'worker-{worker}')
+    mem.use_snapshot(shared_snapshot(SNAPSHOT_PATH, generation, publishing))
+
+    bot = create_bot(worker, seed=False)
+    logging.info(f"Worker {worker} is running shards {shard_ids} of {shard_count}")
+    bot.run(shard_ids=shard_ids, shard_count=shard_count)
+
+def run_sharded(processes: int, shard_count: int) -> None:
+    """
+    Splits the gateway shards between several processes, so message matching can use more than one CPU core.
+    Discord always sends a server's messages to the same shard, so each server is handled by only one process.
+    """
+    context = multiprocessing.get_context('spawn')
+    # Bumped by whichever process changes the database, so the others know to open the new snapshot.
+    generation = context.Value('Q', 0)
+    # Held by whichever process is writing a new snapshot, so they take turns
+    publishing = context.Lock()
+    snapshot = shared_snapshot(SNAPSHOT_PATH, generation, publishing)
+    snapshot.cleanup()
+    snapshot.publish(get_conn(readonly=True))
+
+    workers = []
+    for worker in range(processes):
+        shard_ids = list(range(worker, shard_count, processes))
+        process = context.Process(
+            target=run_worker, args=(worker, shard_ids, shard_count, generation, publishing),
+            name=f'factry-worker-{worker}'
+        )
+        process.start()
+        workers.append(process)
+    print(f"Started {processes} processes for {shard_count} shards.")
+
     try:
-        with get_conn() as conn:
-            cur = conn.cursor()
-            for fact in facts:
-                cur.execute('''
-                    INSERT INTO category_facts (category, added_by, fact)
-                    VALUES (?, '1090899298650169385', ?);
-                ''', (categories, fact))
-    except sqlite3.IntegrityError as err:
-        already_existing_facts_count += 1
-        continue
-conn.commit()
-
-print("Database has been updated with new facts.")
-print(f"{already_existing_facts_count} facts already existed in the database and were not added.")
-
-bot.load_extensions_from("extensions")
-bot.load_extensions_from("extensions/facts")
-bot.load_extensions_from("extensions/list")
-bot.load_extensions_from("extensions/trigger")
-
-bot.run()
+        # Seeded while the workers connect, then they're all told about the new and removed facts at once
+        report = seed_database()
+        if report['inserted'] or report['removed']:
+            snapshot.publish(get_conn(readonly=True))
+
+        for process in workers:
+            process.join()
+            if process.exitcode:
+                logging.error(f"{process.name} stopped with exit code {process.exitcode}")
+    except KeyboardInterrupt:
+        for process in workers:
+            process.join()
+    finally:
+        snapshot.cleanup()
+
+if __name__ == '__main__':
+    setup_token()
+    logs.setup()
+    setup_database()
+
+    processes = config.get_int('SHARD_PROCESSES', 1)
+    if processes > 1:
+        run_sharded(processes, max(config.get_int('SHARD_COUNT', processes), processes))
+    else:
+        create_bot().run()
@@ -0,0 +1,60 @@
+from library.importer import scan_directory, import_steps, finish_import, new_report
+from library.async_memory import run_read, run_write_steps
+from library import config, startup
+import lightbulb, hikari
+import asyncio
+import logging
+
+pl_name = __name__
+plugin = lightbulb.Plugin(pl_name)
+
+CATEGORY_DIRECTORY = 'categories'
+
+async def watch_categories(directory, interval):
+    """
+    Checks the categories directory every interval seconds, and imports whatever changed in it. Checking only
+    looks at the files' sizes and modified times, so it costs next to nothing while nothing changes.
+    """
+    # Waits for the import at startup first, only one import can run at a time
+    while not startup.warm.is_set():
+        await asyncio.sleep(1)
+    seen = await run_read(scan_directory, directory)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            files = await run_read(scan_directory, directory)
+            if files == seen:
+                continue
+
+            # A batch at a time on the writer thread, so other writes can go in between
+            report = new_report()
+            await run_write_steps(import_steps({}, directory, report))
+            finish_import(report, 'Synced the categories directory')
+            seen = files
+            if report['inserted'] or report['removed']:
+                logging.info(
+                    f"Category files changed: {report['inserted']} facts added, {report['removed']} facts removed"
+                )
+        except Exception as err:
+            logging.error(err, exc_info=True)
+
+class bot_plugin(lightbulb.Plugin):
+    @staticmethod
+    @plugin.listener(hikari.StartedEvent)
+    async def start_category_watcher(_: hikari.StartedEvent) -> None:
+        # 0 turns the watcher off. In sharded mode only the first process watches, the rest get a new snapshot.
+        interval = config.get_float('CATEGORY_POLL_SECONDS', 10)
+        if interval <= 0 or plugin.bot.d.get('worker', 0) != 0:
+            return
+
+        # Kept on the bot so the task can't be garbage collected while it's running
+        plugin.bot.d['category_watcher'] = asyncio.create_task(watch_categories(CATEGORY_DIRECTORY, interval))
+
+def load(bot: lightbulb.BotApp) -> None:
+    bot.add_plugin(plugin)
+
+def unload(bot: lightbulb.BotApp) -> None:
+    task = bot.d.pop('category_watcher', None)
+    if task is not None:
+        task.cancel()
+    bot.remove_plugin(plugin)
@@ -1,5 +1,7 @@
 from extensions.facts.group import cmd_group, plugin
-from library.memory import mem
+from library.near_duplicates import NearDuplicateFact
+from library.async_memory import amem
+from library.paginator import shorten
 import lightbulb, hikari
 import sqlite3
 
@@ -7,6 +9,13 @@ class bot_plugin(lightbulb.Plugin):
     @staticmethod
     @cmd_group.child
     @lightbulb.app_command_permissions(dm_enabled=False)
+    @lightbulb.option(
+        name='allow_similar',
+        description='Add the fact even if a very similar fact already exists.',
+        required=False,
+        default=False,
+        type=hikari.OptionType.BOOLEAN
+    )
     @lightbulb.option(
         name='fact',
         description='A fact that you want to add to the category.',
@@ -17,7 +26,8 @@ class bot_plugin(lightbulb.Plugin):
         name='category',
         description='The category of the fact.',
         required=True,
-        type=hikari.OptionType.STRING
+        type=hikari.OptionType.STRING,
+        autocomplete=True
     )
     @lightbulb.command(name="add", description="Add a fact to a category.")
     @lightbulb.implements(lightbulb.SlashSubCommand)
@@ -25,9 +35,27 @@ class bot_plugin(lightbulb.Plugin):
         fact = ctx.options.fact
         category = ctx.options.category
 
-        category_did_exist = mem.does_category_exists(category)
+        # The write can be queued behind a long one (like the import at startup), so Discord is told to wait for the
+        # answer instead of failing the command after 3 seconds
+        await ctx.respond(hikari.ResponseType.DEFERRED_MESSAGE_CREATE, flags=hikari.MessageFlag.EPHEMERAL)
+
+        category_did_exist = await amem.does_category_exists(category, guild_id=ctx.guild_id)
         try:
-            mem.add_fact(category, ctx.author.id, fact)
+            await amem.add_fact(
+                category, ctx.author.id, fact, ctx.options.allow_similar, guild_id=ctx.guild_id
+            )
+        except NearDuplicateFact as err:
+            embed = (
+                hikari.Embed(
+                    title="Uh oh!",
+                    description=f"A very similar fact already exists (#{err.fact_id}):\n{shorten(err.fact, 1000)}",
+                    color=plugin.bot.d['colourless'],
+                )
+                .set_footer(text="If it really is a different fact, use the allow_similar option to add it anyway.")
+            )
+
+            await ctx.respond(embed, flags=hikari.MessageFlag.EPHEMERAL)
+            return
         except sqlite3.IntegrityError:
             embed = (
                 hikari.Embed(
@@ -54,7 +82,7 @@ class bot_plugin(lightbulb.Plugin):
                       "This means the category has facts, but no triggers associated with it.\n"
                       "You can add a trigger to the category using the /add_trigger command.",
             )
-        elif category_did_exist and mem.len_triggers(category) == 0:
+        elif category_did_exist and await amem.len_triggers(category, guild_id=ctx.guild_id) == 0:
             embed.add_field(
                 name="No triggers",
                 value=f"The category already existed, but it did not have any triggers associated with it.\n"
@@ -63,5 +91,11 @@ class bot_plugin(lightbulb.Plugin):
 
         await ctx.respond(embed, flags=hikari.MessageFlag.EPHEMERAL)
 
+@bot_plugin.add_fact_cmd.autocomplete("category")
+async def category_autocomplete(opt: hikari.AutocompleteInteractionOption, inter: hikari.AutocompleteInteraction) -> list:
+    # Discord only allows choices of up to 100 characters
+    categories = await amem.autocomplete_categories(opt.value or '', guild_id=inter.guild_id)
+    return [category for category in categories if len(category) <= 100]
+
 def load(bot: lightbulb.BotApp) -> None:
     bot.add_plugin(lightbulb.Plugin(__name__))
\ No newline at end of file
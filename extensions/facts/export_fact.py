@@ -0,0 +1,49 @@
+from extensions.facts.group import cmd_group, can_manage_guild, respond_missing_permission
+from library.fact_files import format_rows
+from library.async_memory import amem
+import lightbulb, hikari
+
+PAGE_SIZE = 1000
+
+async def export_facts(guild_id, file_format):
+    """
+    Streams the guild's facts into the file a page at a time, so the whole table is never loaded at once.
+    """
+    after_id = None
+    while True:
+        rows = await amem.export_facts_page(after_id=after_id, limit=PAGE_SIZE, guild_id=guild_id)
+        if not rows:
+            if after_id is None and file_format == 'csv':
+                yield format_rows([], file_format, header=True)
+            return
+        yield format_rows(rows, file_format, header=after_id is None)
+        after_id = rows[-1][0]
+
+class bot_plugin(lightbulb.Plugin):
+    @staticmethod
+    @cmd_group.child
+    @lightbulb.app_command_permissions(dm_enabled=False)
+    @lightbulb.option(
+        name='format',
+        description='The kind of file to export to.',
+        required=False,
+        default='jsonl',
+        choices=['jsonl', 'csv'],
+        type=hikari.OptionType.STRING
+    )
+    @lightbulb.command(name="export", description="Get every fact added in this server as a file.")
+    @lightbulb.implements(lightbulb.SlashSubCommand)
+    async def export_fact_cmd(ctx: lightbulb.SlashContext) -> None:
+        if not can_manage_guild(ctx):
+            await respond_missing_permission(ctx)
+            return
+
+        file_format = ctx.options.format
+        await ctx.respond(
+            "Here are all the facts added in this server! They can be added somewhere else with /fact import.",
+            attachment=hikari.Bytes(export_facts(ctx.guild_id, file_format), f"fun_facts.{file_format}"),
+            flags=hikari.MessageFlag.EPHEMERAL,
+        )
+
+def load(bot: lightbulb.BotApp) -> None:
+    bot.add_plugin(lightbulb.Plugin(__name__))
@@ -1,4 +1,4 @@
-import lightbulb
+import lightbulb, hikari
 plugin_name = "fact"
 plugin = lightbulb.Plugin(plugin_name)
 
@@ -9,6 +9,23 @@ plugin = lightbulb.Plugin(plugin_name)
 async def cmd_group(_) -> None:
     pass
 
+def can_manage_guild(ctx: lightbulb.SlashContext) -> bool:
+    # Discord only lets the whole /fact group have default permissions, not its subcommands, so the commands
+    # that need more than the rest check the member's permissions themselves.
+    if ctx.member is None:
+        return False
+    return bool(ctx.member.permissions & (hikari.Permissions.MANAGE_GUILD | hikari.Permissions.ADMINISTRATOR))
+
+async def respond_missing_permission(ctx: lightbulb.SlashContext) -> None:
+    embed = (
+        hikari.Embed(
+            title="Uh oh!",
+            description="You need the Manage Server permission to use this command.",
+            color=plugin.bot.d['colourless'],
+        )
+    )
+    await ctx.respond(embed, flags=hikari.MessageFlag.EPHEMERAL)
+
 def load(bot: lightbulb.BotApp) -> None:
     bot.add_plugin(plugin)
 def unload(bot: lightbulb.BotApp) -> None:
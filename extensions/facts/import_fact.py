@@ -0,0 +1,104 @@
+from extensions.facts.group import cmd_group, can_manage_guild, respond_missing_permission, plugin
+from library.fact_files import file_format, read_records
+from library.async_memory import amem
+import lightbulb, hikari
+import logging
+import time
+
+# Facts are written this many at a time, each batch in its own transaction
+BATCH_SIZE = 500
+# How often the progress message is edited at most, in seconds
+PROGRESS_INTERVAL = 2
+
+def progress_embed(counts, done=False) -> hikari.Embed:
+    lines = [
+        f"Added: {counts['inserted']}",
+        f"Already existed: {counts['exists']}",
+        f"Too similar to another fact: {counts['near_duplicates']}",
+    ]
+    if counts['invalid']:
+        lines.append(f"Rows that couldn't be read: {counts['invalid']}")
+
+    return hikari.Embed(
+        title="Facts imported" if done else "Importing facts...",
+        description="\n".join(lines),
+        color=plugin.bot.d['colourless'],
+    )
+
+class bot_plugin(lightbulb.Plugin):
+    @staticmethod
+    @cmd_group.child
+    @lightbulb.app_command_permissions(dm_enabled=False)
+    @lightbulb.option(
+        name='allow_similar',
+        description='Add facts even if a very similar fact already exists.',
+        required=False,
+        default=False,
+        type=hikari.OptionType.BOOLEAN
+    )
+    @lightbulb.option(
+        name='file',
+        description='A .jsonl or .csv file with a category and a fact on each row.',
+        required=True,
+        type=hikari.OptionType.ATTACHMENT
+    )
+    @lightbulb.command(name="import", description="Add lots of facts at once from a file.")
+    @lightbulb.implements(lightbulb.SlashSubCommand)
+    async def import_fact_cmd(ctx: lightbulb.SlashContext) -> None:
+        if not can_manage_guild(ctx):
+            await respond_missing_permission(ctx)
+            return
+
+        attachment = ctx.options.file
+        kind = file_format(attachment.filename)
+        if kind is None:
+            embed = (
+                hikari.Embed(
+                    title="Invalid format.",
+                    description="The file has to be a .jsonl or .csv file!",
+                    color=plugin.bot.d['colourless'],
+                )
+            )
+            await ctx.respond(embed, flags=hikari.MessageFlag.EPHEMERAL)
+            return
+
+        counts = {'inserted': 0, 'exists': 0, 'near_duplicates': 0, 'invalid': 0}
+        await ctx.respond(progress_embed(counts), flags=hikari.MessageFlag.EPHEMERAL)
+
+        async def write(batch):
+            result = await amem.add_facts(batch, ctx.author.id, ctx.options.allow_similar, guild_id=ctx.guild_id)
+            for key, value in result.items():
+                counts[key] += value
+
+        # The file is read as it downloads and written a batch at a time, so it's never all in memory
+        batch = []
+        last_update = time.monotonic()
+        try:
+            async with attachment.stream() as reader:
+                async for record in read_records(reader, kind):
+                    if record is None:
+                        counts['invalid'] += 1
+                        continue
+                    batch.append(record)
+                    if len(batch) < BATCH_SIZE:
+                        continue
+
+                    await write(batch)
+                    batch = []
+                    if time.monotonic() - last_update >= PROGRESS_INTERVAL:
+                        last_update = time.monotonic()
+                        await ctx.edit_last_response(progress_embed(counts))
+            if batch:
+                await write(batch)
+        except Exception as err:
+            logging.error(err, exc_info=True)
+            embed = progress_embed(counts)
+            embed.title = "Uh oh!"
+            embed.set_footer(text="Something went wrong partway through, the facts above were still added.")
+            await ctx.edit_last_response(embed)
+            return
+
+        await ctx.edit_last_response(progress_embed(counts, done=True))
+
+def load(bot: lightbulb.BotApp) -> None:
+    bot.add_plugin(lightbulb.Plugin(__name__))
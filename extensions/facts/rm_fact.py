@@ -1,7 +1,19 @@
 from extensions.facts.group import cmd_group, plugin
-from library.memory import mem
+from library.async_memory import amem
+from library.paginator import shorten
 import lightbulb, hikari
 import sqlite3
+import re
+
+def parse_fact_id(text: str):
+    """
+    Facts too long to fit in an autocomplete choice are chosen as '#<id>' instead.
+    :return: The fact id, or None if the text isn't one
+    """
+    match = re.fullmatch(r'#(\d+)', text.strip())
+    if match is None:
+        return None
+    return int(match.group(1))
 
 class bot_plugin(lightbulb.Plugin):
     @staticmethod
@@ -9,17 +21,24 @@ class bot_plugin(lightbulb.Plugin):
     @lightbulb.app_command_permissions(dm_enabled=False)
     @lightbulb.option(
         name='fact',
-        description='The fact that you want to remove from the category.',
+        description='The fact that you want to remove, or its id as #<id> (see /fact search).',
         required=True,
-        type=hikari.OptionType.STRING
+        type=hikari.OptionType.STRING,
+        autocomplete=True
     )
     @lightbulb.command(name="remove", description="Add a fact to a category.")
     @lightbulb.implements(lightbulb.SlashSubCommand)
     async def remove_fact_cmd(ctx: lightbulb.SlashContext) -> None:
         fact = ctx.options.fact
+        # Deferred for the same reason as in add_fact
+        await ctx.respond(hikari.ResponseType.DEFERRED_MESSAGE_CREATE, flags=hikari.MessageFlag.EPHEMERAL)
 
+        fact_id = parse_fact_id(fact)
         try:
-            mem.remove_fact(fact)
+            if fact_id is not None:
+                await amem.remove_fact_by_id(fact_id, guild_id=ctx.guild_id)
+            else:
+                await amem.remove_fact(fact, guild_id=ctx.guild_id)
         except sqlite3.IntegrityError:
             embed = (
                 hikari.Embed(
@@ -42,5 +61,14 @@ class bot_plugin(lightbulb.Plugin):
 
         await ctx.respond(embed, flags=hikari.MessageFlag.EPHEMERAL)
 
+@bot_plugin.remove_fact_cmd.autocomplete("fact")
+async def fact_autocomplete(opt: hikari.AutocompleteInteractionOption, inter: hikari.AutocompleteInteraction) -> list:
+    facts = await amem.autocomplete_facts(opt.value or '', guild_id=inter.guild_id)
+    # Discord only allows choices of up to 100 characters, so longer facts are picked by their id
+    return [
+        hikari.CommandChoice(name=shorten(fact, 100), value=fact if len(fact) <= 100 else f"#{fact_id}")
+        for fact_id, fact in facts
+    ]
+
 def load(bot: lightbulb.BotApp) -> None:
     bot.add_plugin(lightbulb.Plugin(__name__))
\ No newline at end of file
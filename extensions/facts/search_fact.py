@@ -0,0 +1,56 @@
+from extensions.facts.group import cmd_group, plugin
+from library.async_memory import amem
+from library.paginator import paginate, shorten
+import lightbulb, hikari
+
+PAGE_SIZE = 10
+
+class bot_plugin(lightbulb.Plugin):
+    @staticmethod
+    @cmd_group.child
+    @lightbulb.app_command_permissions(dm_enabled=False)
+    @lightbulb.option(
+        name='query',
+        description='The words to look for in the facts.',
+        required=True,
+        type=hikari.OptionType.STRING
+    )
+    @lightbulb.command(name="search", description="Search the facts in the database.")
+    @lightbulb.implements(lightbulb.SlashSubCommand)
+    async def search_fact_cmd(ctx: lightbulb.SlashContext) -> None:
+        query = ctx.options.query
+
+        def render_page(rows, page) -> hikari.Embed:
+            if not rows:
+                return hikari.Embed(
+                    title="Uh oh!",
+                    description=f"No facts were found for '{shorten(query, 100)}'!",
+                    color=plugin.bot.d['colourless'],
+                )
+
+            body = []
+            for fact_id, category, fact, _ in rows:
+                body.append(f"**{shorten(category, 50)}** (#{fact_id})\n{shorten(fact, 300)}")
+
+            return (
+                hikari.Embed(
+                    title=f"Facts matching '{shorten(query, 100)}'",
+                    description="\n\n".join(body),
+                    color=plugin.bot.d['colourless'],
+                )
+                .set_footer(text=f"Page {page + 1}. Use /fact remove #<id> to remove one of these facts.")
+            )
+
+        await paginate(
+            ctx,
+            fetch_page=lambda after, before, limit: amem.search_facts(
+                query, after, before, limit, guild_id=ctx.guild_id
+            ),
+            render_page=render_page,
+            # Results are ordered by how well they match, so pages are found by the score and id together
+            key=lambda row: (row[3], row[0]),
+            page_size=PAGE_SIZE,
+        )
+
+def load(bot: lightbulb.BotApp) -> None:
+    bot.add_plugin(lightbulb.Plugin(__name__))
@@ -1,7 +1,20 @@
 from extensions.list.group import cmd_group, plugin
-from library.memory import mem
+from library.async_memory import amem
+from library.paginator import paginate, shorten
 import lightbulb, hikari
 
+PAGE_SIZE = 25
+
+def render_page(rows, page) -> hikari.Embed:
+    return (
+        hikari.Embed(
+            title="All Categories",
+            description="\n".join(shorten(category, 100) for category, in rows) or "There are no categories.",
+            color=plugin.bot.d['colourless'],
+        )
+        .set_footer(text=f"Page {page + 1}")
+    )
+
 class bot_plugin(lightbulb.Plugin):
     @staticmethod
     @cmd_group.child
@@ -9,18 +22,15 @@ class bot_plugin(lightbulb.Plugin):
     @lightbulb.command(name="categories", description="List all the categories in the database.")
     @lightbulb.implements(lightbulb.SlashSubCommand)
     async def category_list_cmd(ctx: lightbulb.SlashContext) -> None:
-        categories = mem.get_all_categories()
-        categories = [category[0] for category in categories]
-
-        embed = (
-            hikari.Embed(
-                title="All Categories",
-                description="\n".join(categories),
-                color=plugin.bot.d['colourless'],
-            )
+        await paginate(
+            ctx,
+            fetch_page=lambda after, before, limit: amem.list_categories_page(
+                after, before, limit, guild_id=ctx.guild_id
+            ),
+            render_page=render_page,
+            key=lambda row: row[0],
+            page_size=PAGE_SIZE,
         )
 
-        await ctx.respond(embed, flags=hikari.MessageFlag.EPHEMERAL)
-
 def load(bot: lightbulb.BotApp) -> None:
-    bot.add_plugin(lightbulb.Plugin(__name__))
\ No newline at end of file
+    bot.add_plugin(lightbulb.Plugin(__name__))
@@ -1,50 +1,74 @@
 from extensions.list.group import cmd_group, plugin
-from library.memory import mem
+from library.async_memory import amem
+from library.paginator import paginate, shorten
 import lightbulb, hikari
-import os
+
+PAGE_SIZE = 10
+
+async def export_facts(guild_id):
+    """
+    Streams every fact as text, a page at a time, so the whole table is never loaded at once.
+    """
+    after_id = None
+    while True:
+        rows = await amem.list_facts_page(after_id=after_id, limit=1000, guild_id=guild_id)
+        if not rows:
+            return
+        yield ''.join(f"**{category}**\n{fact}\n\n" for _, category, fact in rows).encode('utf-8')
+        after_id = rows[-1][0]
+
+def render_page(rows, page) -> hikari.Embed:
+    if not rows:
+        return hikari.Embed(
+            title="Uh oh!",
+            description=f"No facts were found in the database!",
+            color=plugin.bot.d['colourless'],
+        )
+
+    body = []
+    for fact_id, category, fact in rows:
+        body.append(f"**{shorten(category, 50)}** (#{fact_id})\n{shorten(fact, 300)}")
+
+    return (
+        hikari.Embed(
+            title="Here's all the fun facts we have saved!",
+            description="\n\n".join(body),
+            color=plugin.bot.d['colourless'],
+        )
+        .set_footer(text=f"Page {page + 1}. Use the export option to get every fact as a file.")
+    )
 
 class bot_plugin(lightbulb.Plugin):
     @staticmethod
     @cmd_group.child
     @lightbulb.app_command_permissions(dm_enabled=False)
+    @lightbulb.option(
+        name='export',
+        description='Send every fact as a text file instead of as pages.',
+        required=False,
+        default=False,
+        type=hikari.OptionType.BOOLEAN
+    )
     @lightbulb.command(name="facts", description="List all facts in the database.")
     @lightbulb.implements(lightbulb.SlashSubCommand)
     async def fact_listing_cmd(ctx: lightbulb.SlashContext) -> None:
-        category_facts = mem.list_all_facts()
-        count = len(category_facts)
-
-        if count == 0:
-            embed = (
-                hikari.Embed(
-                    title="Uh oh!",
-                    description=f"No facts were found in the database!",
-                    color=plugin.bot.d['colourless'],
-                )
+        if ctx.options.export:
+            await ctx.respond(
+                f"Here's all the fun facts we have saved!",
+                attachment=hikari.Bytes(export_facts(ctx.guild_id), "fun_facts.txt"),
+                flags=hikari.MessageFlag.EPHEMERAL,
             )
-
-            await ctx.respond(embed, flags=hikari.MessageFlag.EPHEMERAL)
             return
-        else:
-            # Handles a dict like: {'category': ['fact1', 'fact2']}
-            fun_fact_body = ""
-            for category in category_facts:
-                for fun_fact in category_facts[category]:
-                    fun_fact_body += f"**{category}**\n{fun_fact}\n\n"
-
-            if len(fun_fact_body) <= 2000:
-                await ctx.respond(f"Here's all the fun facts we have saved!\n\n{fun_fact_body}")
-            else:
-                # Saves it in a file to send as an attachment
-                with open(f"library/fun_facts.txt", "w") as f:
-                    f.write(fun_fact_body)
-
-                await ctx.respond(
-                    f"Here's all the fun facts we have saved! (Too long to send in a message)",
-                    attachment=hikari.files.File(f"library/fun_facts.txt"),
-                )
-
-                # Deletes the file after sending
-                os.remove(f"library/fun_facts.txt")
+
+        await paginate(
+            ctx,
+            fetch_page=lambda after, before, limit: amem.list_facts_page(
+                after, before, limit, guild_id=ctx.guild_id
+            ),
+            render_page=render_page,
+            key=lambda row: row[0],
+            page_size=PAGE_SIZE,
+        )
 
 def load(bot: lightbulb.BotApp) -> None:
-    bot.add_plugin(lightbulb.Plugin(__name__))
\ No newline at end of file
+    bot.add_plugin(lightbulb.Plugin(__name__))
@@ -1,7 +1,22 @@
 from extensions.list.group import cmd_group, plugin
-from library.memory import mem
+from library.async_memory import amem
+from library.paginator import paginate, shorten
 import lightbulb, hikari
 
+PAGE_SIZE = 25
+
+def render_page(rows, page) -> hikari.Embed:
+    return (
+        hikari.Embed(
+            title="All Triggers",
+            description="\n".join(
+                f"{shorten(trigger, 100)} ({shorten(category, 50)})" for trigger, category, _ in rows
+            ) or "There are no triggers.",
+            color=plugin.bot.d['colourless'],
+        )
+        .set_footer(text=f"Page {page + 1}")
+    )
+
 class bot_plugin(lightbulb.Plugin):
     @staticmethod
     @cmd_group.child
@@ -9,18 +24,16 @@ class bot_plugin(lightbulb.Plugin):
     @lightbulb.command(name="triggers", description="List all the triggers in the database.")
     @lightbulb.implements(lightbulb.SlashSubCommand)
     async def trigger_list_cmd(ctx: lightbulb.SlashContext) -> None:
-        triggers = mem.get_all_triggers()
-        triggers = [trigger[0] for trigger in triggers]
-
-        embed = (
-            hikari.Embed(
-                title="All Triggers",
-                description="\n".join(triggers),
-                color=plugin.bot.d['colourless'],
-            )
+        await paginate(
+            ctx,
+            fetch_page=lambda after, before, limit: amem.list_triggers_page(
+                after, before, limit, guild_id=ctx.guild_id
+            ),
+            render_page=render_page,
+            # A guild's trigger can have the same name as a global one
+            key=lambda row: (row[0], row[2]),
+            page_size=PAGE_SIZE,
         )
 
-        await ctx.respond(embed, flags=hikari.MessageFlag.EPHEMERAL)
-
 def load(bot: lightbulb.BotApp) -> None:
-    bot.add_plugin(lightbulb.Plugin(__name__))
\ No newline at end of file
+    bot.add_plugin(lightbulb.Plugin(__name__))
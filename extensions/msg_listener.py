@@ -1,16 +1,18 @@
-from library.memory import mem
+from library.rate_limit import rate_limiter
+from library.reply_queue import reply_queue
+from library.async_memory import amem
+from library import metrics, startup
 import lightbulb, hikari
-import datetime
-import logging
 
 pl_name = __name__
 plugin = lightbulb.Plugin(pl_name)
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    filename=f'logs/{datetime.datetime.now().strftime("%Y-%m-%d")}.log',
-)
+# Keeps the bot from flooding busy channels (and using up its Discord rate limits) with facts.
+limiter = rate_limiter.from_config()
+# Replies are sent from here, so a slow Discord API call doesn't hold up reading more messages.
+replies = reply_queue.from_config()
+metrics.register_collector('rate_limiter', limiter.stats)
+metrics.register_collector('reply_queue', replies.stats)
 
 class bot_plugin(lightbulb.Plugin):
     @staticmethod
@@ -19,34 +21,50 @@ class bot_plugin(lightbulb.Plugin):
         if event.author.is_bot:
             return
 
-        # Make case-insensitive and remove leading/trailing whitespace
-        content = str(event.message.content.lower().strip())
-        # remove symbols from the content.
-        content = ''.join(e for e in content if e.isalnum() or e.isspace())
-
-        for word in content.split(" "):
-            closest_match = mem.find_most_similar(word)
-            is_trigger = mem.is_trigger(closest_match)
-            if is_trigger['result']:
-                fun_fact = mem.get_fact(is_trigger['category'])
-                if not "fun fact" in fun_fact.lower():
-                    body = f"Fun {is_trigger['trigger']} fact! {fun_fact}"
-                else:
-                    body = fun_fact
-
-                body += f"\n\n*This fact was contributed by <@{mem.get_fact_author(fun_fact)}>!*"
-
-                embed = (
-                    hikari.Embed(
-                        title=is_trigger['trigger'],
-                        description=body,
-                        color=plugin.bot.d['colourless'],
-                    )
-                )
-                await event.message.respond(embed=embed)
-
-                # return so as to prevent multiple responses from the bot
-                return
+        if not event.message.content:
+            return
+
+        # Checked first, so a channel that's out of replies costs nothing to ignore.
+        if not limiter.can_reply(event.guild_id, event.channel_id):
+            return
+
+        # Finds the first trigger (word or phrase) in the message. The bot only ever responds once per message.
+        with metrics.timer('listener.match'):
+            if startup.warm.is_set():
+                is_trigger = await amem.match_message(event.message.content, guild_id=event.guild_id)
+            else:
+                # Still starting up, so only the cheap exact check is done instead of loading the indexes here
+                is_trigger = await amem.match_exact(event.message.content, guild_id=event.guild_id)
+        if not is_trigger['result']:
+            return
+
+        if not limiter.take(event.guild_id, event.channel_id, is_trigger['trigger']):
+            return
+
+        # Gets the fact and who added it in one go
+        with metrics.timer('listener.fact_fetch'):
+            fact = await amem.get_random_fact(
+                is_trigger['category'], event.channel_id, guild_id=event.guild_id
+            )
+        if fact is None:
+            body = "There are no fun facts found for this category. :("
+        else:
+            fun_fact = fact['fact']
+            if not "fun fact" in fun_fact.lower():
+                body = f"Fun {is_trigger['trigger']} fact! {fun_fact}"
+            else:
+                body = fun_fact
+
+            body += f"\n\n*This fact was contributed by <@{fact['added_by']}>!*"
+
+        embed = (
+            hikari.Embed(
+                title=is_trigger['trigger'],
+                description=body,
+                color=plugin.bot.d['colourless'],
+            )
+        )
+        replies.put(event.channel_id, lambda: event.message.respond(embed=embed))
 
 def load(bot: lightbulb.BotApp) -> None:
-    bot.add_plugin(lightbulb.Plugin(__name__))
\ No newline at end of file
+    bot.add_plugin(plugin)
\ No newline at end of file
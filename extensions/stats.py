@@ -0,0 +1,99 @@
+from library.async_memory import run_read
+from library import config, metrics
+import lightbulb, hikari
+import logging
+import time
+
+pl_name = __name__
+plugin = lightbulb.Plugin(pl_name)
+
+# When each slash command currently running was started, by its context
+command_starts = {}
+
+def format_histograms(prefix, limit=10) -> str:
+    """
+    Formats the histograms whose name starts with prefix as one line each, slowest (by total time) first.
+    """
+    hists = [(name, hist) for name, hist in metrics.histograms.items() if name.startswith(prefix) and hist.count]
+    hists.sort(key=lambda item: item[1].sum, reverse=True)
+
+    lines = []
+    for name, hist in hists[:limit]:
+        summary = hist.summary()
+        lines.append(
+            f"`{name[len(prefix):]}` {summary['count']}x, "
+            f"p50 {summary['p50'] * 1000:g}ms, p99 {summary['p99'] * 1000:g}ms"
+        )
+    return '\n'.join(lines)[:1024] or "Nothing yet."
+
+def format_numbers(data: dict) -> str:
+    lines = []
+    for key, value in metrics.flatten(data):
+        if isinstance(value, float):
+            value = f'{value:.3g}'
+        lines.append(f"{key}: {value}")
+    return '\n'.join(lines)[:1024] or "Nothing yet."
+
+class bot_plugin(lightbulb.Plugin):
+    @staticmethod
+    @plugin.command
+    @lightbulb.app_command_permissions(dm_enabled=False)
+    @lightbulb.command(name="stats", description="See how fast the bot is handling messages and commands.")
+    @lightbulb.implements(lightbulb.SlashCommand)
+    async def stats_cmd(ctx: lightbulb.SlashContext) -> None:
+        embed = (
+            hikari.Embed(
+                title="Bot stats",
+                description="Times are the upper bound of the bucket each percentile falls in.",
+                color=plugin.bot.d['colourless'],
+            )
+        )
+        embed.add_field(name="Message handling", value=format_histograms('listener.'))
+        embed.add_field(name="Matching", value=format_histograms('match.'))
+        embed.add_field(name="Replies", value=format_histograms('reply.'))
+        embed.add_field(name="Commands", value=format_histograms('command.'))
+        embed.add_field(name="Database", value=format_histograms('memory.', limit=8))
+        # Some collectors take locks that reader threads can hold for a while, so they're not read on the event loop
+        for name, data in sorted((await run_read(metrics.collect)).items()):
+            embed.add_field(name=name.replace('_', ' ').capitalize(), value=format_numbers(data), inline=True)
+
+        await ctx.respond(embed, flags=hikari.MessageFlag.EPHEMERAL)
+
+    @staticmethod
+    @plugin.listener(lightbulb.CommandInvocationEvent)
+    async def command_started(event: lightbulb.CommandInvocationEvent) -> None:
+        command_starts[id(event.context)] = time.perf_counter()
+
+    @staticmethod
+    @plugin.listener(lightbulb.CommandCompletionEvent)
+    async def command_finished(event: lightbulb.CommandCompletionEvent) -> None:
+        started = command_starts.pop(id(event.context), None)
+        if started is not None:
+            metrics.observe(f'command.{event.command.qualname}', time.perf_counter() - started)
+
+    @staticmethod
+    @plugin.listener(lightbulb.CommandErrorEvent)
+    async def command_failed(event: lightbulb.CommandErrorEvent) -> None:
+        started = command_starts.pop(id(event.context), None)
+        if started is not None:
+            metrics.observe(f'command.{event.context.command.qualname}.error', time.perf_counter() - started)
+
+    @staticmethod
+    @plugin.listener(hikari.StartedEvent)
+    async def start_metrics_endpoint(_: hikari.StartedEvent) -> None:
+        # Off unless a port is set. Only listens on localhost by default, since the stats aren't meant to be public.
+        port = config.get_int('METRICS_PORT', 0)
+        if port <= 0:
+            return
+
+        # In sharded mode each process serves its own metrics, on the next port up
+        port += plugin.bot.d.get('worker', 0)
+        host = config.get_str('METRICS_HOST', '127.0.0.1')
+        plugin.bot.d['metrics_endpoint'] = await metrics.start_endpoint(host, port)
+        logging.info(f"Serving metrics on http://{host}:{port}/metrics")
+
+def load(bot: lightbulb.BotApp) -> None:
+    bot.add_plugin(plugin)
+
+def unload(bot: lightbulb.BotApp) -> None:
+    bot.remove_plugin(plugin)
@@ -1,16 +1,10 @@
 from extensions.trigger.group import cmd_group, plugin
-from library.memory import mem
+from library.async_memory import amem
+from library.paginator import shorten
 import lightbulb, hikari
-import datetime
 import sqlite3
 import logging
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    filename=f'logs/{datetime.datetime.now().strftime("%Y-%m-%d")}.log',
-)
-
 class bot_plugin(lightbulb.Plugin):
     @staticmethod
     @cmd_group.child
@@ -25,7 +19,8 @@ class bot_plugin(lightbulb.Plugin):
         name='category',
         description='The category of the trigger word.',
         required=True,
-        type=hikari.OptionType.STRING
+        type=hikari.OptionType.STRING,
+        autocomplete=True
     )
     @lightbulb.command(name="add", description="Add a trigger for a category to the bot.")
     @lightbulb.implements(lightbulb.SlashSubCommand)
@@ -44,9 +39,14 @@ class bot_plugin(lightbulb.Plugin):
             await ctx.respond(embed, flags=hikari.MessageFlag.EPHEMERAL)
             return
 
-        category_did_exist = mem.does_category_exists(category)
+        # Deferred, since the write might have to wait for an import to get through a batch
+        await ctx.respond(hikari.ResponseType.DEFERRED_MESSAGE_CREATE, flags=hikari.MessageFlag.EPHEMERAL)
+
+        category_did_exist = await amem.does_category_exists(category, guild_id=ctx.guild_id)
+        # Looked up before adding, so the new trigger doesn't find itself
+        similar_triggers = await amem.similar_triggers(trigger, guild_id=ctx.guild_id)
         try:
-            mem.add_trigger(trigger, category, ctx.author.id)
+            await amem.add_trigger(trigger, category, ctx.author.id, guild_id=ctx.guild_id)
         except sqlite3.IntegrityError as err:
             logging.error(err, exc_info=True)
             embed = (
@@ -77,10 +77,21 @@ class bot_plugin(lightbulb.Plugin):
                 description=f"The trigger '{trigger}' has been added to the '{category}' category!",
                 color=plugin.bot.d['colourless'],
             )
-            .set_footer(text=f"Note: Triggers that are too similar to each other will cause problems. Eg, You and your.")
         )
 
-        facts_count = mem.len_facts(category)
+        if similar_triggers:
+            lines = [
+                f"'{shorten(other, 50)}' in '{shorten(other_category, 30)}' ({ratio:.0%} similar)"
+                for other, other_category, ratio in similar_triggers[:10]
+            ]
+            if any(other_category != category for _, other_category, _ in similar_triggers):
+                lines.append("Some are in a different category, so messages could get a fact from the wrong one.")
+            embed.add_field(
+                name="Similar triggers",
+                value="This trigger is very similar to other triggers, which will cause problems:\n" + "\n".join(lines),
+            )
+
+        facts_count = await amem.len_facts(category, guild_id=ctx.guild_id)
         if not category_did_exist and facts_count == 0:
             embed.add_field(
                 name="New category",
@@ -97,5 +108,11 @@ class bot_plugin(lightbulb.Plugin):
 
         await ctx.respond(embed, flags=hikari.MessageFlag.EPHEMERAL)
 
+@bot_plugin.add_trigger_cmd.autocomplete("category")
+async def category_autocomplete(opt: hikari.AutocompleteInteractionOption, inter: hikari.AutocompleteInteraction) -> list:
+    # Discord only allows choices of up to 100 characters
+    categories = await amem.autocomplete_categories(opt.value or '', guild_id=inter.guild_id)
+    return [category for category in categories if len(category) <= 100]
+
 def load(bot: lightbulb.BotApp) -> None:
     bot.add_plugin(lightbulb.Plugin(__name__))
\ No newline at end of file
@@ -0,0 +1,60 @@
+from extensions.trigger.group import cmd_group, plugin
+from library.async_memory import amem
+from library.paginator import paginate, shorten
+import lightbulb, hikari
+
+PAGE_SIZE = 15
+
+def render_page(rows, page) -> hikari.Embed:
+    if not rows:
+        return hikari.Embed(
+            title="No similar triggers",
+            description="None of the triggers are too similar to each other.",
+            color=plugin.bot.d['colourless'],
+        )
+
+    lines = []
+    for _, (trigger, category, other, other_category, ratio) in rows:
+        if category != other_category:
+            lines.append(
+                f"**'{shorten(trigger, 50)}' ({shorten(category, 30)}) and '{shorten(other, 50)}' "
+                f"({shorten(other_category, 30)})** - {ratio:.0%}"
+            )
+        else:
+            lines.append(f"'{shorten(trigger, 50)}' and '{shorten(other, 50)}' ({shorten(category, 30)}) - {ratio:.0%}")
+
+    return (
+        hikari.Embed(
+            title="Similar triggers",
+            description="\n".join(lines),
+            color=plugin.bot.d['colourless'],
+        )
+        .set_footer(text=f"Page {page + 1}. Pairs in different categories are in bold and listed first.")
+    )
+
+class bot_plugin(lightbulb.Plugin):
+    @staticmethod
+    @cmd_group.child
+    @lightbulb.app_command_permissions(dm_enabled=False)
+    @lightbulb.command(name="audit", description="List every pair of triggers that are too similar to each other.")
+    @lightbulb.implements(lightbulb.SlashSubCommand)
+    async def audit_trigger_cmd(ctx: lightbulb.SlashContext) -> None:
+        # Worked out once, then paged through by position
+        collisions = list(enumerate(await amem.trigger_collisions(guild_id=ctx.guild_id)))
+
+        async def fetch_page(after, before, limit):
+            if before is not None:
+                return collisions[max(before - limit, 0):before]
+            start = after + 1 if after is not None else 0
+            return collisions[start:start + limit]
+
+        await paginate(
+            ctx,
+            fetch_page=fetch_page,
+            render_page=render_page,
+            key=lambda row: row[0],
+            page_size=PAGE_SIZE,
+        )
+
+def load(bot: lightbulb.BotApp) -> None:
+    bot.add_plugin(lightbulb.Plugin(__name__))
@@ -1,16 +1,9 @@
 from extensions.trigger.group import cmd_group, plugin
-from library.memory import mem
+from library.async_memory import amem
 import lightbulb, hikari
-import datetime
 import logging
 import sqlite3
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    filename=f'logs/{datetime.datetime.now().strftime("%Y-%m-%d")}.log',
-)
-
 class bot_plugin(lightbulb.Plugin):
     @staticmethod
     @cmd_group.child()
@@ -19,15 +12,18 @@ class bot_plugin(lightbulb.Plugin):
         name='trigger',
         description='The trigger word to delete from the list.',
         required=True,
-        type=hikari.OptionType.STRING
+        type=hikari.OptionType.STRING,
+        autocomplete=True
     )
     @lightbulb.command(name="remove", description="Get rid of a trigger.")
     @lightbulb.implements(lightbulb.SlashSubCommand)
     async def rm_trigger_cmd(ctx: lightbulb.SlashContext) -> None:
         trigger = ctx.options.trigger
+        # Deferred, the write might have to wait its turn on the writer thread
+        await ctx.respond(hikari.ResponseType.DEFERRED_MESSAGE_CREATE, flags=hikari.MessageFlag.EPHEMERAL)
 
         try:
-            mem.remove_trigger(trigger)
+            await amem.remove_trigger(trigger, guild_id=ctx.guild_id)
         except sqlite3.IntegrityError:
             embed = (
                 hikari.Embed(
@@ -62,5 +58,11 @@ class bot_plugin(lightbulb.Plugin):
 
         await ctx.respond(embed, flags=hikari.MessageFlag.EPHEMERAL)
 
+@bot_plugin.rm_trigger_cmd.autocomplete("trigger")
+async def trigger_autocomplete(opt: hikari.AutocompleteInteractionOption, inter: hikari.AutocompleteInteraction) -> list:
+    # Discord only allows choices of up to 100 characters
+    triggers = await amem.autocomplete_triggers(opt.value or '', guild_id=inter.guild_id)
+    return [trigger for trigger in triggers if len(trigger) <= 100]
+
 def load(bot: lightbulb.BotApp) -> None:
     bot.add_plugin(lightbulb.Plugin(__name__))
\ No newline at end of file
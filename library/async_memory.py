@@ -0,0 +1,156 @@
+from concurrent.futures import ThreadPoolExecutor
+from library.memory import mem
+import functools
+import asyncio
+
+# All database work is done on these threads so a slow query or disk sync never blocks the bot's event loop.
+# Writes all go through a single thread so they never fight each other for the sqlite write lock.
+reader_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='memory-reader')
+writer_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='memory-writer')
+
+async def run_read(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(reader_executor, functools.partial(func, *args, **kwargs))
+
+async def run_write(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(writer_executor, functools.partial(func, *args, **kwargs))
+
+async def run_write_steps(steps):
+    """
+    Runs a long write (a generator like importer.import_steps) on the writer thread one step at a time. Each step is
+    queued on its own, so writes from commands that came in meanwhile get to run in between instead of waiting for
+    the whole thing.
+    """
+    while await run_write(next, steps, False) is not False:
+        pass
+
+class amem:
+    """
+    The awaitable version of library.memory.mem. Every function has the same name and arguments as in mem,
+    but is run on a background thread. Use this from inside the bot (commands, listeners) instead of mem.
+    """
+    @staticmethod
+    async def does_category_exists(category, guild_id=0):
+        return await run_read(mem.does_category_exists, category, guild_id=guild_id)
+
+    @staticmethod
+    async def does_trigger_exists(trigger, guild_id=0):
+        return await run_read(mem.does_trigger_exists, trigger, guild_id=guild_id)
+
+    @staticmethod
+    async def is_fact_already_exists(category, fact, guild_id=0):
+        return await run_read(mem.is_fact_already_exists, category, fact, guild_id=guild_id)
+
+    @staticmethod
+    async def add_fact(category, author_id, fact, allow_similar=False, guild_id=0):
+        return await run_write(mem.add_fact, category, author_id, fact, allow_similar, guild_id=guild_id)
+
+    @staticmethod
+    async def add_facts(rows, author_id, allow_similar=False, guild_id=0) -> dict:
+        return await run_write(mem.add_facts, rows, author_id, allow_similar, guild_id=guild_id)
+
+    @staticmethod
+    async def remove_fact(fact, guild_id=0):
+        return await run_write(mem.remove_fact, fact, guild_id=guild_id)
+
+    @staticmethod
+    async def remove_fact_by_id(fact_id, guild_id=0):
+        return await run_write(mem.remove_fact_by_id, fact_id, guild_id=guild_id)
+
+    @staticmethod
+    async def list_all_facts(guild_id=0) -> dict:
+        return await run_read(mem.list_all_facts, guild_id=guild_id)
+
+    @staticmethod
+    async def list_facts_page(after_id=None, before_id=None, limit=10, guild_id=0) -> list:
+        return await run_read(mem.list_facts_page, after_id, before_id, limit, guild_id=guild_id)
+
+    @staticmethod
+    async def export_facts_page(after_id=None, limit=1000, guild_id=0) -> list:
+        return await run_read(mem.export_facts_page, after_id, limit, guild_id=guild_id)
+
+    @staticmethod
+    async def search_facts(query: str, after=None, before=None, limit=10, guild_id=0) -> list:
+        return await run_read(mem.search_facts, query, after, before, limit, guild_id=guild_id)
+
+    @staticmethod
+    async def add_trigger(trigger, category, user_id, guild_id=0):
+        return await run_write(mem.add_trigger, trigger, category, user_id, guild_id=guild_id)
+
+    @staticmethod
+    async def remove_trigger(trigger, guild_id=0):
+        return await run_write(mem.remove_trigger, trigger, guild_id=guild_id)
+
+    @staticmethod
+    async def load_indexes(reload=False, guild_id=0):
+        return await run_read(mem.load_indexes, reload, guild_id=guild_id)
+
+    @staticmethod
+    async def autocomplete_categories(prefix: str, limit=25, guild_id=0) -> list:
+        return await run_read(mem.autocomplete_categories, prefix, limit, guild_id=guild_id)
+
+    @staticmethod
+    async def autocomplete_triggers(prefix: str, limit=25, guild_id=0) -> list:
+        return await run_read(mem.autocomplete_triggers, prefix, limit, guild_id=guild_id)
+
+    @staticmethod
+    async def autocomplete_facts(prefix: str, limit=25, guild_id=0) -> list:
+        return await run_read(mem.autocomplete_facts, prefix, limit, guild_id=guild_id)
+
+    @staticmethod
+    async def get_all_triggers():
+        return await run_read(mem.get_all_triggers)
+
+    @staticmethod
+    async def get_all_categories():
+        return await run_read(mem.get_all_categories)
+
+    @staticmethod
+    async def list_triggers_page(after=None, before=None, limit=25, guild_id=0) -> list:
+        return await run_read(mem.list_triggers_page, after, before, limit, guild_id=guild_id)
+
+    @staticmethod
+    async def list_categories_page(after=None, before=None, limit=25, guild_id=0) -> list:
+        return await run_read(mem.list_categories_page, after, before, limit, guild_id=guild_id)
+
+    @staticmethod
+    async def len_triggers(category=None, guild_id=0):
+        return await run_read(mem.len_triggers, category, guild_id=guild_id)
+
+    @staticmethod
+    async def len_facts(category=None, guild_id=0):
+        return await run_read(mem.len_facts, category, guild_id=guild_id)
+
+    @staticmethod
+    async def is_trigger(msg: str, guild_id=0) -> dict:
+        return await run_read(mem.is_trigger, msg, guild_id=guild_id)
+
+    @staticmethod
+    async def find_most_similar(trigger, guild_id=0) -> str:
+        return await run_read(mem.find_most_similar, trigger, guild_id=guild_id)
+
+    @staticmethod
+    async def similar_triggers(trigger: str, guild_id=0) -> list:
+        return await run_read(mem.similar_triggers, trigger, guild_id=guild_id)
+
+    @staticmethod
+    async def trigger_collisions(guild_id=0) -> list:
+        return await run_read(mem.trigger_collisions, guild_id=guild_id)
+
+    @staticmethod
+    async def match_message(content: str, guild_id=0) -> dict:
+        return await run_read(mem.match_message, content, guild_id=guild_id)
+
+    @staticmethod
+    async def match_exact(content: str, guild_id=0) -> dict:
+        return await run_read(mem.match_exact, content, guild_id=guild_id)
+
+    @staticmethod
+    async def get_fact(trigger: str, channel_id=None, guild_id=0) -> str:
+        return await run_read(mem.get_fact, trigger, channel_id, guild_id=guild_id)
+
+    @staticmethod
+    async def get_random_fact(category, channel_id=None, guild_id=0):
+        return await run_read(mem.get_random_fact, category, channel_id, guild_id=guild_id)
+
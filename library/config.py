@@ -0,0 +1,24 @@
+import os
+
+# Settings are read from environment variables, which can also be put in secrets.env next to the TOKEN.
+
+def get_str(name, default=None):
+    return os.environ.get(name, default)
+
+def get_int(name, default: int) -> int:
+    value = os.environ.get(name)
+    if value is None or value.strip() == '':
+        return default
+    return int(value)
+
+def get_float(name, default: float) -> float:
+    value = os.environ.get(name)
+    if value is None or value.strip() == '':
+        return default
+    return float(value)
+
+def get_bool(name, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value is None or value.strip() == '':
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
@@ -0,0 +1,102 @@
+from collections import OrderedDict
+import threading
+
+class fact_cache:
+    """
+    Keeps the facts of recently used categories in memory, together with who added them, so replying to a trigger
+    doesn't need any queries once a category is warm.
+
+    The cache holds at most max_facts facts. When it's full, the category that was used the longest time ago is
+    dropped. A single category bigger than the whole cache is never cached at all.
+    """
+    def __init__(self, max_facts=200_000):
+        self.lock = threading.RLock()
+        self.max_facts = max_facts
+        self.categories = OrderedDict()  # category -> {fact id: (fact, added_by)}, least recently used first
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, category):
+        return category in self.categories
+
+    def fits(self, count):
+        return count <= self.max_facts
+
+    def put(self, category, rows):
+        """
+        Caches all the facts of a category.
+        :param rows: (id, fact, added_by) rows
+        :return: False if the category was too big to cache
+        """
+        facts = {fact_id: (fact, added_by) for fact_id, fact, added_by in rows}
+        if not self.fits(len(facts)):
+            return False
+
+        with self.lock:
+            old = self.categories.pop(category, None)
+            if old is not None:
+                self.size -= len(old)
+            self.categories[category] = facts
+            self.size += len(facts)
+            self.evict()
+        return True
+
+    def evict(self):
+        with self.lock:
+            while self.size > self.max_facts and self.categories:
+                _, facts = self.categories.popitem(last=False)
+                self.size -= len(facts)
+
+    def get(self, category, fact_id):
+        """
+        :return: A (fact, added_by) tuple, or None if it isn't cached
+        """
+        with self.lock:
+            facts = self.categories.get(category)
+            if facts is None or fact_id not in facts:
+                self.misses += 1
+                return None
+
+            self.categories.move_to_end(category)
+            self.hits += 1
+            return facts[fact_id]
+
+    def add(self, category, fact_id, fact, added_by):
+        with self.lock:
+            facts = self.categories.get(category)
+            if facts is None or fact_id in facts:
+                return
+            facts[fact_id] = (fact, added_by)
+            self.size += 1
+            self.evict()
+
+    def remove(self, category, fact_id):
+        with self.lock:
+            facts = self.categories.get(category)
+            if facts is None or fact_id not in facts:
+                return
+            del facts[fact_id]
+            self.size -= 1
+
+    def forget(self, category=None):
+        with self.lock:
+            if category is None:
+                self.categories.clear()
+                self.size = 0
+                return
+
+            facts = self.categories.pop(category, None)
+            if facts is not None:
+                self.size -= len(facts)
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'categories': len(self.categories),
+                'facts': self.size,
+            }
@@ -0,0 +1,113 @@
+import codecs
+import json
+import csv
+import io
+
+# Reading and writing the files used by /fact import and /fact export. Both formats have a category and a fact
+# per row (exports add who added it):
+# - jsonl: One JSON object per line, like {"category": "space", "fact": "..."}
+# - csv: A header row with category and fact columns, then one fact per row
+
+FORMATS = {'.jsonl': 'jsonl', '.ndjson': 'jsonl', '.json': 'jsonl', '.csv': 'csv'}
+EXPORT_COLUMNS = ('category', 'fact', 'added_by')
+
+def file_format(filename: str):
+    """
+    :return: 'jsonl' or 'csv' going by the file's extension, or None if it's neither
+    """
+    for extension, name in FORMATS.items():
+        if filename.lower().endswith(extension):
+            return name
+    return None
+
+async def read_lines(chunks):
+    """
+    Splits a stream of bytes into lines of text as it arrives, so the whole file never has to be in memory.
+    :param chunks: An async iterable of bytes, like the reader of an attachment's stream()
+    """
+    decoder = codecs.getincrementaldecoder('utf-8-sig')(errors='replace')
+    buffer = ''
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split('\n')
+        for line in lines:
+            yield line.rstrip('\r')
+    buffer += decoder.decode(b'', final=True)
+    if buffer:
+        yield buffer.rstrip('\r')
+
+def parse_json_line(line: str):
+    """
+    :return: (category, fact), or None if the line isn't a JSON object with both
+    """
+    try:
+        data = json.loads(line)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    return clean(data.get('category'), data.get('fact'))
+
+def clean(category, fact):
+    if not isinstance(category, str) or not isinstance(fact, str):
+        return None
+    category, fact = category.strip(), fact.strip()
+    if not category or not fact:
+        return None
+    return category, fact
+
+async def read_records(chunks, file_format: str):
+    """
+    Reads the facts out of a jsonl or csv file as it arrives.
+    :return: An async generator of (category, fact) tuples, with None for each row that couldn't be read
+    """
+    columns = None  # Where the category and fact are in each csv row
+    record = ''
+    async for line in read_lines(chunks):
+        if file_format == 'jsonl':
+            if line.strip():
+                yield parse_json_line(line)
+            continue
+
+        # A quoted csv field can have line breaks in it, so lines are put together until every quote is closed
+        record = f'{record}\n{line}' if record else line
+        if record.count('"') % 2:
+            continue
+        row, record = next(csv.reader([record]), []), ''
+        if not any(cell.strip() for cell in row):
+            continue
+
+        if columns is None:
+            names = [cell.strip().lower() for cell in row]
+            if 'category' in names and 'fact' in names:
+                columns = (names.index('category'), names.index('fact'))
+                continue
+            # No header, so the first two columns are taken as the category and fact
+            columns = (0, 1)
+
+        if len(row) <= max(columns):
+            yield None
+        else:
+            yield clean(row[columns[0]], row[columns[1]])
+
+    if record:
+        # The file ended inside a quoted field
+        yield None
+
+def format_rows(rows, file_format: str, header=False) -> bytes:
+    """
+    :param rows: (id, category, fact, added_by) tuples, like from mem.export_facts_page
+    :param header: Start with the csv header row
+    :return: The rows as part of a jsonl or csv file
+    """
+    if file_format == 'jsonl':
+        return ''.join(
+            json.dumps(dict(zip(EXPORT_COLUMNS, row[1:])), ensure_ascii=False) + '\n' for row in rows
+        ).encode('utf-8')
+
+    text = io.StringIO()
+    writer = csv.writer(text, lineterminator='\n')
+    if header:
+        writer.writerow(EXPORT_COLUMNS)
+    writer.writerows(row[1:] for row in rows)
+    return text.getvalue().encode('utf-8')
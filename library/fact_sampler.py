@@ -0,0 +1,142 @@
+from collections import OrderedDict
+import threading
+import random
+
+def shuffled_index(index, size, seed):
+    """
+    Where index ends up in a shuffle of range(size), without making the shuffled list. Each seed is a different
+    shuffle. It's a small Feistel network over the next power of 4 up from size, and anything that lands past the
+    end is put through it again until it lands inside, so every index still gets a different place.
+    """
+    half_bits = max(1, ((size - 1).bit_length() + 1) // 2)
+    mask = (1 << half_bits) - 1
+    while True:
+        left, right = index >> half_bits, index & mask
+        for round_number in range(4):
+            left, right = right, left ^ (hash((seed, round_number, right)) & mask)
+        index = (left << half_bits) | right
+        if index < size:
+            return index
+
+class fact_sampler:
+    """
+    Picks random facts for a category without asking the database to sort the whole category.
+
+    Each category keeps an array of its fact ids (plus where each id sits in that array), so picking one is a single
+    random index, and adding or removing a fact is a swap with the last element.
+
+    A pick can be made across several categories at once (see pick_from), as if their ids were one array. That way
+    a guild's facts and the global ones can be kept apart, and the global ones are only loaded once however many
+    guilds use them.
+
+    In shuffle bag mode, each channel gets its own shuffled order of the category's ids and facts are handed out
+    in that order until it runs out, so a channel never sees the same fact twice until it has seen all of them.
+    A bag is only a seed and how far along it is (see shuffled_index), not a copy of the ids, so a busy bot with
+    max_bags bags doesn't keep max_bags copies of its biggest categories. If facts are added or removed while a
+    bag is going, one can come up a bit early or be left for the next round.
+    """
+    def __init__(self, shuffle_bags=True, max_bags=1024):
+        self.lock = threading.RLock()
+        self.shuffle_bags = shuffle_bags
+        self.max_bags = max_bags
+        self.ids = {}  # category -> [fact ids]
+        self.positions = {}  # category -> {fact id: index in self.ids[category]}
+        # (channel id, categories) -> [ids in the categories when the bag was started, seed, how many were handed
+        # out], least recently used first
+        self.bags = OrderedDict()
+
+    def is_loaded(self, category):
+        return category in self.ids
+
+    def count(self, category):
+        return len(self.ids.get(category, ()))
+
+    def load(self, category, fact_ids):
+        with self.lock:
+            self.ids[category] = list(fact_ids)
+            self.positions[category] = {fact_id: i for i, fact_id in enumerate(self.ids[category])}
+
+    def add(self, category, fact_id):
+        with self.lock:
+            if category not in self.ids or fact_id in self.positions[category]:
+                return
+            self.positions[category][fact_id] = len(self.ids[category])
+            self.ids[category].append(fact_id)
+
+    def remove(self, category, fact_id):
+        with self.lock:
+            positions = self.positions.get(category)
+            if positions is None or fact_id not in positions:
+                return
+
+            # Move the last id into the removed id's spot so nothing has to shift down
+            ids = self.ids[category]
+            index = positions.pop(fact_id)
+            last_id = ids.pop()
+            if last_id != fact_id:
+                ids[index] = last_id
+                positions[last_id] = index
+            # Bags hand out places in the array rather than ids, so they don't need changing here
+
+    def forget(self, category=None):
+        """
+        Drops what is known about a category (or every category), so it gets loaded from the database again.
+        """
+        with self.lock:
+            if category is None:
+                self.ids.clear()
+                self.positions.clear()
+                self.bags.clear()
+                return
+
+            self.ids.pop(category, None)
+            self.positions.pop(category, None)
+            for key in [key for key in self.bags if category in key[1]]:
+                del self.bags[key]
+
+    def pick(self, category, channel_id=None):
+        """
+        Picks a random fact id from a category. The category must be loaded first.
+        :param channel_id: If given (and shuffle bags are on), the fact is drawn from that channel's shuffle bag.
+        :return: A fact id, or None if the category has no facts
+        """
+        picked = self.pick_from((category,), channel_id)
+        return picked[1] if picked is not None else None
+
+    def pick_from(self, categories, channel_id=None):
+        """
+        The same as pick, but out of every fact in several categories, each fact as likely as any other.
+        Categories that aren't loaded count as empty.
+        :return: A (category, fact id) tuple, or None if none of the categories have any facts
+        """
+        with self.lock:
+            categories = tuple(categories)
+            arrays = [self.ids.get(category, ()) for category in categories]
+            size = sum(map(len, arrays))
+            if not size:
+                return None
+
+            if channel_id is None or not self.shuffle_bags:
+                index = random.randrange(size)
+            else:
+                key = (channel_id, categories)
+                bag = self.bags.get(key)
+                while True:
+                    if bag is None or bag[2] >= bag[0]:
+                        bag = [size, random.getrandbits(64), 0]
+                        self.bags[key] = bag
+                    index = shuffled_index(bag[2], bag[0], bag[1])
+                    bag[2] += 1
+                    # Past the end if facts were removed since the bag was started
+                    if index < size:
+                        break
+
+                self.bags.move_to_end(key)
+                while len(self.bags) > self.max_bags:
+                    self.bags.popitem(last=False)
+
+            # The arrays are taken one after the other
+            for category, ids in zip(categories, arrays):
+                if index < len(ids):
+                    return category, ids[index]
+                index -= len(ids)
@@ -0,0 +1,82 @@
+from collections import OrderedDict
+import threading
+
+class guild_cache:
+    """
+    Keeps one thing per guild (eg, the indexes of its triggers), built the first time that guild needs it.
+    When there are more than max_guilds, the guilds that went the longest without being used are dropped, and get
+    built again if they come back. The global entries (guild 0) are used by every guild, so they're never dropped.
+
+    The lock is held while building, so anything that changes a guild's data should update it (if it's loaded)
+    while holding the lock too, and nothing can be missed in between.
+    """
+    def __init__(self, build, max_guilds=256, on_evict=None):
+        self.build = build  # Function taking a guild id and returning what to keep for it
+        # Called with the guild id when a guild is dropped for not being used, while the lock is held
+        self.on_evict = on_evict
+        self.max_guilds = max_guilds
+        self.lock = threading.RLock()
+        self.guilds = OrderedDict()  # guild id -> what was built, least recently used first
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, guild_id):
+        return guild_id in self.guilds
+
+    def get(self, guild_id):
+        with self.lock:
+            item = self.guilds.get(guild_id)
+            if item is not None:
+                self.guilds.move_to_end(guild_id)
+                self.hits += 1
+                return item
+
+            self.misses += 1
+            item = self.build(guild_id)
+            self.guilds[guild_id] = item
+            self.evict()
+            return item
+
+    def peek(self, guild_id):
+        """
+        :return: What's kept for the guild, or None if it isn't loaded. Never builds anything.
+        """
+        return self.guilds.get(guild_id)
+
+    def loaded(self) -> list:
+        """
+        :return: The ids of every guild that's loaded
+        """
+        with self.lock:
+            return list(self.guilds)
+
+    def evict(self):
+        while len(self.guilds) > self.max_guilds + (0 in self.guilds):
+            for guild_id in self.guilds:
+                if guild_id != 0:
+                    del self.guilds[guild_id]
+                    self.evictions += 1
+                    if self.on_evict is not None:
+                        self.on_evict(guild_id)
+                    break
+
+    def forget(self, guild_id=None):
+        """
+        Drops what's kept for a guild (or every guild), so it gets built again the next time it's needed.
+        """
+        with self.lock:
+            if guild_id is None:
+                self.guilds.clear()
+            else:
+                self.guilds.pop(guild_id, None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'guilds': len(self.guilds),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,379 @@
+from library.near_duplicates import split_near_duplicates
+from library.default_categories import SEED_AUTHOR
+from library.memory import get_conn, insert_facts, facts_changed, trigger_changed, updating_indexes
+import itertools
+import hashlib
+import logging
+import os
+
+# Facts are looked up and inserted this many at a time
+BATCH_SIZE = 500
+
+def file_hash(path) -> str:
+    """
+    Hashes a file a chunk at a time, so big category files never have to be read into memory at once.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def read_facts(path):
+    """
+    Reads the facts from a category file one line at a time.
+    :return: A generator of facts, with blank lines left out
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield line
+
+def batches(items, size=BATCH_SIZE):
+    """
+    :return: A generator of lists of up to size items, without reading more of items than the current list
+    """
+    items = iter(items)
+    while True:
+        batch = list(itertools.islice(items, size))
+        if not batch:
+            return
+        yield batch
+
+def insert_facts_batch(cur, category, facts) -> dict:
+    """
+    Inserts a batch of global facts, skipping the ones that already exist and the near duplicates (see
+    library/near_duplicates.py), of a fact that exists or of one earlier in the batch. Near duplicates are logged,
+    so they can be looked over.
+    :param facts: A list of facts without repeats
+    :return: {fact: (id of the fact, or of the one that already existed, or None for a near duplicate,
+    one of 'inserted', 'exists' or 'near_duplicate')}
+    """
+    results = {}
+    cur.execute(f'''
+        SELECT id, fact
+        FROM category_facts
+        WHERE guild_id = 0 AND fact IN ({', '.join('?' * len(facts))});
+    ''', facts)
+    for fact_id, fact in cur.fetchall():
+        results[fact] = (fact_id, 'exists')
+
+    new_facts, near_duplicates = split_near_duplicates(cur, [fact for fact in facts if fact not in results])
+    for fact, duplicate in near_duplicates.items():
+        if duplicate is None:
+            logging.info(f"Skipped a near duplicate of another new fact in '{category}': {fact}")
+        else:
+            logging.info(f"Skipped a near duplicate of fact #{duplicate[0]} in '{category}': {fact}")
+        results[fact] = (None, 'near_duplicate')
+
+    rows = [(category, fact, fact_bands) for fact, fact_bands in new_facts.items()]
+    for fact_id, fact in insert_facts(cur, rows, SEED_AUTHOR):
+        results[fact] = (fact_id, 'inserted')
+    return results
+
+def count_statuses(results) -> tuple:
+    """
+    :return: How many facts of insert_facts_batch's results were inserted and how many were near duplicates
+    """
+    statuses = [status for _, status in results.values()]
+    return statuses.count('inserted'), statuses.count('near_duplicate')
+
+def insert_trigger(cur, category) -> list:
+    """
+    :return: The change to announce (see announce) if the trigger is new, nothing if it was already there
+    """
+    cur.execute('''
+        INSERT OR IGNORE INTO triggers (trigger, added_by, category)
+        VALUES (?, ?, ?);
+    ''', (category, SEED_AUTHOR, category))
+    if cur.rowcount > 0:
+        return [('trigger', True, 0, category, category)]
+    return []
+
+def inserted_changes(category, results) -> list:
+    """
+    :return: The change to announce for the facts insert_facts_batch inserted, if it inserted any
+    """
+    rows = [
+        (fact_id, 0, category, fact, SEED_AUTHOR) for fact, (fact_id, status) in results.items() if status == 'inserted'
+    ]
+    return [('facts', True, rows)] if rows else []
+
+def insert_category(cur, category, facts):
+    """
+    Inserts a category's trigger and facts as global ones (guild 0, used in every guild), skipping any fact that
+    already exists or is a near duplicate of one that does. A generator that yields what each batch of facts
+    changed, so the caller can commit and announce it in between (see import_steps and announce). Use it with
+    'yield from' to get what it returns.
+    :param facts: Any iterable of facts, it's streamed straight into the database.
+    :return: A tuple of how many facts were inserted, how many were near duplicates and how many facts there were
+    """
+    changes = insert_trigger(cur, category)
+
+    inserted = near_duplicates = total = 0
+    for batch in batches(facts):
+        total += len(batch)
+        # A fact in the file twice is only looked up once, the second one counts as skipped
+        results = insert_facts_batch(cur, category, list(dict.fromkeys(batch)))
+        batch_inserted, batch_near_duplicates = count_statuses(results)
+        inserted += batch_inserted
+        near_duplicates += batch_near_duplicates
+        yield changes + inserted_changes(category, results)
+        changes = []
+    if changes:
+        yield changes
+
+    return inserted, near_duplicates, total
+
+def sync_file(cur, path, category, facts):
+    """
+    Brings the facts imported from a category file in line with what's in the file now. Only the lines that were
+    added or removed since it was last imported are looked at, by comparing against the imported_lines table.
+    A removed line's fact is deleted, unless another file still has the same line in it, or the fact didn't come
+    from a file in the first place.
+    A generator that yields what each batch changed, like insert_category. Every line that's done is in
+    imported_lines, so if it's stopped partway, running it again carries on where it left off.
+    :param facts: The file's facts (see read_facts), nothing if the file was deleted
+    :return: A tuple of how many facts were inserted, near duplicates, removed and how many lines were added
+    """
+    # The file's lines go in a temporary table, so the diff is done by SQLite instead of in memory. It belongs to
+    # this connection and outlives the commits in between batches.
+    cur.execute('CREATE TEMP TABLE IF NOT EXISTS file_lines (line TEXT PRIMARY KEY) WITHOUT ROWID;')
+    cur.execute('DELETE FROM file_lines;')
+    cur.executemany('INSERT OR IGNORE INTO file_lines (line) VALUES (?);', ((fact,) for fact in facts))
+
+    removed = 0
+    while True:
+        # The lines of a page are deleted along with their facts, so the next page starts from the top again
+        cur.execute(f'''
+            SELECT line, fact_id
+            FROM imported_lines
+            WHERE path = ? AND line NOT IN (SELECT line FROM file_lines)
+            ORDER BY line
+            LIMIT {BATCH_SIZE};
+        ''', (path,))
+        page = cur.fetchall()
+        if not page:
+            break
+        cur.executemany('''
+            DELETE FROM imported_lines
+            WHERE path = ? AND line = ?;
+        ''', [(path, line) for line, _ in page])
+
+        removed_ids = list({fact_id for _, fact_id in page if fact_id is not None})
+        rows = []
+        if removed_ids:
+            cur.execute(f'''
+                SELECT id, guild_id, category, fact, added_by
+                FROM category_facts
+                WHERE id IN ({', '.join('?' * len(removed_ids))}) AND guild_id = 0
+                    AND NOT EXISTS (SELECT 1 FROM imported_lines WHERE fact_id = category_facts.id);
+            ''', removed_ids)
+            rows = cur.fetchall()
+            cur.executemany('''
+                DELETE FROM category_facts
+                WHERE id = ?;
+            ''', [(row[0],) for row in rows])
+        removed += len(rows)
+        yield [('facts', False, rows)] if rows else []
+
+    inserted = near_duplicates = total = 0
+    last_line = ''
+    while True:
+        # A page at a time in the file_lines order, so no query is left open while the caller commits
+        cur.execute(f'''
+            SELECT line
+            FROM file_lines
+            WHERE line > ? AND line NOT IN (SELECT line FROM imported_lines WHERE path = ?)
+            ORDER BY line
+            LIMIT {BATCH_SIZE};
+        ''', (last_line, path))
+        batch = [line for (line,) in cur.fetchall()]
+        if not batch:
+            break
+        last_line = batch[-1]
+
+        changes = insert_trigger(cur, category) if not total else []
+        total += len(batch)
+        results = insert_facts_batch(cur, category, batch)
+        batch_inserted, batch_near_duplicates = count_statuses(results)
+        inserted += batch_inserted
+        near_duplicates += batch_near_duplicates
+
+        # A line whose fact was already there only shares it if the fact came from another file too. One that
+        # was added some other way (a default category, a command) isn't the file's to delete later.
+        existing = [fact_id for fact_id, status in results.values() if status == 'exists']
+        from_files = set()
+        if existing:
+            cur.execute(f'''
+                SELECT DISTINCT fact_id
+                FROM imported_lines
+                WHERE fact_id IN ({', '.join('?' * len(existing))});
+            ''', existing)
+            from_files = {fact_id for (fact_id,) in cur.fetchall()}
+
+        rows = []
+        for line in batch:
+            fact_id, status = results[line]
+            rows.append((path, line, fact_id if status == 'inserted' or fact_id in from_files else None))
+        cur.executemany('''
+            INSERT INTO imported_lines (path, line, fact_id)
+            VALUES (?, ?, ?);
+        ''', rows)
+        yield changes + inserted_changes(category, results)
+
+    return inserted, near_duplicates, removed, total
+
+def scan_directory(directory='categories') -> dict:
+    """
+    :return: {path: (size, modified time in nanoseconds)} of every category file, cheap enough to check often
+    """
+    files = {}
+    if os.path.exists(directory):
+        for entry in os.scandir(directory):
+            if entry.name.endswith('.txt') and entry.is_file():
+                stat = entry.stat()
+                files[entry.path] = (stat.st_size, stat.st_mtime_ns)
+    return files
+
+def import_directory(cur, directory, report):
+    """
+    Imports every categories/*.txt file that changed since it was last imported, and removes the facts of the files
+    that were deleted. Files that haven't changed are skipped without being read.
+    A generator that yields what each batch changed, like insert_category.
+    """
+    if not os.path.exists(directory):
+        return
+
+    files = scan_directory(directory)
+    for path in sorted(files):
+        size, mtime = files[path]
+        cur.execute('''
+            SELECT hash, size, mtime
+            FROM imported_files
+            WHERE path = ?;
+        ''', (path,))
+        previous = cur.fetchone()
+
+        # Same size and modified time means the same file, so it's not even hashed
+        if previous is not None and previous[1:] == (size, mtime):
+            report['unchanged_files'] += 1
+            continue
+
+        digest = file_hash(path)
+        if previous is None or previous[0] != digest:
+            category = os.path.basename(path)[:-len('.txt')]
+            inserted, near_duplicates, removed, total = yield from sync_file(cur, path, category, read_facts(path))
+            report['inserted'] += inserted
+            report['near_duplicates'] += near_duplicates
+            report['removed'] += removed
+            report['skipped'] += total - inserted - near_duplicates
+            report['imported_files'] += 1
+        else:
+            # The file was touched but its contents are the same
+            report['unchanged_files'] += 1
+
+        # Only once the whole file is in, so a file that was stopped partway gets looked at again
+        cur.execute('''
+            INSERT OR REPLACE INTO imported_files (path, hash, size, mtime)
+            VALUES (?, ?, ?, ?);
+        ''', (path, digest, size, mtime))
+
+    cur.execute('''
+        SELECT path
+        FROM imported_files;
+    ''')
+    for (path,) in cur.fetchall():
+        if os.path.normpath(os.path.dirname(path)) == os.path.normpath(directory) and path not in files:
+            _, _, removed, _ = yield from sync_file(cur, path, None, ())
+            report['removed'] += removed
+            cur.execute('''
+                DELETE FROM imported_files
+                WHERE path = ?;
+            ''', (path,))
+
+def new_report() -> dict:
+    return {
+        'inserted': 0, 'skipped': 0, 'near_duplicates': 0, 'removed': 0, 'imported_files': 0, 'unchanged_files': 0,
+    }
+
+def import_steps(category_fact_dict: dict, directory, report):
+    """
+    Adds the default categories and every changed categories/*.txt file to the database, committing after every
+    batch of facts so the database is never locked for long. It's a generator that does one batch each time it's
+    advanced, so the writer thread can do other writes in between (see async_memory.run_write_steps). It must
+    always be advanced from the same thread, since it uses that thread's connection.
+    :param report: Filled in with the counts as it goes (see new_report)
+    """
+    conn = get_conn()
+    cur = conn.cursor()
+    try:
+        for category, facts in category_fact_dict.items():
+            inserted, near_duplicates, total = yield from committing(conn, insert_category(cur, category, facts))
+            report['inserted'] += inserted
+            report['near_duplicates'] += near_duplicates
+            report['skipped'] += total - inserted - near_duplicates
+
+        yield from committing(conn, import_directory(cur, directory, report))
+        conn.commit()
+    except BaseException:
+        # Only the batch that was going gets lost, the ones before it were committed
+        conn.rollback()
+        raise
+
+def committing(conn, steps):
+    """
+    Commits every time steps yields, and announces what it changed once it's committed.
+    :return: What steps returned
+    """
+    while True:
+        try:
+            changes = next(steps)
+        except StopIteration as done:
+            return done.value
+        # Nothing can be loaded between the commit and the announcement, or it'd get the changes twice
+        with updating_indexes():
+            conn.commit()
+            announce(changes)
+        yield
+
+def announce(changes):
+    """
+    Updates the indexes and caches that are loaded with what a batch changed, and tells the other processes, the
+    same way adding or removing a fact or trigger by command does. Nothing has to be reloaded.
+    :param changes: ('trigger', added, guild id, trigger, category) and ('facts', added, rows) tuples
+    """
+    for kind, added, *details in changes:
+        if kind == 'trigger':
+            trigger_changed(added, *details)
+        else:
+            facts_changed(added, *details)
+
+def finish_import(report, name='Imported categories'):
+    """
+    Logs what an import_steps did.
+    """
+    logging.info(f"{name}: {report}")
+
+def import_categories(category_fact_dict: dict, directory='categories') -> dict:
+    """
+    Does all of import_steps at once.
+    :return: A dict of counts: inserted, skipped, near duplicate and removed facts, imported and unchanged files
+    """
+    report = new_report()
+    for _ in import_steps(category_fact_dict, directory, report):
+        pass
+    finish_import(report)
+    return report
+
+def sync_categories(directory='categories') -> dict:
+    """
+    Imports only the changes to the categories directory, for when it changes while the bot is running.
+    :return: The same counts as import_categories
+    """
+    report = new_report()
+    for _ in import_steps({}, directory, report):
+        pass
+    finish_import(report, 'Synced the categories directory')
+    return report
@@ -0,0 +1,103 @@
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+from library import config
+import logging
+import atexit
+import queue
+import copy
+import json
+import os
+
+# Logging for the whole bot is set up here, once per process. Log calls only put the record on a queue, and a
+# background thread writes it to the log file, so logging an error in a command never waits on the disk.
+#
+# Settings:
+# - LOG_LEVEL: Level of everything that doesn't have its own level (Default INFO)
+# - LOG_LEVELS: Levels of single modules, like 'library.memory=DEBUG,hikari.gateway=WARNING'
+# - LOG_JSON: Write one JSON object per line instead of plain text (Default off)
+# - LOG_DAYS: How many days of old log files are kept (Default 30)
+
+LOG_DIR = 'logs'
+FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+listener = None
+
+class json_formatter(logging.Formatter):
+    def format(self, record) -> str:
+        data = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data['exception'] = record.exc_text
+        if record.stack_info:
+            data['stack'] = record.stack_info
+        return json.dumps(data, ensure_ascii=False)
+
+class queue_handler(QueueHandler):
+    def prepare(self, record):
+        # The message is filled in here, since its arguments could change before the background thread gets to it.
+        # The traceback is turned into text here too (it holds on to every frame otherwise), but kept apart from the
+        # message so the JSON output can give it its own field.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+def parse_levels(text: str) -> dict:
+    """
+    :return: {logger name: level} from text like 'library.memory=DEBUG,hikari=WARNING'
+    """
+    levels = {}
+    for item in text.split(','):
+        name, _, level = item.partition('=')
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+def setup(name='bot'):
+    """
+    Sends every log record in this process to logs/<name>.log, which is started over every midnight. The old
+    files are kept as logs/<name>.log.<date>. Only the first call does anything.
+    :param name: Each process of sharded mode writes to its own file, since they can't share one
+    :return:
+    """
+    global listener
+    if listener is not None:
+        return
+
+    os.makedirs(LOG_DIR, exist_ok=True)
+    file_handler = TimedRotatingFileHandler(
+        os.path.join(LOG_DIR, f'{name}.log'),
+        when='midnight',
+        backupCount=config.get_int('LOG_DAYS', 30),
+        encoding='utf-8',
+    )
+    if config.get_bool('LOG_JSON', False):
+        file_handler.setFormatter(json_formatter())
+    else:
+        file_handler.setFormatter(logging.Formatter(FORMAT))
+
+    records = queue.SimpleQueue()
+    listener = QueueListener(records, file_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler(records))
+    root.setLevel(config.get_str('LOG_LEVEL', 'INFO').upper())
+
+    for logger, level in parse_levels(config.get_str('LOG_LEVELS', '')).items():
+        try:
+            logging.getLogger(logger).setLevel(level)
+        except ValueError:
+            logging.warning(f"Unknown log level '{level}' for {logger}")
@@ -0,0 +1,63 @@
+from collections import OrderedDict
+import threading
+
+# Returned by match_cache.get when there's nothing cached, since None (no match) is a result that gets cached too
+missing = object()
+
+class match_cache:
+    """
+    Remembers what each word matched (or that it matched nothing) the last time it was checked, so the fuzzy
+    matching only runs once for the words that keep coming up in chat.
+
+    Every result is stored with the generation of the triggers it was worked out from (see trigger_set.generation).
+    Adding or removing a trigger changes the generation, so results from before the change are never used again.
+
+    The cache holds at most max_words words. When it's full, the word that was used the longest time ago is dropped.
+    """
+    def __init__(self, max_words=50_000):
+        self.lock = threading.Lock()
+        self.max_words = max_words
+        self.words = OrderedDict()  # key -> (generation, result), least recently used first
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    def get(self, key, generation):
+        with self.lock:
+            entry = self.words.get(key)
+            if entry is None:
+                self.misses += 1
+                return missing
+            if entry[0] != generation:
+                # Worked out before the triggers changed
+                del self.words[key]
+                self.stale += 1
+                self.misses += 1
+                return missing
+
+            self.words.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, generation, result):
+        with self.lock:
+            self.words[key] = (generation, result)
+            self.words.move_to_end(key)
+            while len(self.words) > self.max_words:
+                self.words.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.words.clear()
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'stale': self.stale,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'words': len(self.words),
+                'max_words': self.max_words,
+            }
@@ -1,155 +1,570 @@
-from difflib import SequenceMatcher
-import datetime
-import logging
+from library.phrase_matcher import normalize
+from library.trigger_index import trigger_index
+from library.trigger_set import trigger_set
+from library.guild_cache import guild_cache
+from library.match_cache import match_cache, missing
+from library.prefilter import prefilter_counter
+from library.prefix_index import prefix_index
+from library.fact_sampler import fact_sampler
+from library.fact_cache import fact_cache
+from library.near_duplicates import NearDuplicateFact, signature, find_near_duplicate, split_near_duplicates
+from library.near_duplicates import add_bands, add_batch_bands
+from library.migrations import migrate
+from library.metrics import timed, timer
+from library import config, metrics
+import contextlib
+import threading
 import sqlite3
-import os
+import atexit
+import re
 
-os.makedirs('logs', exist_ok=True)
+DB_PATH = 'memory.sqlite3'
 
-def get_conn():
-    conn = sqlite3.connect('memory.sqlite3')
+# Each thread keeps its own long-lived writer and reader connection, so opening a connection (and re-preparing
+# every statement) is only done once per thread instead of on every query.
+thread_conns = threading.local()
+all_conns = []
+all_conns_lock = threading.Lock()
+
+def open_conn(readonly=False):
+    conn = sqlite3.connect(DB_PATH, timeout=30, cached_statements=256)
+    # WAL lets readers keep reading while something is being written, and NORMAL sync is still crash-safe in WAL mode.
+    conn.execute('PRAGMA journal_mode = WAL;')
+    conn.execute('PRAGMA synchronous = NORMAL;')
+    conn.execute('PRAGMA cache_size = -16000;')  # 16MB of page cache
+    conn.execute('PRAGMA mmap_size = 268435456;')  # 256MB
+    conn.execute('PRAGMA temp_store = MEMORY;')
+    if readonly:
+        conn.execute('PRAGMA query_only = ON;')
+
+    with all_conns_lock:
+        all_conns.append(conn)
+    return conn
+
+def get_conn(readonly=False):
+    """
+    Gets this thread's connection to the database. The connection is kept open and reused, so use it with
+    'with get_conn() as conn:' to commit, but don't close it.
+    :param readonly: If True, returns the thread's reader connection, which can't write but never waits on a writer.
+    :return:
+    """
+    name = 'reader' if readonly else 'writer'
+    conn = getattr(thread_conns, name, None)
+    if conn is None:
+        conn = open_conn(readonly)
+        setattr(thread_conns, name, conn)
     return conn
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    filename=f'logs/{datetime.datetime.now().strftime("%Y-%m-%d")}.log',
+@atexit.register
+def close_all_conns():
+    with all_conns_lock:
+        for conn in all_conns:
+            try:
+                conn.close()
+            except sqlite3.ProgrammingError:
+                # Closing a connection from another thread is refused, the OS will clean it up on exit anyway.
+                pass
+        all_conns.clear()
+
+# The triggers, split up by guild. Guild 0 holds the global triggers, which are used in every guild, and every other
+# guild only has the triggers that were added in it. A guild's trigger_set is built the first time a message from it
+# is matched and then kept up to date by mem.add_trigger and mem.remove_trigger. Only the guilds that were active
+# recently stay loaded, so a bot in lots of guilds doesn't keep every guild's indexes in memory.
+def load_trigger_set(guild_id) -> trigger_set:
+    triggers = trigger_set()
+    if shared is not None:
+        triggers.load(shared.current.triggers(guild_id))
+        return triggers
+
+    with get_conn(readonly=True) as conn:
+        cur = conn.cursor()
+        cur.execute('''
+            SELECT trigger, category
+            FROM triggers
+            WHERE guild_id = ?;
+        ''', (guild_id,))
+        triggers.load(cur.fetchall())
+    return triggers
+
+def forget_guild_facts(guild_id):
+    """
+    Drops a guild's own facts from the sampler and the facts cache, when its triggers are dropped for not being used.
+    Its facts are only picked after one of its messages matched, so they'd be loaded again along with the triggers.
+    """
+    with sampler.lock, facts_cache.lock:
+        for key in [key for key in sampler.ids if key[0] == guild_id]:
+            sampler.forget(key)
+        for key in [key for key in facts_cache.categories if key[0] == guild_id]:
+            facts_cache.forget(key)
+
+trigger_sets = guild_cache(load_trigger_set, on_evict=forget_guild_facts)
+# What each (guild id, word) fuzzy matched last time, so words that keep coming up are only matched once.
+word_matches = match_cache()
+# What the prefilters threw out, counted once per message whichever guilds' triggers it was checked against
+prefilter_counts = prefilter_counter()
+
+# Keeps the fact ids of each category in memory so a random fact can be picked without ORDER BY RANDOM().
+# Categories are loaded the first time a fact is asked for, then kept up to date by mem.add_fact and mem.remove_fact.
+# Both are keyed by (guild id, category). A guild's key only has its own facts, the global ones are kept once under
+# (0, category) and a fact is picked from both together, so a big global category isn't copied for every guild.
+sampler = fact_sampler(
+    shuffle_bags=config.get_bool('FACT_SHUFFLE', True), max_bags=config.get_int('FACT_SHUFFLE_CHANNELS', 1024)
 )
+# The facts themselves (and who added them) for the categories that were used recently.
+facts_cache = fact_cache()
+
+# Sorted names for slash command autocomplete, per guild like the triggers. Each guild's are filled the first time
+# something is autocompleted there, then kept up to date by the add and remove functions.
+def load_autocomplete_set(guild_id) -> dict:
+    facts = []
+    with get_conn(readonly=True) as conn:
+        cur = conn.cursor()
+        cur.execute('''
+            SELECT trigger, category
+            FROM triggers
+            WHERE guild_id = ?;
+        ''', (guild_id,))
+        triggers = cur.fetchall()
+        if guild_id:
+            cur.execute('''
+                SELECT id, category, fact
+                FROM category_facts
+                WHERE guild_id = ?;
+            ''', (guild_id,))
+            facts = cur.fetchall()
+            fact_categories = [(category, None) for _, category, _ in facts]
+        else:
+            # Facts are only autocompleted for removing them, which a guild can only do to its own, so the global
+            # set only needs their categories (once per fact, the same as the other guilds have them)
+            cur.execute('''
+                SELECT category, COUNT(*)
+                FROM category_facts
+                WHERE guild_id = 0
+                GROUP BY category;
+            ''')
+            fact_categories = [(category, None) for category, count in cur.fetchall() for _ in range(count)]
+
+    names = {'categories': prefix_index(), 'triggers': prefix_index(), 'facts': prefix_index()}
+    names['triggers'].load((trigger, None) for trigger, _ in triggers)
+    names['categories'].load([(category, None) for _, category in triggers] + fact_categories)
+    names['facts'].load((fact, (fact_id, fact)) for fact_id, _, fact in facts)
+    return names
+
+autocomplete_sets = guild_cache(load_autocomplete_set)
+
+# Set in sharded mode (see bot.py), where the triggers and facts are read from a snapshot file that every bot
+# process shares, instead of each process loading its own copy from the database.
+shared = None
+
+def sync_snapshot():
+    """
+    Switches to the newest snapshot if another process published one, and applies what changed to everything
+    loaded from the old one (or drops it all, if that isn't known).
+    """
+    if shared is None or not shared.changed():
+        return
+    # Held while switching, so nothing can be loaded from the old snapshot after the changes were applied
+    with trigger_sets.lock, sampler.lock:
+        opened, changes = shared.refresh()
+        if not opened:
+            return
+        if changes is None:
+            mem.reload_caches()
+        else:
+            apply_changes(changes)
+
+def publish_snapshot(changes=None):
+    """
+    Tells the other processes the database was changed, after a write. The new snapshot is written a moment later
+    on a background thread, together with any other writes in the meantime (see shared_snapshot.schedule).
+    :param changes: What changed (see apply_changes), or None if it isn't known and everything has to be reloaded
+    """
+    if shared is not None:
+        shared.schedule(lambda: get_conn(readonly=True), changes)
+
+@contextlib.contextmanager
+def updating_indexes():
+    """
+    Held from committing a change to the triggers or facts until everything loaded was updated with it. Building a
+    guild's trigger set, a category's facts or a guild's autocomplete holds one of these locks while it reads the
+    database, so none of them can be built in between and end up with the change twice.
+    """
+    with trigger_sets.lock, sampler.lock, autocomplete_sets.lock:
+        yield
+
+def apply_changes(changes):
+    """
+    Applies what changed between two snapshots to the trigger sets and the sampler, which hold what's in the snapshot.
+    Autocomplete is loaded from the database instead, so it may have another process's change already, and the
+    guilds that were changed by another process have theirs dropped.
+    :param changes: (True if this process made it, change) for each change, where a change is one of
+    ('trigger', added, guild id, trigger, category) or ('facts', added, rows like sample_facts takes)
+    """
+    stale_names = set()
+    for own, (kind, added, *details) in changes:
+        if kind == 'trigger':
+            guild_id, trigger, category = details
+            index_trigger(added, guild_id, trigger, category)
+            guild_ids = {guild_id}
+        else:
+            rows = details[0]
+            sample_facts(added, rows)
+            guild_ids = {row[1] for row in rows}
+        if not own:
+            stale_names.update(guild_ids)
+
+    for guild_id in stale_names:
+        autocomplete_sets.forget(guild_id)
+
+def guild_trigger_sets(guild_id) -> list:
+    """
+    :return: The trigger sets a message in this guild is matched against, the guild's own first
+    """
+    sync_snapshot()
+    if guild_id:
+        return [trigger_sets.get(guild_id), trigger_sets.get(0)]
+    return [trigger_sets.get(0)]
+
+def category_keys(category, guild_id) -> list:
+    """
+    :return: The sampler keys a guild's facts in a category are picked from, its own first and then the global ones
+    """
+    if guild_id:
+        return [(guild_id, category), (0, category)]
+    return [(0, category)]
+
+def sample_facts(added, rows):
+    """
+    Adds facts to (or removes them from) the sampler and the facts cache, in the categories that are loaded.
+    :param rows: (id, guild_id, category, fact, added_by) of each fact
+    """
+    with sampler.lock:
+        for fact_id, guild_id, category, fact, author_id in rows:
+            key = (guild_id, category)
+            if added:
+                sampler.add(key, fact_id)
+                facts_cache.add(key, fact_id, fact, author_id)
+            else:
+                sampler.remove(key, fact_id)
+                facts_cache.remove(key, fact_id)
+
+def name_facts(added, rows):
+    """
+    The same as sample_facts for autocomplete.
+    """
+    with autocomplete_sets.lock:
+        for fact_id, guild_id, category, fact, _ in rows:
+            names = autocomplete_sets.peek(guild_id)
+            if names is None:
+                continue
+            if added:
+                names['categories'].add(category)
+                if guild_id:
+                    names['facts'].add(fact, (fact_id, fact))
+            else:
+                names['categories'].remove(category)
+                if guild_id:
+                    names['facts'].remove(fact, (fact_id, fact))
+
+def facts_changed(added, rows):
+    """
+    Updates everything that's loaded after facts were added or removed, and tells the other processes.
+    In sharded mode the sampler has to match the snapshot, so it's only updated once a snapshot with the change
+    in it is opened (see apply_changes).
+    :param rows: (id, guild_id, category, fact, added_by) of each fact
+    """
+    if shared is None:
+        sample_facts(added, rows)
+    name_facts(added, rows)
+    publish_snapshot([('facts', added, rows)])
+
+def index_trigger(added, guild_id, trigger, category):
+    with trigger_sets.lock:
+        triggers = trigger_sets.peek(guild_id)
+        if triggers is None:
+            return
+        if added:
+            triggers.add(trigger, category)
+        else:
+            triggers.remove(trigger, category)
+
+def trigger_changed(added, guild_id, trigger, category):
+    """
+    The same as facts_changed for a trigger.
+    """
+    if shared is None:
+        index_trigger(added, guild_id, trigger, category)
+    with autocomplete_sets.lock:
+        names = autocomplete_sets.peek(guild_id)
+        if names is not None:
+            if added:
+                names['triggers'].add(trigger)
+                names['categories'].add(category)
+            else:
+                names['triggers'].remove(trigger)
+                names['categories'].remove(category)
+    publish_snapshot([('trigger', added, guild_id, trigger, category)])
+
+def insert_facts(cur, rows, author_id, guild_id=0) -> list:
+    """
+    Inserts a batch of facts that are already known to be new, and their bands, in a few statements instead of a few
+    per fact. Must be called inside a transaction.
+    :param rows: (category, fact, band hashes) tuples
+    :return: (id, fact) of every fact inserted
+    """
+    if not rows:
+        return []
+    cur.executemany('''
+        INSERT INTO category_facts (guild_id, category, added_by, fact)
+        VALUES (?, ?, ?, ?);
+    ''', [(guild_id, category, author_id, fact) for category, fact, _ in rows])
+    cur.execute(f'''
+        SELECT id, fact
+        FROM category_facts
+        WHERE guild_id = ? AND fact IN ({', '.join('?' * len(rows))});
+    ''', (guild_id, *(fact for _, fact, _ in rows)))
+    inserted = cur.fetchall()
+
+    fact_bands = {fact: bands_of_fact for _, fact, bands_of_fact in rows}
+    add_batch_bands(cur, {fact_id: fact_bands[fact] for fact_id, fact in inserted})
+    return inserted
+
+def scoped_page(cur, query, params, guild_id, limit) -> list:
+    """
+    Runs a page query for the global rows and again for the guild's own rows. The query takes the guild id as its
+    first parameter and the limit as its last, so each run can walk a (guild_id, ...) index in order, which one
+    query with 'guild_id IN (0, ?)' and an ORDER BY couldn't.
+    :return: The rows of both runs, not sorted or cut down to the limit yet
+    """
+    cur.execute(query, (0, *params, limit))
+    rows = cur.fetchall()
+    if guild_id:
+        cur.execute(query, (guild_id, *params, limit))
+        rows += cur.fetchall()
+    return rows
+
+def prefilter_stats() -> dict:
+    stats = prefilter_counts.stats()
+    # Across every guild that's loaded. Read without the trigger_sets lock, which can be held for a whole index build,
+    # the count being a moment out of date doesn't matter.
+    sets = list(trigger_sets.guilds.values())
+    stats['bigrams'] = sum(len(triggers.prefilter.grams) for triggers in sets)
+    return stats
+
+metrics.register_collector('fact_cache', facts_cache.stats)
+metrics.register_collector('prefilter', prefilter_stats)
+metrics.register_collector('guild_indexes', trigger_sets.stats)
+metrics.register_collector('match_cache', word_matches.stats)
 
 class mem:
     @staticmethod
     def modernize():
         """
-        This function is used to modernize the database to the current version. It will check if the tables exist and
-        if they don't, it will create them. If the tables do exist, it will check if the columns are up to date and if
-        they aren't, it will update them.
+        This function is used to modernize the database to the current version. It runs every migration in
+        library/migrations.py that the database hasn't had yet. If the database is already up to date, this only
+        reads the version number.
 
         :return:
         """
-        # Function I pulled from another project.
-        # Using this dict, it formats the SQL query to create the tables if they don't exist
-        table_dict = {
-            'triggers': {
-                'trigger': 'TEXT NOT NULL UNIQUE PRIMARY KEY',
-                'added_by': 'TEXT NOT NULL',  # Set to be a UUID
-                # category is connected to the category_facts table's category column
-                'category': 'TEXT NOT NULL REFERENCES category_facts(category)'
-            },
-            'category_facts': {
-                'id': 'INTEGER PRIMARY KEY AUTOINCREMENT',
-                'category': 'TEXT NOT NULL',
-                'added_by': 'TEXT NOT NULL',  # Set to be a UUID
-                'fact': 'TEXT NOT NULL UNIQUE'
-            }
-        }
-
-        for table_name, columns in table_dict.items():
-            with get_conn() as conn:
-                cur = conn.cursor()
-                cur.execute(f'''
-                    SELECT name
-                    FROM sqlite_master
-                    WHERE type='table' AND name='{table_name}';
-                ''')
-                table_exist = cur.fetchone() is not None
-
-            # If the table exists, check and update columns
-            if table_exist:
-                for column_name, column_properties in columns.items():
-                    # Check if the column exists
-                    cur.execute(f'''
-                        PRAGMA table_info({table_name});
-                    ''')
-                    columns_info = cur.fetchall()
-                    column_exist = any(column_info[1] == column_name for column_info in columns_info)
-
-                    # If the column doesn't exist, add it
-                    if not column_exist:
-                        cur.execute(f'ALTER TABLE {table_name} ADD COLUMN {column_name} {column_properties};')
-
-            # If the table doesn't exist, create it with columns
-            else:
-                columns_str = ', '.join(
-                    [f'{column_name} {column_properties}' for column_name, column_properties in columns.items()]
-                )
-                try:
-                    cur.execute(f'CREATE TABLE {table_name} ({columns_str});')
-                except sqlite3.OperationalError as e:
-                    logging.info(f"Could not create table '{table_name}'. Error: {e}")
-                    exit(1)
+        with get_conn() as conn:
+            migrate(conn)
 
     @staticmethod
-    def does_category_exists(category):
-        with get_conn() as conn:
+    def limit_guilds(max_guilds):
+        """
+        Sets how many guilds' indexes are kept in memory at once (not counting the global ones).
+        :return:
+        """
+        trigger_sets.max_guilds = max_guilds
+        autocomplete_sets.max_guilds = max_guilds
+
+    @staticmethod
+    def limit_match_cache(max_words):
+        """
+        Sets how many words' fuzzy match results are remembered at once.
+        :return:
+        """
+        word_matches.max_words = max_words
+
+    @staticmethod
+    @timed('memory.does_category_exists')
+    def does_category_exists(category, guild_id=0):
+        with get_conn(readonly=True) as conn:
             cur = conn.cursor()
             cur.execute('''
                 SELECT category
                 FROM triggers
-                WHERE category = ?;
-            ''', (category,))
+                WHERE guild_id IN (0, ?) AND category = ?;
+            ''', (guild_id, category))
             return cur.fetchone() is not None
 
     @staticmethod
-    def does_trigger_exists(trigger):
-        with get_conn() as conn:
+    @timed('memory.does_trigger_exists')
+    def does_trigger_exists(trigger, guild_id=0):
+        with get_conn(readonly=True) as conn:
             cur = conn.cursor()
             cur.execute('''
                 SELECT trigger
                 FROM triggers
-                WHERE trigger = ?;
-            ''', (trigger,))
+                WHERE guild_id IN (0, ?) AND trigger = ?;
+            ''', (guild_id, trigger))
             return cur.fetchone() is not None
 
     @staticmethod
-    def is_fact_already_exists(category, fact):
-        with get_conn() as conn:
+    @timed('memory.is_fact_already_exists')
+    def is_fact_already_exists(category, fact, guild_id=0):
+        with get_conn(readonly=True) as conn:
             cur = conn.cursor()
             cur.execute('''
                 SELECT fact
                 FROM category_facts
-                WHERE category = ? AND fact = ?;
-            ''', (category, fact))
+                WHERE guild_id IN (0, ?) AND category = ? AND fact = ?;
+            ''', (guild_id, category, fact))
             return cur.fetchone() is not None
 
     @staticmethod
-    def add_fact(category, author_id, fact):
-        if mem.is_fact_already_exists(category, fact):
+    @timed('memory.add_fact')
+    def add_fact(category, author_id, fact, allow_similar=False, guild_id=0):
+        """
+        :param allow_similar: If False, a fact that's a near duplicate of another fact (see library/near_duplicates.py)
+        raises NearDuplicateFact instead of being added.
+        :param guild_id: The guild the fact is added to, 0 adds it for every guild
+        """
+        if mem.is_fact_already_exists(category, fact, guild_id):
             raise sqlite3.IntegrityError("The fact already exists in the database")
 
         author_id = str(author_id)
 
         with get_conn() as conn:
             cur = conn.cursor()
+            words, fact_bands = signature(fact)
+            if not allow_similar:
+                duplicate = find_near_duplicate(cur, words, fact_bands, guild_id)
+                if duplicate is not None:
+                    raise NearDuplicateFact(*duplicate)
+
             cur.execute('''
-                INSERT INTO category_facts (category, added_by, fact)
-                VALUES (?, ?, ?);
-            ''', (category, author_id, fact))
-            conn.commit()
+                INSERT INTO category_facts (guild_id, category, added_by, fact)
+                VALUES (?, ?, ?, ?);
+            ''', (guild_id, category, author_id, fact))
+            fact_id = cur.lastrowid
+            add_bands(cur, fact_id, fact_bands)
+            with updating_indexes():
+                conn.commit()
+                facts_changed(True, [(fact_id, guild_id, category, fact, author_id)])
         return True
 
     @staticmethod
-    def remove_fact(fact):
+    @timed('memory.add_facts')
+    def add_facts(rows, author_id, allow_similar=False, guild_id=0) -> dict:
+        """
+        Adds a batch of facts in one transaction, for imports. Facts that already exist are skipped, and so are near
+        duplicates (of a fact in the database or earlier in the batch) unless allow_similar is True.
+        :param rows: A list of (category, fact) tuples
+        :return: How many facts were inserted, already existed and were near duplicates
+        """
+        author_id = str(author_id)
+        counts = {'inserted': 0, 'exists': 0, 'near_duplicates': 0}
+
+        batch = {}  # fact -> category, the first one wins if a fact is in the batch twice
+        for category, fact in rows:
+            if fact in batch:
+                counts['exists'] += 1
+            else:
+                batch[fact] = category
+        if not batch:
+            return counts
+
+        with get_conn() as conn:
+            cur = conn.cursor()
+            cur.execute(f'''
+                SELECT fact
+                FROM category_facts
+                WHERE guild_id IN (0, ?) AND fact IN ({', '.join('?' * len(batch))});
+            ''', (guild_id, *batch))
+            # A fact can be both a global one and one of the guild's own
+            for (fact,) in set(cur.fetchall()):
+                del batch[fact]
+                counts['exists'] += 1
+
+            if allow_similar:
+                new_facts = {fact: signature(fact)[1] for fact in batch}
+            else:
+                new_facts, near_duplicates = split_near_duplicates(cur, batch, guild_id)
+                counts['near_duplicates'] += len(near_duplicates)
+            if not new_facts:
+                return counts
+
+            inserted = insert_facts(
+                cur, [(batch[fact], fact, fact_bands) for fact, fact_bands in new_facts.items()], author_id, guild_id
+            )
+            with updating_indexes():
+                conn.commit()
+                facts_changed(True, [(fact_id, guild_id, batch[fact], fact, author_id) for fact_id, fact in inserted])
+        counts['inserted'] = len(inserted)
+        return counts
+
+    @staticmethod
+    @timed('memory.remove_fact')
+    def remove_fact(fact, guild_id=0):
+        """
+        Removes a fact that was added in this guild. Global facts can't be removed from inside a guild.
+        """
         with get_conn() as conn:
             cur = conn.cursor()
+            cur.execute('''
+                SELECT id, guild_id, category, fact, added_by
+                FROM category_facts
+                WHERE guild_id = ? AND fact = ?;
+            ''', (guild_id, fact))
+            removed = cur.fetchall()
+            if not removed:
+                raise sqlite3.IntegrityError("The fact does not exist in the database")
             cur.execute('''
                 DELETE FROM category_facts
-                WHERE fact = ?;
-            ''', (fact,))
-            conn.commit()
+                WHERE guild_id = ? AND fact = ?;
+            ''', (guild_id, fact))
+            with updating_indexes():
+                conn.commit()
+                facts_changed(False, removed)
         return True
 
     @staticmethod
-    def list_all_facts() -> dict:
+    @timed('memory.remove_fact_by_id')
+    def remove_fact_by_id(fact_id, guild_id=0):
+        with get_conn() as conn:
+            cur = conn.cursor()
+            cur.execute('''
+                SELECT id, guild_id, category, fact, added_by
+                FROM category_facts
+                WHERE id = ? AND guild_id = ?;
+            ''', (fact_id, guild_id))
+            removed = cur.fetchall()
+            if not removed:
+                raise sqlite3.IntegrityError("The fact does not exist in the database")
+            cur.execute('''
+                DELETE FROM category_facts
+                WHERE id = ?;
+            ''', (fact_id,))
+            with updating_indexes():
+                conn.commit()
+                facts_changed(False, removed)
+        return True
+
+    @staticmethod
+    @timed('memory.list_all_facts')
+    def list_all_facts(guild_id=0) -> dict:
         """
         Returns fact and catagory in a dict
         :return:
         """
-        with get_conn() as conn:
+        with get_conn(readonly=True) as conn:
             cur = conn.cursor()
             cur.execute('''
                 SELECT category, fact
-                FROM category_facts;
-            ''')
+                FROM category_facts
+                WHERE guild_id IN (0, ?);
+            ''', (guild_id,))
             data = cur.fetchall()
 
         # Return a dict with the category as the key and the facts as the value
@@ -163,31 +578,210 @@ class mem:
         return facts_catagory_dict
 
     @staticmethod
-    def add_trigger(trigger, category, user_id):
-        with get_conn() as conn:
+    @timed('memory.list_facts_page')
+    def list_facts_page(after_id=None, before_id=None, limit=10, guild_id=0) -> list:
+        """
+        Gets one page of a guild's facts (and the global ones), ordered by id. Pages are found by the id they start
+        after (or end before) instead of an OFFSET, so every page is just as quick to get as the first one.
+        :return: A list of (id, category, fact) tuples
+        """
+        with get_conn(readonly=True) as conn:
+            cur = conn.cursor()
+            if before_id is not None:
+                rows = scoped_page(cur, '''
+                    SELECT id, category, fact
+                    FROM category_facts
+                    WHERE guild_id = ? AND id < ?
+                    ORDER BY id DESC
+                    LIMIT ?;
+                ''', (before_id,), guild_id, limit)
+                return sorted(rows)[-limit:]
+
+            rows = scoped_page(cur, '''
+                SELECT id, category, fact
+                FROM category_facts
+                WHERE guild_id = ? AND id > ?
+                ORDER BY id
+                LIMIT ?;
+            ''', (after_id if after_id is not None else -1,), guild_id, limit)
+            return sorted(rows)[:limit]
+
+    @staticmethod
+    @timed('memory.export_facts_page')
+    def export_facts_page(after_id=None, limit=1000, guild_id=0) -> list:
+        """
+        Gets the next page of a guild's own facts (not the global ones) for an export, ordered by id.
+        :return: A list of (id, category, fact, added_by) tuples
+        """
+        with get_conn(readonly=True) as conn:
             cur = conn.cursor()
             cur.execute('''
-                INSERT INTO triggers (trigger, added_by, category)
-                VALUES (?, ?, ?);
-            ''', (trigger, str(user_id), category))
-            conn.commit()
+                SELECT id, category, fact, added_by
+                FROM category_facts
+                WHERE guild_id = ? AND id > ?
+                ORDER BY id
+                LIMIT ?;
+            ''', (guild_id, after_id if after_id is not None else -1, limit))
+            return cur.fetchall()
 
     @staticmethod
-    def remove_trigger(trigger):
-        if not mem.does_trigger_exists(trigger):
-            raise sqlite3.IntegrityError("The trigger does not exist in the database")
+    @timed('memory.search_facts')
+    def search_facts(query: str, after=None, before=None, limit=10, guild_id=0) -> list:
+        """
+        Full text search over a guild's facts (and the global ones), best matches first. Every word has to be in the
+        fact, and the last one can be the start of a word. Paged the same way as list_facts_page, by the (score, id)
+        of a row.
+
+        Every fact that matches is ranked, so the best ones come first however many facts match.
+        :return: A list of (id, category, fact, score) tuples, a lower score is a better match
+        """
+        words = re.findall(r'\w+', query)
+        if not words:
+            return []
+        # Each word is quoted so nothing typed can be read as FTS5 syntax
+        match = ' '.join(f'"{word}"' for word in words) + '*'
 
+        where, order, params = '', 'score, id', ()
+        if after is not None:
+            where, params = 'WHERE score > ? OR (score = ? AND id > ?)', (after[0], *after)
+        elif before is not None:
+            where, order, params = 'WHERE score < ? OR (score = ? AND id < ?)', 'score DESC, id DESC', (before[0], *before)
+
+        with get_conn(readonly=True) as conn:
+            cur = conn.cursor()
+            try:
+                cur.execute(f'''
+                    SELECT id, category, fact, score
+                    FROM (
+                        SELECT facts_search.rowid AS id, category_facts.category, category_facts.fact,
+                            bm25(facts_search) AS score
+                        FROM facts_search
+                        JOIN category_facts ON category_facts.id = facts_search.rowid
+                        WHERE facts_search MATCH ? AND category_facts.guild_id IN (0, ?)
+                    )
+                    {where}
+                    ORDER BY {order}
+                    LIMIT ?;
+                ''', (match, guild_id, *params, limit))
+            except sqlite3.OperationalError:
+                # No FTS5 in this SQLite (see migrations.search_facts), so every word is looked for with LIKE
+                # instead. Everything scores the same, so the rows just come in id order.
+                like = ' AND '.join('fact LIKE ?' for _ in words)
+                cur.execute(f'''
+                    SELECT id, category, fact, score
+                    FROM (
+                        SELECT id, category, fact, 0.0 AS score
+                        FROM category_facts
+                        WHERE guild_id IN (0, ?) AND {like}
+                    )
+                    {where}
+                    ORDER BY {order}
+                    LIMIT ?;
+                ''', (guild_id, *(f'%{word}%' for word in words), *params, limit))
+
+            rows = cur.fetchall()
+        return rows[::-1] if before is not None else rows
+
+    @staticmethod
+    @timed('memory.add_trigger')
+    def add_trigger(trigger, category, user_id, guild_id=0):
+        """
+        :param guild_id: The guild the trigger is added to, 0 adds it for every guild
+        """
         with get_conn() as conn:
             cur = conn.cursor()
+            cur.execute('''
+                INSERT INTO triggers (guild_id, trigger, added_by, category)
+                VALUES (?, ?, ?, ?);
+            ''', (guild_id, trigger, str(user_id), category))
+            with updating_indexes():
+                conn.commit()
+                trigger_changed(True, guild_id, trigger, category)
+
+    @staticmethod
+    @timed('memory.remove_trigger')
+    def remove_trigger(trigger, guild_id=0):
+        """
+        Removes a trigger that was added in this guild. Global triggers can't be removed from inside a guild.
+        """
+        with get_conn() as conn:
+            cur = conn.cursor()
+            cur.execute('''
+                SELECT category
+                FROM triggers
+                WHERE guild_id = ? AND trigger = ?;
+            ''', (guild_id, trigger))
+            row = cur.fetchone()
+            if row is None:
+                raise sqlite3.IntegrityError("The trigger does not exist in the database")
+            category = row[0]
             cur.execute('''
                 DELETE FROM triggers
-                WHERE trigger = ?;
-            ''', (trigger,))
-            conn.commit()
+                WHERE guild_id = ? AND trigger = ?;
+            ''', (guild_id, trigger))
+            with updating_indexes():
+                conn.commit()
+                trigger_changed(False, guild_id, trigger, category)
+
+    @staticmethod
+    @timed('memory.load_indexes')
+    def load_indexes(reload=False, guild_id=0) -> trigger_set:
+        """
+        Fills a guild's trigger and category indexes from the database, if they aren't loaded already or reload is
+        True (eg, after the triggers table was changed without going through mem.add_trigger).
+        :return: The guild's trigger_set
+        """
+        sync_snapshot()
+        with trigger_sets.lock:
+            if reload:
+                trigger_sets.forget(guild_id)
+            return trigger_sets.get(guild_id)
+
+    @staticmethod
+    @timed('memory.load_autocomplete')
+    def load_autocomplete(reload=False, guild_id=0) -> dict:
+        """
+        Fills a guild's autocomplete indexes from the database, if they aren't loaded already or reload is True.
+        :return: {'categories': prefix_index, 'triggers': prefix_index, 'facts': prefix_index}
+        """
+        sync_snapshot()
+        with autocomplete_sets.lock:
+            if reload:
+                autocomplete_sets.forget(guild_id)
+            return autocomplete_sets.get(guild_id)
+
+    @staticmethod
+    @timed('memory.autocomplete_categories')
+    def autocomplete_categories(prefix: str, limit=25, guild_id=0) -> list:
+        """
+        :return: The guild's categories and the global ones
+        """
+        names = mem.load_autocomplete(guild_id=guild_id)['categories'].search(prefix, limit)
+        if guild_id:
+            names += mem.load_autocomplete()['categories'].search(prefix, limit)
+            names = sorted(set(names), key=str.lower)[:limit]
+        return names
+
+    @staticmethod
+    @timed('memory.autocomplete_triggers')
+    def autocomplete_triggers(prefix: str, limit=25, guild_id=0) -> list:
+        """
+        :return: Only the guild's own triggers, since those are the ones it can remove
+        """
+        return mem.load_autocomplete(guild_id=guild_id)['triggers'].search(prefix, limit)
 
     @staticmethod
+    @timed('memory.autocomplete_facts')
+    def autocomplete_facts(prefix: str, limit=25, guild_id=0) -> list:
+        """
+        :return: A list of (id, fact) tuples, only the guild's own facts (so nothing for guild 0)
+        """
+        return mem.load_autocomplete(guild_id=guild_id)['facts'].search(prefix, limit)
+
+    @staticmethod
+    @timed('memory.get_all_triggers')
     def get_all_triggers():
-        with get_conn() as conn:
+        with get_conn(readonly=True) as conn:
             cur = conn.cursor()
             cur.execute('''
                 SELECT trigger
@@ -196,8 +790,9 @@ class mem:
             return cur.fetchall()
 
     @staticmethod
+    @timed('memory.get_all_categories')
     def get_all_categories():
-        with get_conn() as conn:
+        with get_conn(readonly=True) as conn:
             cur = conn.cursor()
             cur.execute('''
                 SELECT category
@@ -206,111 +801,371 @@ class mem:
             return cur.fetchall()
 
     @staticmethod
-    def len_triggers(category=None):
-        with get_conn() as conn:
+    @timed('memory.list_triggers_page')
+    def list_triggers_page(after=None, before=None, limit=25, guild_id=0) -> list:
+        """
+        Gets one page of a guild's triggers (and the global ones), in alphabetical order. Works the same way as
+        list_facts_page, but pages by the (trigger, guild_id) of a row, since the guild can have a trigger with the
+        same name as a global one.
+        :return: A list of (trigger, category, guild_id) tuples
+        """
+        with get_conn(readonly=True) as conn:
+            cur = conn.cursor()
+            # The trigger >= / <= is what lets SQLite walk the (guild_id, trigger) index from the right place
+            if before is not None:
+                rows = scoped_page(cur, '''
+                    SELECT trigger, category, guild_id
+                    FROM triggers
+                    WHERE guild_id = ? AND trigger <= ? AND (trigger < ? OR guild_id < ?)
+                    ORDER BY trigger DESC
+                    LIMIT ?;
+                ''', (before[0], *before), guild_id, limit)
+                return sorted(rows, key=lambda row: (row[0], row[2]))[-limit:]
+
+            after = after if after is not None else ('', -1)
+            rows = scoped_page(cur, '''
+                SELECT trigger, category, guild_id
+                FROM triggers
+                WHERE guild_id = ? AND trigger >= ? AND (trigger > ? OR guild_id > ?)
+                ORDER BY trigger
+                LIMIT ?;
+            ''', (after[0], *after), guild_id, limit)
+            return sorted(rows, key=lambda row: (row[0], row[2]))[:limit]
+
+    @staticmethod
+    @timed('memory.list_categories_page')
+    def list_categories_page(after=None, before=None, limit=25, guild_id=0) -> list:
+        """
+        Gets one page of the categories that have triggers in a guild (or globally), in alphabetical order. Works
+        the same way as list_facts_page.
+        :return: A list of (category,) tuples
+        """
+        with get_conn(readonly=True) as conn:
+            cur = conn.cursor()
+            if before is not None:
+                rows = scoped_page(cur, '''
+                    SELECT DISTINCT category
+                    FROM triggers
+                    WHERE guild_id = ? AND category < ?
+                    ORDER BY category DESC
+                    LIMIT ?;
+                ''', (before,), guild_id, limit)
+                # A category can have triggers in the guild and globally
+                return sorted(set(rows))[-limit:]
+
+            rows = scoped_page(cur, '''
+                SELECT DISTINCT category
+                FROM triggers
+                WHERE guild_id = ? AND category > ?
+                ORDER BY category
+                LIMIT ?;
+            ''', (after if after is not None else '',), guild_id, limit)
+            return sorted(set(rows))[:limit]
+
+    @staticmethod
+    @timed('memory.len_triggers')
+    def len_triggers(category=None, guild_id=0):
+        with get_conn(readonly=True) as conn:
             cur = conn.cursor()
             if category is None:
                 cur.execute('''
                     SELECT COUNT(*)
-                    FROM triggers;
-                ''')
+                    FROM triggers
+                    WHERE guild_id IN (0, ?);
+                ''', (guild_id,))
             else:
                 cur.execute('''
                     SELECT COUNT(*)
                     FROM triggers
-                    WHERE category = ?;
-                ''', (category,))
+                    WHERE guild_id IN (0, ?) AND category = ?;
+                ''', (guild_id, category))
             return cur.fetchone()[0]
 
     @staticmethod
-    def len_facts(category=None):
-        with get_conn() as conn:
+    @timed('memory.len_facts')
+    def len_facts(category=None, guild_id=0):
+        with get_conn(readonly=True) as conn:
             cur = conn.cursor()
             if category is None:
                 cur.execute('''
                     SELECT COUNT(*)
-                    FROM category_facts;
-                ''')
+                    FROM category_facts
+                    WHERE guild_id IN (0, ?);
+                ''', (guild_id,))
             else:
                 cur.execute('''
                     SELECT COUNT(*)
                     FROM category_facts
-                    WHERE category = ?;
-                ''', (category,))
+                    WHERE guild_id IN (0, ?) AND category = ?;
+                ''', (guild_id, category))
             return cur.fetchone()[0]
 
     @staticmethod
-    def is_trigger(msg: str) -> dict:
-        triggers = mem.get_all_triggers()
-        for trigger in triggers:
-            # Detects if the trigger and the message are similiar using the difflib library
-            if SequenceMatcher(None, trigger[0], msg).ratio() > 0.8:
-                # Finds the category of the trigger
-                with get_conn() as conn:
-                    cur = conn.cursor()
-                    cur.execute('''
-                        SELECT category
-                        FROM triggers
-                        WHERE trigger = ?;
-                    ''', (msg,))
-                    category = cur.fetchone()
-
-                return {'result': True, 'trigger': trigger[0], 'category': category[0]}
+    @timed('memory.is_trigger')
+    def is_trigger(msg: str, guild_id=0) -> dict:
+        # Detects if the message is similiar to a trigger. Same as a difflib ratio above 0.8, but only the triggers
+        # that share enough letters with the message get compared. The guild's own triggers win a tie.
+        best = None
+        for triggers in guild_trigger_sets(guild_id):
+            match = triggers.triggers.lookup(msg, 0.8)
+            if match is not None and (best is None or match[1] > best[1]):
+                best = (match[0], match[1], triggers.triggers.get(match[0]))
+        if best is not None:
+            return {'result': True, 'trigger': best[0], 'category': best[2]}
 
         return {'result': False, 'trigger': None, 'category': None}
 
     @staticmethod
-    def find_most_similar(trigger) -> str:
+    @timed('memory.find_most_similar')
+    def find_most_similar(trigger, guild_id=0) -> str:
         """
-        This function is used to find the most similar trigger to the one provided.
-        :return: The most similar trigger or the original trigger if no close match is found
+        This function is used to find the most similar category to the trigger provided.
+        :return: The most similar category or the original trigger if no close match is found
         """
-        category = mem.get_all_categories()
-        most_similar = trigger
-        highest_similarity = 0
         similarity_threshold = 0.8  # Define a threshold for similarity
 
-        for category in category:
-            category = category[0]
-            similarity = SequenceMatcher(None, trigger, category).ratio()
-            if similarity > highest_similarity:
-                highest_similarity = similarity
-                most_similar = category
-
-        # Return the original trigger if no match exceeds the threshold
-        if highest_similarity < similarity_threshold:
+        best = None
+        for triggers in guild_trigger_sets(guild_id):
+            match = triggers.categories.lookup(trigger, similarity_threshold, inclusive=True)
+            if match is not None and (best is None or match[1] > best[1]):
+                best = match
+        # Return the original trigger if no match reaches the threshold
+        if best is None:
             return trigger
 
-        return most_similar
+        return best[0]
 
     @staticmethod
-    def get_fact(trigger: str) -> str:
+    @timed('memory.similar_triggers')
+    def similar_triggers(trigger: str, guild_id=0) -> list:
         """
-        This function is used to get a random fact from the database based on the trigger provided.
-        :param trigger:
-        :return:
+        Finds the triggers (in the guild or global) that are close enough to this one that a message meant for one
+        could set off the other (the same check is_trigger does).
+        :return: A list of (trigger, category, ratio) tuples, most similar first, not including the trigger itself
         """
-        with get_conn() as conn:
+        results = []
+        for triggers in guild_trigger_sets(guild_id):
+            results += [
+                (other, triggers.triggers.get(other), ratio)
+                for other, ratio in triggers.triggers.search(trigger, 0.8)
+                if other != trigger
+            ]
+        results.sort(key=lambda result: -result[2])
+        return results
+
+    @staticmethod
+    @timed('memory.trigger_collisions')
+    def trigger_collisions(guild_id=0) -> list:
+        """
+        Finds every pair of triggers in a guild (including the global ones) that are too similar to each other,
+        without comparing every trigger to every other trigger (see trigger_index.similar_pairs).
+        :return: A list of (trigger, category, other trigger, other category, ratio) tuples, the pairs in different
+        categories first, then the most similar
+        """
+        sets = guild_trigger_sets(guild_id)
+        if len(sets) == 1:
+            index = sets[0].triggers
+        else:
+            # The guild's and the global triggers can collide with each other too, so they go in one index
+            index = trigger_index()
+            for triggers in reversed(sets):
+                for trigger, category in list(triggers.triggers.values.items()):
+                    index.add(trigger, category)
+
+        results = [
+            (trigger, index.get(trigger), other, index.get(other), ratio)
+            for trigger, other, ratio in index.similar_pairs(0.8)
+        ]
+        results.sort(key=lambda result: (result[1] == result[3], -result[4], result[0]))
+        return results
+
+    @staticmethod
+    @timed('memory.match_message')
+    def match_message(content: str, guild_id=0) -> dict:
+        """
+        Finds the first trigger in a message, out of the guild's triggers and the global ones. Triggers (including
+        multi-word ones) that are in the message exactly are all found in one pass, and any words before the first
+        exact match are checked for a close (fuzzy) match.
+        :return: The same dict as mem.is_trigger
+        """
+        sets = guild_trigger_sets(guild_id)
+        with timer('match.normalize'):
+            content = normalize(content)
+            words = content.split(' ')
+
+        # Most messages have nothing to do with any trigger, those stop here.
+        with timer('match.prefilter'):
+            may_match = sets[0].prefilter.filter_words(words)
+            for triggers in sets[1:]:
+                may_match = [a or b for a, b in zip(may_match, triggers.prefilter.filter_words(words))]
+            prefilter_counts.count(may_match)
+        if not any(may_match):
+            return {'result': False, 'trigger': None, 'category': None}
+
+        # The word each exact match starts on, as (length, trigger, category). Matches are sorted by where they start,
+        # longest first, and the guild's own triggers are scanned first so they win a tie.
+        exact_matches = {}
+        with timer('match.scan'):
+            for triggers in sets:
+                for start, end, trigger in triggers.phrases.scan(content):
+                    match = exact_matches.get(start)
+                    if match is None or end - start > match[0]:
+                        exact_matches[start] = (end - start, trigger, triggers.triggers.get(trigger))
+
+        position = 0
+        for word, word_may_match in zip(words, may_match):
+            match = exact_matches.get(position)
+            if match is not None:
+                return {'result': True, 'trigger': match[1], 'category': match[2]}
+
+            if word_may_match:
+                # Only valid for as long as none of the triggers it was worked out from change
+                generation = tuple(triggers.generation for triggers in sets)
+                is_trigger = word_matches.get((guild_id, word), generation)
+                if is_trigger is missing:
+                    closest_match = mem.find_most_similar(word, guild_id)
+                    is_trigger = mem.is_trigger(closest_match, guild_id)
+                    word_matches.put((guild_id, word), generation, is_trigger)
+                if is_trigger['result']:
+                    return is_trigger
+            position += len(word) + 1
+
+        return {'result': False, 'trigger': None, 'category': None}
+
+    @staticmethod
+    @timed('memory.match_exact')
+    def match_exact(content: str, guild_id=0) -> dict:
+        """
+        Finds the first word in a message that is a trigger, straight from the database. Used while the indexes are
+        still loading at startup, so it only finds one-word triggers that are in the message exactly.
+        :return: The same dict as mem.is_trigger
+        """
+        # A message could be thousands of words, but only so many fit in one query
+        words = list(dict.fromkeys(normalize(content).split(' ')))[:500]
+        with get_conn(readonly=True) as conn:
             cur = conn.cursor()
             cur.execute(f'''
-                SELECT fact
-                FROM category_facts
-                WHERE category = ?
-                ORDER BY RANDOM()
-                LIMIT 1;
-            ''', (trigger,))
-            data = cur.fetchone()
-        if data is not None:
-            return data[0]
-        return "There are no fun facts found for this category. :("
+                SELECT guild_id, trigger, category
+                FROM triggers
+                WHERE guild_id IN (0, ?) AND trigger IN ({', '.join('?' * len(words))});
+            ''', (guild_id, *words))
+            # The guild's own trigger wins if it has one with the same name as a global one
+            found = {trigger: category for _, trigger, category in sorted(cur.fetchall())}
+
+        for word in words:
+            if word in found:
+                return {'result': True, 'trigger': word, 'category': found[word]}
+        return {'result': False, 'trigger': None, 'category': None}
 
     @staticmethod
-    def get_fact_author(fact: str) -> str:
-        with get_conn() as conn:
-            cur = conn.cursor()
-            cur.execute('''
-                SELECT added_by
-                FROM category_facts
-                WHERE fact = ?;
-            ''', (fact,))
-            return cur.fetchone()[0]
\ No newline at end of file
+    def use_snapshot(snapshot):
+        """
+        Makes this process read triggers and facts from a shared snapshot (a library.snapshot.shared_snapshot)
+        from now on, and publish a new one (with what changed) after the changes it makes.
+        :return:
+        """
+        global shared
+        snapshot.refresh()
+        shared = snapshot
+        mem.reload_caches()
+
+    @staticmethod
+    @timed('memory.reload_caches')
+    def reload_caches():
+        """
+        Throws away everything kept in memory about triggers and facts. Call this after the tables were changed
+        without going through mem (eg, a bulk import), so nothing stale gets used. Everything is loaded again the
+        next time it's needed.
+        :return:
+        """
+        # In the same order as sync_snapshot takes them
+        with trigger_sets.lock, sampler.lock:
+            sampler.forget()
+            facts_cache.forget()
+            trigger_sets.forget()
+        autocomplete_sets.forget()
+        # The rebuilt trigger sets get new generations anyway, this just frees the memory straight away
+        word_matches.clear()
+
+    @staticmethod
+    @timed('memory.load_category_facts')
+    def load_category_facts(category, guild_id=0):
+        """
+        Loads the fact ids of a category into the sampler and its facts into the cache, if they aren't already.
+        The global facts and a guild's own facts are loaded separately (see category_keys).
+        :return:
+        """
+        sync_snapshot()
+        # Held while reading so a fact added or removed at the same time can't be missed by the sampler or cache.
+        with sampler.lock:
+            for key in category_keys(category, guild_id):
+                if sampler.is_loaded(key):
+                    if shared is not None or key in facts_cache or not facts_cache.fits(sampler.count(key)):
+                        continue
+
+                if shared is not None:
+                    # The facts themselves stay in the snapshot, only the ids are needed to pick one
+                    sampler.load(key, shared.current.category_fact_ids(category, key[0]))
+                    continue
+
+                with get_conn(readonly=True) as conn:
+                    cur = conn.cursor()
+                    cur.execute('''
+                        SELECT id, fact, added_by
+                        FROM category_facts
+                        WHERE guild_id = ? AND category = ?;
+                    ''', key)
+                    rows = cur.fetchall()
+
+                sampler.load(key, [row[0] for row in rows])
+                facts_cache.put(key, rows)
+
+    @staticmethod
+    @timed('memory.get_random_fact')
+    def get_random_fact(category, channel_id=None, guild_id=0):
+        """
+        Gets a random fact from a category, along with its id and who added it.
+        :param channel_id: If given, facts won't repeat in that channel until every fact in the category has been sent.
+        :param guild_id: The fact is picked from the guild's own facts and the global ones
+        :return: A dict like {'id': 1, 'fact': '...', 'added_by': '...'}, or None if the category has no facts
+        """
+        mem.load_category_facts(category, guild_id)
+        keys = category_keys(category, guild_id)
+
+        # A fact could be removed between picking it and reading it, so try again a few times if that happens.
+        for _ in range(3):
+            picked = sampler.pick_from(keys, channel_id)
+            if picked is None:
+                break
+            key, fact_id = picked
+
+            data = facts_cache.get(key, fact_id)
+            if data is None and shared is not None:
+                data = shared.current.get_fact(fact_id)
+            if data is None:
+                # The category is too big to cache (or the fact is newer than the snapshot), so only this fact is read.
+                with get_conn(readonly=True) as conn:
+                    cur = conn.cursor()
+                    cur.execute('''
+                        SELECT fact, added_by
+                        FROM category_facts
+                        WHERE id = ?;
+                    ''', (fact_id,))
+                    data = cur.fetchone()
+            if data is not None:
+                return {'id': fact_id, 'fact': data[0], 'added_by': data[1]}
+        return None
+
+    @staticmethod
+    @timed('memory.get_fact')
+    def get_fact(trigger: str, channel_id=None, guild_id=0) -> str:
+        """
+        This function is used to get a random fact from the database based on the trigger provided.
+        :param trigger:
+        :param channel_id: If given, facts won't repeat in that channel until every fact in the category has been sent.
+        :return:
+        """
+        fact = mem.get_random_fact(trigger, channel_id, guild_id)
+        if fact is not None:
+            return fact['fact']
+        return "There are no fun facts found for this category. :("
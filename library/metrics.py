@@ -0,0 +1,172 @@
+from contextlib import contextmanager
+import functools
+import asyncio
+import threading
+import inspect
+import bisect
+import time
+
+# Upper bounds (in seconds) of the histogram buckets, from 10 microseconds to 10 seconds.
+BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'),
+)
+
+class histogram:
+    """
+    Counts how long something took, in fixed buckets, the same way Prometheus histograms do.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        index = bisect.bisect_left(BUCKETS, seconds)
+        with self.lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += seconds
+
+    def percentile(self, p) -> float:
+        """
+        :return: The upper bound of the bucket the p-th percentile falls in, in seconds
+        """
+        with self.lock:
+            if not self.count:
+                return 0.0
+            rank = p * self.count
+            seen = 0
+            for bound, count in zip(BUCKETS, self.counts):
+                seen += count
+                if seen >= rank:
+                    return bound
+            return BUCKETS[-1]
+
+    def summary(self) -> dict:
+        return {
+            'count': self.count,
+            'mean': self.sum / self.count if self.count else 0.0,
+            'p50': self.percentile(0.5),
+            'p99': self.percentile(0.99),
+        }
+
+histograms = {}  # name -> histogram
+histograms_lock = threading.Lock()
+# name -> function returning a dict of numbers (counters, cache sizes, etc.), read when the stats are shown
+collectors = {}
+
+def get_histogram(name) -> histogram:
+    hist = histograms.get(name)
+    if hist is None:
+        with histograms_lock:
+            hist = histograms.setdefault(name, histogram())
+    return hist
+
+def observe(name, seconds):
+    get_histogram(name).observe(seconds)
+
+@contextmanager
+def timer(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - started)
+
+def timed(name):
+    """
+    Decorator that times every call of a function (or coroutine function) into the named histogram.
+    """
+    def decorator(func):
+        hist = get_histogram(name)
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    hist.observe(time.perf_counter() - started)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                hist.observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+def register_collector(name, func):
+    collectors[name] = func
+
+def collect() -> dict:
+    """
+    :return: {collector name: the dict it returned}
+    """
+    results = {}
+    for name, func in list(collectors.items()):
+        try:
+            results[name] = func()
+        except Exception as err:
+            results[name] = {'error': str(err)}
+    return results
+
+def flatten(data: dict, prefix=''):
+    for key, value in data.items():
+        name = f'{prefix}_{key}' if prefix else str(key)
+        if isinstance(value, dict):
+            yield from flatten(value, name)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield name, value
+
+def clean_name(name: str) -> str:
+    return ''.join(letter if letter.isalnum() else '_' for letter in name)
+
+def render_prometheus() -> str:
+    """
+    :return: Every histogram and collector, in the Prometheus text format
+    """
+    lines = []
+    for name, hist in sorted(histograms.items()):
+        metric = f'factry_{clean_name(name)}_seconds'
+        lines.append(f'# TYPE {metric} histogram')
+        with hist.lock:
+            cumulative = 0
+            for bound, count in zip(BUCKETS, hist.counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{metric}_bucket{{le="{le}"}} {cumulative}')
+            lines.append(f'{metric}_sum {hist.sum}')
+            lines.append(f'{metric}_count {hist.count}')
+
+    for collector, data in sorted(collect().items()):
+        for key, value in flatten(data):
+            metric = f'factry_{clean_name(collector)}_{clean_name(key)}'
+            lines.append(f'# TYPE {metric} gauge')
+            lines.append(f'{metric} {value}')
+
+    return '\n'.join(lines) + '\n'
+
+async def start_endpoint(host='127.0.0.1', port=9464):
+    """
+    Serves render_prometheus() on http://host:port/metrics.
+    :return: The aiohttp runner, call .cleanup() on it to stop the server
+    """
+    from aiohttp import web  # aiohttp comes with hikari
+
+    async def handler(_):
+        # The collectors can wait on locks, which mustn't hold up the gateway
+        text = await asyncio.get_running_loop().run_in_executor(None, render_prometheus)
+        return web.Response(text=text, content_type='text/plain', charset='utf-8')
+
+    app = web.Application()
+    app.router.add_get('/metrics', handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
@@ -0,0 +1,313 @@
+from library.default_categories import SEED_AUTHOR, category_fact_dict
+from library.near_duplicates import signature, add_bands
+import logging
+import sqlite3
+import os
+
+# Every change to the database's structure, in order. The database stores how many of these it has had in
+# PRAGMA user_version, so each one only ever runs once. Never edit or reorder a migration that has shipped,
+# add a new one to the end instead. Each one should still be safe to run twice.
+MIGRATIONS = []
+
+def migration(func):
+    MIGRATIONS.append(func)
+    return func
+
+def get_version(conn) -> int:
+    return conn.execute('PRAGMA user_version;').fetchone()[0]
+
+def migrate(conn):
+    """
+    Brings the database up to the latest version. Each migration runs in its own transaction, together with
+    the version bump, so a failed migration leaves the database at the last version that worked.
+    :return: The version the database is now at
+    """
+    version = get_version(conn)
+    if version >= len(MIGRATIONS):
+        return version
+
+    for number, step in enumerate(MIGRATIONS[version:], start=version + 1):
+        logging.info(f"Migrating the database to version {number} ({step.__name__})")
+        cur = conn.cursor()
+        cur.execute('BEGIN;')
+        try:
+            step(cur)
+            cur.execute(f'PRAGMA user_version = {number};')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    return get_version(conn)
+
+@migration
+def create_tables(cur):
+    """
+    Creates the tables if they don't exist, or adds any columns they're missing if they do.
+    """
+    # Function I pulled from another project.
+    # Using this dict, it formats the SQL query to create the tables if they don't exist
+    table_dict = {
+        'triggers': {
+            'trigger': 'TEXT NOT NULL UNIQUE PRIMARY KEY',
+            'added_by': 'TEXT NOT NULL',  # Set to be a UUID
+            # category is connected to the category_facts table's category column
+            'category': 'TEXT NOT NULL REFERENCES category_facts(category)'
+        },
+        'category_facts': {
+            'id': 'INTEGER PRIMARY KEY AUTOINCREMENT',
+            'category': 'TEXT NOT NULL',
+            'added_by': 'TEXT NOT NULL',  # Set to be a UUID
+            'fact': 'TEXT NOT NULL UNIQUE'
+        },
+        # Remembers which version of each categories/*.txt file was last imported, so unchanged ones are skipped
+        'imported_files': {
+            'path': 'TEXT NOT NULL UNIQUE PRIMARY KEY',
+            'hash': 'TEXT NOT NULL',  # sha256 of the file's contents
+            'size': 'INTEGER NOT NULL',
+            'mtime': 'INTEGER NOT NULL'  # In nanoseconds
+        }
+    }
+
+    for table_name, columns in table_dict.items():
+        cur.execute('''
+            SELECT name
+            FROM sqlite_master
+            WHERE type='table' AND name=?;
+        ''', (table_name,))
+        table_exist = cur.fetchone() is not None
+
+        # If the table exists, check and update columns
+        if table_exist:
+            cur.execute(f'PRAGMA table_info({table_name});')
+            existing_columns = {column_info[1] for column_info in cur.fetchall()}
+            for column_name, column_properties in columns.items():
+                # If the column doesn't exist, add it
+                if column_name not in existing_columns:
+                    cur.execute(f'ALTER TABLE {table_name} ADD COLUMN {column_name} {column_properties};')
+
+        # If the table doesn't exist, create it with columns
+        else:
+            columns_str = ', '.join(
+                [f'{column_name} {column_properties}' for column_name, column_properties in columns.items()]
+            )
+            try:
+                cur.execute(f'CREATE TABLE {table_name} ({columns_str});')
+            except sqlite3.OperationalError as e:
+                logging.info(f"Could not create table '{table_name}'. Error: {e}")
+                exit(1)
+
+@migration
+def index_categories(cur):
+    """
+    Indexes the category columns, which get_fact, len_facts, len_triggers and does_category_exists all search by.
+    The fact and trigger columns are already indexed by their UNIQUE constraints.
+    """
+    cur.execute('CREATE INDEX IF NOT EXISTS category_facts_category ON category_facts (category);')
+    cur.execute('CREATE INDEX IF NOT EXISTS triggers_category ON triggers (category);')
+    # Gives the query planner statistics about the new indexes
+    cur.execute('ANALYZE;')
+
+@migration
+def search_facts(cur):
+    """
+    Adds a full text search index over the facts. It's an FTS5 table that reads its text from category_facts
+    (so the facts aren't stored twice), and the triggers below keep it in step with every insert, update and delete.
+    """
+    try:
+        cur.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS facts_search USING fts5(
+                fact,
+                category UNINDEXED,
+                content='category_facts',
+                content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            );
+        ''')
+    except sqlite3.OperationalError as e:
+        # Some SQLite builds come without FTS5, /fact search falls back to a slower LIKE search on those
+        logging.warning(f"Could not create the fact search index, searching will be slower. Error: {e}")
+        return
+
+    cur.execute('''
+        CREATE TRIGGER IF NOT EXISTS category_facts_search_insert AFTER INSERT ON category_facts BEGIN
+            INSERT INTO facts_search (rowid, fact, category) VALUES (new.id, new.fact, new.category);
+        END;
+    ''')
+    cur.execute('''
+        CREATE TRIGGER IF NOT EXISTS category_facts_search_delete AFTER DELETE ON category_facts BEGIN
+            INSERT INTO facts_search (facts_search, rowid, fact, category)
+            VALUES ('delete', old.id, old.fact, old.category);
+        END;
+    ''')
+    cur.execute('''
+        CREATE TRIGGER IF NOT EXISTS category_facts_search_update AFTER UPDATE ON category_facts BEGIN
+            INSERT INTO facts_search (facts_search, rowid, fact, category)
+            VALUES ('delete', old.id, old.fact, old.category);
+            INSERT INTO facts_search (rowid, fact, category) VALUES (new.id, new.fact, new.category);
+        END;
+    ''')
+    # Indexes the facts that were already there
+    cur.execute("INSERT INTO facts_search (facts_search) VALUES ('rebuild');")
+
+@migration
+def fact_bands(cur):
+    """
+    Adds the near duplicate index (see library/near_duplicates.py) and fills it in for the facts already there.
+    Bands are added by mem.add_fact and the importer, since they're worked out in Python, but the trigger below
+    removes them when a fact is deleted, however it gets deleted.
+    """
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS fact_bands (
+            band INTEGER NOT NULL,
+            fact_id INTEGER NOT NULL,
+            PRIMARY KEY (band, fact_id)
+        ) WITHOUT ROWID;
+    ''')
+    cur.execute('CREATE INDEX IF NOT EXISTS fact_bands_fact_id ON fact_bands (fact_id);')
+    cur.execute('''
+        CREATE TRIGGER IF NOT EXISTS category_facts_bands_delete AFTER DELETE ON category_facts BEGIN
+            DELETE FROM fact_bands WHERE fact_id = old.id;
+        END;
+    ''')
+
+    cur.execute('''
+        SELECT id, fact
+        FROM category_facts;
+    ''')
+    for fact_id, fact in cur.fetchall():
+        _, fact_bands = signature(fact)
+        add_bands(cur, fact_id, fact_bands)
+
+@migration
+def partition_by_guild(cur):
+    """
+    Gives every trigger and fact a guild_id, so each server can have its own. 0 means global (used by every server),
+    which is what everything that's already there becomes.
+
+    Triggers and facts only have to be unique within a guild now, and SQLite can't change a UNIQUE constraint,
+    so both tables are rebuilt. Fact ids are kept, since the search index and fact_bands refer to them.
+    Dropping the old category_facts also drops the triggers on it, so those are made again at the end.
+    """
+    # Left over if the bot was stopped partway through this migration before
+    cur.execute('DROP TABLE IF EXISTS triggers_new;')
+    cur.execute('DROP TABLE IF EXISTS category_facts_new;')
+
+    cur.execute('''
+        CREATE TABLE triggers_new (
+            trigger TEXT NOT NULL,
+            added_by TEXT NOT NULL,
+            category TEXT NOT NULL,
+            guild_id INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (guild_id, trigger)
+        );
+    ''')
+    cur.execute('''
+        INSERT INTO triggers_new (trigger, added_by, category, guild_id)
+        SELECT trigger, added_by, category, 0
+        FROM triggers;
+    ''')
+    cur.execute('DROP TABLE triggers;')
+    cur.execute('ALTER TABLE triggers_new RENAME TO triggers;')
+    cur.execute('CREATE INDEX IF NOT EXISTS triggers_guild_category ON triggers (guild_id, category);')
+
+    cur.execute('''
+        CREATE TABLE category_facts_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            category TEXT NOT NULL,
+            added_by TEXT NOT NULL,
+            fact TEXT NOT NULL,
+            guild_id INTEGER NOT NULL DEFAULT 0,
+            UNIQUE (guild_id, fact)
+        );
+    ''')
+    cur.execute('''
+        INSERT INTO category_facts_new (id, category, added_by, fact, guild_id)
+        SELECT id, category, added_by, fact, 0
+        FROM category_facts;
+    ''')
+    # So the ids of deleted facts still don't get used again
+    cur.execute("SELECT seq FROM sqlite_sequence WHERE name = 'category_facts';")
+    sequence = cur.fetchone()
+    cur.execute('DROP TABLE category_facts;')
+    cur.execute('ALTER TABLE category_facts_new RENAME TO category_facts;')
+    if sequence is not None:
+        cur.execute("DELETE FROM sqlite_sequence WHERE name = 'category_facts';")
+        cur.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('category_facts', ?);", sequence)
+    cur.execute('CREATE INDEX IF NOT EXISTS category_facts_guild_category ON category_facts (guild_id, category);')
+    # Paging through a guild's facts by id
+    cur.execute('CREATE INDEX IF NOT EXISTS category_facts_guild_id ON category_facts (guild_id, id);')
+
+    cur.execute('''
+        SELECT name
+        FROM sqlite_master
+        WHERE type='table' AND name='facts_search';
+    ''')
+    if cur.fetchone() is not None:
+        cur.execute('''
+            CREATE TRIGGER IF NOT EXISTS category_facts_search_insert AFTER INSERT ON category_facts BEGIN
+                INSERT INTO facts_search (rowid, fact, category) VALUES (new.id, new.fact, new.category);
+            END;
+        ''')
+        cur.execute('''
+            CREATE TRIGGER IF NOT EXISTS category_facts_search_delete AFTER DELETE ON category_facts BEGIN
+                INSERT INTO facts_search (facts_search, rowid, fact, category)
+                VALUES ('delete', old.id, old.fact, old.category);
+            END;
+        ''')
+        cur.execute('''
+            CREATE TRIGGER IF NOT EXISTS category_facts_search_update AFTER UPDATE ON category_facts BEGIN
+                INSERT INTO facts_search (facts_search, rowid, fact, category)
+                VALUES ('delete', old.id, old.fact, old.category);
+                INSERT INTO facts_search (rowid, fact, category) VALUES (new.id, new.fact, new.category);
+            END;
+        ''')
+    cur.execute('''
+        CREATE TRIGGER IF NOT EXISTS category_facts_bands_delete AFTER DELETE ON category_facts BEGIN
+            DELETE FROM fact_bands WHERE fact_id = old.id;
+        END;
+    ''')
+    cur.execute('ANALYZE;')
+
+@migration
+def imported_lines(cur):
+    """
+    Remembers each line imported from each category file and the fact it became, so a changed file only needs its
+    added and removed lines looked at (see importer.sync_file). Files that were imported before are filled in from
+    what they have in them now, but only for the lines that are already facts, so any lines added since then still
+    get imported.
+
+    There's no telling anymore which facts came from a file, so a line is only tied to its fact if the bot added it
+    to the file's category and it isn't a default fact. Otherwise the fact was added some other way (a default
+    category, a command), and the line gets no fact, so taking it out of the file later doesn't delete the fact.
+    """
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS imported_lines (
+            path TEXT NOT NULL,
+            line TEXT NOT NULL,
+            fact_id INTEGER,  -- NULL if the line wasn't added (eg, it was a near duplicate)
+            PRIMARY KEY (path, line)
+        ) WITHOUT ROWID;
+    ''')
+    cur.execute('CREATE INDEX IF NOT EXISTS imported_lines_fact_id ON imported_lines (fact_id);')
+
+    cur.execute('''
+        SELECT path
+        FROM imported_files;
+    ''')
+    default_facts = {fact for facts in category_fact_dict.values() for fact in facts}
+    for (path,) in cur.fetchall():
+        if not os.path.exists(path):
+            continue
+        category = os.path.basename(path)[:-len('.txt')]
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                cur.execute('''
+                    INSERT OR IGNORE INTO imported_lines (path, line, fact_id)
+                    SELECT ?, fact, CASE WHEN category = ? AND added_by = ? AND ? THEN id END
+                    FROM category_facts
+                    WHERE guild_id = 0 AND fact = ?;
+                ''', (path, category, SEED_AUTHOR, line not in default_facts, line))
@@ -0,0 +1,183 @@
+from library.phrase_matcher import normalize
+import functools
+import hashlib
+import sqlite3
+import struct
+
+# Finds facts that are the same as another fact apart from punctuation, word order or a word or two, without
+# comparing against every fact in the database.
+#
+# Each fact gets a MinHash signature of its set of words: NUM_BANDS * ROWS_PER_BAND numbers, where each number
+# is the same for two facts with a chance equal to how many words they share (the Jaccard similarity).
+# The signature is cut into bands, and each band is hashed into one number that is stored in the fact_bands table.
+# Two facts only get compared when at least one of their bands is the same, which almost always happens for
+# near duplicates and almost never for unrelated facts. With 8 bands of 4, facts sharing 80% of their words
+# are found 98% of the time, while facts sharing 20% only have a 1% chance of being compared at all.
+
+NUM_BANDS = 8
+ROWS_PER_BAND = 4
+# Facts whose word sets are at least this similar are near duplicates
+SIMILARITY = 0.75
+# How many band hashes find_near_duplicates looks up in one query, to stay under SQLite's limit on parameters
+BANDS_PER_QUERY = 900
+
+# Every word is hashed once into enough bytes for all of its signature numbers
+SIGNATURE = struct.Struct(f'<{NUM_BANDS * ROWS_PER_BAND}Q')
+BAND_SIZE = ROWS_PER_BAND * 8
+
+class NearDuplicateFact(sqlite3.IntegrityError):
+    """
+    Raised by mem.add_fact when a fact is too similar to one that's already in the database.
+    """
+    def __init__(self, fact_id, fact, similarity):
+        super().__init__(f"The fact is a near duplicate of fact #{fact_id}")
+        self.fact_id = fact_id
+        self.fact = fact
+        self.similarity = similarity
+
+def word_set(text: str) -> set:
+    return set(normalize(text).split())
+
+@functools.lru_cache(maxsize=65536)
+def word_hashes(word: str) -> tuple:
+    # Python's own hash() changes every run, so it can't be used for anything stored in the database
+    return SIGNATURE.unpack(hashlib.shake_128(word.encode('utf-8')).digest(SIGNATURE.size))
+
+def bands(words: set) -> list:
+    """
+    :return: The NUM_BANDS band hashes of a set of words, or an empty list if there are no words
+    """
+    if not words:
+        return []
+
+    # The smallest of each hash over all the words
+    signature = SIGNATURE.pack(*map(min, zip(*map(word_hashes, words))))
+
+    results = []
+    for band in range(NUM_BANDS):
+        rows = signature[band * BAND_SIZE:(band + 1) * BAND_SIZE]
+        digest = hashlib.blake2b(rows, digest_size=8, salt=band.to_bytes(16, 'little')).digest()
+        # SQLite integers are signed
+        results.append(int.from_bytes(digest, 'little', signed=True))
+    return results
+
+def similarity(words_a: set, words_b: set) -> float:
+    if not words_a or not words_b:
+        return 0.0
+    return len(words_a & words_b) / len(words_a | words_b)
+
+def signature(fact: str) -> tuple:
+    """
+    :return: The fact's set of words and its band hashes, to pass to find_near_duplicate and add_bands
+    """
+    words = word_set(fact)
+    return words, bands(words)
+
+def find_near_duplicate(cur, words: set, fact_bands: list, guild_id=0):
+    """
+    Looks for a fact in the database that is a near duplicate of the one with these words and bands.
+    :param guild_id: Only the global facts and this guild's facts are looked at
+    :return: (id, fact, similarity) of the most similar one, or None if there isn't one
+    """
+    if not fact_bands:
+        return None
+
+    # CROSS JOIN makes SQLite start from the bands. Otherwise it can decide to go through every fact in the guild
+    # instead, when it has no statistics about the tables yet.
+    cur.execute(f'''
+        SELECT DISTINCT category_facts.id, category_facts.fact
+        FROM fact_bands
+        CROSS JOIN category_facts ON category_facts.id = fact_bands.fact_id
+        WHERE fact_bands.band IN ({', '.join('?' * len(fact_bands))}) AND category_facts.guild_id IN (0, ?);
+    ''', (*fact_bands, guild_id))
+
+    best = None
+    for fact_id, other in cur.fetchall():
+        score = similarity(words, word_set(other))
+        if score >= SIMILARITY and (best is None or score > best[2]):
+            best = (fact_id, other, score)
+    return best
+
+def find_near_duplicates(cur, signatures: dict, guild_id=0) -> dict:
+    """
+    The same as find_near_duplicate for a whole batch of facts, with one query per BANDS_PER_QUERY bands instead of
+    one query per fact.
+    :param signatures: {fact: (words, band hashes)}, like from signature()
+    :return: {fact: (id, fact, similarity)} of the most similar fact in the database, for each fact that has one
+    """
+    band_facts = {}  # band hash -> the facts in the batch that have it
+    for fact, (_, fact_bands) in signatures.items():
+        for band in fact_bands:
+            band_facts.setdefault(band, []).append(fact)
+
+    candidates = {}  # fact -> {id: fact} of the facts in the database it shares a band with
+    all_bands = list(band_facts)
+    for start in range(0, len(all_bands), BANDS_PER_QUERY):
+        chunk = all_bands[start:start + BANDS_PER_QUERY]
+        # CROSS JOIN for the same reason as in find_near_duplicate
+        cur.execute(f'''
+            SELECT fact_bands.band, category_facts.id, category_facts.fact
+            FROM fact_bands
+            CROSS JOIN category_facts ON category_facts.id = fact_bands.fact_id
+            WHERE fact_bands.band IN ({', '.join('?' * len(chunk))}) AND category_facts.guild_id IN (0, ?);
+        ''', (*chunk, guild_id))
+        for band, fact_id, other in cur.fetchall():
+            for fact in band_facts[band]:
+                candidates.setdefault(fact, {})[fact_id] = other
+
+    results = {}
+    other_words = {}  # id -> word set, since the same fact can come up for lots of the batch
+    for fact, others in candidates.items():
+        words = signatures[fact][0]
+        for fact_id, other in others.items():
+            if fact_id not in other_words:
+                other_words[fact_id] = word_set(other)
+            score = similarity(words, other_words[fact_id])
+            if score >= SIMILARITY and (fact not in results or score > results[fact][2]):
+                results[fact] = (fact_id, other, score)
+    return results
+
+def split_near_duplicates(cur, facts, guild_id=0) -> tuple:
+    """
+    Sorts a batch of new facts into the ones worth inserting and the near duplicates, either of a fact in the
+    database or of one earlier in the batch.
+    :param facts: Facts that aren't in the database yet, without repeats
+    :return: ({fact: band hashes} of the facts to insert, {fact: (id, fact, similarity) of the fact in the database
+    it's a near duplicate of, or None if it's a near duplicate of one in the batch})
+    """
+    signatures = {fact: signature(fact) for fact in facts}
+    in_database = find_near_duplicates(cur, signatures, guild_id)
+
+    new_facts = {}
+    near_duplicates = {}
+    batch_bands = {}  # band hash -> word sets of the facts kept so far that have it
+    for fact, (words, fact_bands) in signatures.items():
+        if fact in in_database:
+            near_duplicates[fact] = in_database[fact]
+            continue
+        if any(similarity(words, other) >= SIMILARITY for band in fact_bands for other in batch_bands.get(band, ())):
+            near_duplicates[fact] = None
+            continue
+        for band in fact_bands:
+            batch_bands.setdefault(band, []).append(words)
+        new_facts[fact] = fact_bands
+    return new_facts, near_duplicates
+
+def add_bands(cur, fact_id, fact_bands: list):
+    """
+    Adds the bands of a fact that was just inserted to the fact_bands table. Removing them again is done by a trigger.
+    """
+    cur.executemany('''
+        INSERT OR IGNORE INTO fact_bands (band, fact_id)
+        VALUES (?, ?);
+    ''', [(band, fact_id) for band in fact_bands])
+
+def add_batch_bands(cur, fact_bands: dict):
+    """
+    add_bands for a batch of facts, in one statement.
+    :param fact_bands: {fact id: band hashes}
+    """
+    cur.executemany('''
+        INSERT OR IGNORE INTO fact_bands (band, fact_id)
+        VALUES (?, ?);
+    ''', sorted((band, fact_id) for fact_id, bands_of_fact in fact_bands.items() for band in bands_of_fact))
@@ -0,0 +1,76 @@
+import lightbulb, hikari
+import uuid
+
+def shorten(text: str, length: int) -> str:
+    """
+    Cuts text down to length characters, so a page of rows always fits in an embed.
+    """
+    if len(text) <= length:
+        return text
+    return text[:length - 3] + "..."
+
+async def paginate(ctx: lightbulb.SlashContext, fetch_page, render_page, key, page_size, timeout=300) -> None:
+    """
+    Responds with a page of results and Previous/Next buttons to move between pages.
+
+    Pages are fetched one at a time when a button is pressed, by the key of the first or last row shown
+    (not by an offset), so only the page being looked at is ever loaded and every page is as quick as the first.
+
+    :param fetch_page: Coroutine function taking after=, before= (a key, or None) and limit=, returning a list of rows
+    :param render_page: Function taking (rows, page number) and returning the embed to show
+    :param key: Function taking a row and returning the key to page by (eg, its id)
+    """
+    async def next_page(after=None):
+        # One more row than is shown is asked for, to know if there's another page after this one
+        rows = await fetch_page(after=after, before=None, limit=page_size + 1)
+        return rows[:page_size], len(rows) > page_size
+
+    rows, has_next = await next_page()
+    page = 0
+    if not has_next:
+        await ctx.respond(render_page(rows, page), flags=hikari.MessageFlag.EPHEMERAL)
+        return
+
+    custom_id = uuid.uuid4().hex
+
+    def buttons():
+        row = ctx.bot.rest.build_message_action_row()
+        row.add_interactive_button(
+            hikari.ButtonStyle.SECONDARY, f'{custom_id}:prev', label="Previous", is_disabled=page == 0
+        )
+        row.add_interactive_button(
+            hikari.ButtonStyle.SECONDARY, f'{custom_id}:next', label="Next", is_disabled=not has_next
+        )
+        return [row]
+
+    await ctx.respond(render_page(rows, page), components=buttons(), flags=hikari.MessageFlag.EPHEMERAL)
+
+    def is_ours(event: hikari.InteractionCreateEvent) -> bool:
+        return (
+            isinstance(event.interaction, hikari.ComponentInteraction)
+            and event.interaction.custom_id.startswith(f'{custom_id}:')
+            and event.interaction.user.id == ctx.author.id
+        )
+
+    with ctx.bot.stream(hikari.InteractionCreateEvent, timeout=timeout).filter(is_ours) as stream:
+        async for event in stream:
+            if event.interaction.custom_id.endswith(':next'):
+                if has_next:
+                    rows, has_next = await next_page(after=key(rows[-1]))
+                    page += 1
+            elif page > 0:
+                previous_rows = await fetch_page(after=None, before=key(rows[0]), limit=page_size)
+                if page == 1 or len(previous_rows) < page_size:
+                    # Back at the start (or things were deleted meanwhile), so the first page is shown again
+                    rows, has_next = await next_page()
+                    page = 0
+                else:
+                    rows, has_next = previous_rows, True
+                    page -= 1
+
+            await event.interaction.create_initial_response(
+                hikari.ResponseType.MESSAGE_UPDATE, embed=render_page(rows, page), components=buttons()
+            )
+
+    # The buttons stop working after the timeout, so they're taken away
+    await ctx.edit_last_response(components=[])
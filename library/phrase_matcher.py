@@ -0,0 +1,148 @@
+from collections import deque
+import threading
+
+class symbol_table(dict):
+    """
+    A str.translate table that deletes every symbol and keeps letters, numbers and whitespace.
+    Letters are only checked the first time they're seen, after that it's a plain dict lookup done in C.
+    """
+    def __missing__(self, code):
+        letter = chr(code)
+        if letter.isalnum():
+            self[code] = code
+        elif letter.isspace():
+            self[code] = ' '
+        else:
+            self[code] = None
+        return self[code]
+
+# Pre-filled with ASCII, since that's what nearly every message is made of.
+normalize_table = symbol_table()
+for code in range(128):
+    normalize_table[code]
+
+def normalize(text: str) -> str:
+    """
+    Makes text case-insensitive, removes symbols and squashes whitespace down to single spaces.
+    Messages and triggers both go through this, so they can be compared directly.
+    """
+    return ' '.join(text.lower().translate(normalize_table).split())
+
+class phrase_matcher:
+    """
+    An Aho-Corasick automaton over every (normalized) trigger, so all the triggers in a message, including ones
+    that are more than one word long, are found in a single pass over the message.
+
+    Adding a trigger inserts it into the trie straight away, the failure links are then rebuilt on the next scan.
+    Removing a trigger only unmarks its end node, so it needs no rebuild at all.
+    """
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.goto = [{}]  # node -> {letter: next node}
+        self.fail = [0]  # node -> longest proper suffix that is also in the trie
+        self.output = [0]  # node -> nearest node down the fail chain that ends a pattern (0 for none)
+        self.ends = [set()]  # node -> triggers whose normalized form ends here
+        self.depth = [0]  # node -> how many letters long the text leading to it is
+        self.patterns = {}  # trigger -> normalized trigger
+        self.dirty = False
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def clear(self):
+        with self.lock:
+            self.__init__()
+
+    def add(self, trigger: str):
+        pattern = normalize(trigger)
+        if not pattern:
+            return
+
+        with self.lock:
+            self.patterns[trigger] = pattern
+            node = 0
+            for letter in pattern:
+                next_node = self.goto[node].get(letter)
+                if next_node is None:
+                    next_node = len(self.goto)
+                    self.goto[node][letter] = next_node
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(0)
+                    self.ends.append(set())
+                    self.depth.append(self.depth[node] + 1)
+                    self.dirty = True
+                node = next_node
+            if not self.ends[node]:
+                # The node now ends a pattern, so output links pointing past it are out of date.
+                self.dirty = True
+            self.ends[node].add(trigger)
+
+    def remove(self, trigger: str):
+        with self.lock:
+            pattern = self.patterns.pop(trigger, None)
+            if pattern is None:
+                return
+
+            node = 0
+            for letter in pattern:
+                node = self.goto[node][letter]
+            self.ends[node].discard(trigger)
+
+    def build(self):
+        """
+        Recomputes the failure and output links with a breadth first walk over the trie.
+        """
+        with self.lock:
+            queue = deque()
+            for node in self.goto[0].values():
+                self.fail[node] = 0
+                self.output[node] = 0
+                queue.append(node)
+
+            while queue:
+                node = queue.popleft()
+                for letter, child in self.goto[node].items():
+                    fallback = self.fail[node]
+                    while fallback and letter not in self.goto[fallback]:
+                        fallback = self.fail[fallback]
+                    child_fail = self.goto[fallback].get(letter, 0)
+                    self.fail[child] = child_fail
+                    self.output[child] = child_fail if self.ends[child_fail] else self.output[child_fail]
+                    queue.append(child)
+
+            self.dirty = False
+
+    def scan(self, text: str) -> list:
+        """
+        Finds every trigger in a normalized text, only counting matches that start and end on word boundaries.
+        :return: A list of (start, end, trigger) tuples, ordered by where they start, longest first
+        """
+        with self.lock:
+            if self.dirty:
+                self.build()
+
+            matches = []
+            node = 0
+            goto, fail, output, ends = self.goto, self.fail, self.output, self.ends
+            text_len = len(text)
+            for i, letter in enumerate(text):
+                while node and letter not in goto[node]:
+                    node = fail[node]
+                node = goto[node].get(letter, 0)
+
+                # Only check for matches where a word ends
+                if i + 1 < text_len and text[i + 1] != ' ':
+                    continue
+
+                found = node if ends[node] else output[node]
+                while found:
+                    if ends[found]:
+                        start = i + 1 - self.depth[found]
+                        if start == 0 or text[start - 1] == ' ':
+                            for trigger in ends[found]:
+                                matches.append((start, i + 1, trigger))
+                    found = output[found]
+
+        matches.sort(key=lambda match: (match[0], -match[1], match[2]))
+        return matches
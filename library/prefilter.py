@@ -0,0 +1,91 @@
+from library.trigger_index import bigrams, PAD
+import threading
+
+class message_prefilter:
+    """
+    A cheap check that throws out words (and whole messages) that can't possibly match any trigger, before any
+    similarity matching is done.
+
+    It keeps every (padded) bigram of every trigger, category and normalized trigger word. A word that shares none
+    of them can't be an exact match, and it can't reach the 0.8 similarity with a trigger or category either
+    (see trigger_index), so it's safe to skip.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.grams = {}  # bigram -> how many triggers/categories put it there
+
+    @staticmethod
+    def trigger_grams(trigger, category, pattern):
+        grams = set(bigrams(trigger))
+        grams.update(bigrams(category))
+        for word in pattern.split():
+            grams.update(bigrams(word))
+        return grams
+
+    def add(self, trigger, category, pattern):
+        with self.lock:
+            for gram in self.trigger_grams(trigger, category, pattern):
+                self.grams[gram] = self.grams.get(gram, 0) + 1
+
+    def remove(self, trigger, category, pattern):
+        with self.lock:
+            for gram in self.trigger_grams(trigger, category, pattern):
+                count = self.grams.get(gram, 0) - 1
+                if count > 0:
+                    self.grams[gram] = count
+                else:
+                    self.grams.pop(gram, None)
+
+    def clear(self):
+        with self.lock:
+            self.grams.clear()
+
+    def may_match(self, word: str) -> bool:
+        grams = self.grams
+        word = f'{PAD}{word}{PAD}'
+        for i in range(len(word) - 1):
+            if word[i:i + 2] in grams:
+                return True
+        return False
+
+    def filter_words(self, words: list) -> list:
+        """
+        Checks every word of a (normalized) message.
+        :return: A list of True/False for each word, False meaning the word can't match anything
+        """
+        return [self.may_match(word) for word in words]
+
+class prefilter_counter:
+    """
+    How many messages and words the prefilters threw out. A message is checked against more than one guild's
+    prefilter, so this counts what they decided together, once per message.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.messages = 0
+        self.rejected_messages = 0
+        self.words = 0
+        self.rejected_words = 0
+
+    def count(self, results: list):
+        """
+        :param results: What filter_words returned for a message, combined across every prefilter it was checked with
+        """
+        passed = sum(results)
+        with self.lock:
+            self.messages += 1
+            self.words += len(results)
+            self.rejected_words += len(results) - passed
+            if not passed:
+                self.rejected_messages += 1
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                'messages': self.messages,
+                'rejected_messages': self.rejected_messages,
+                'message_reject_rate': self.rejected_messages / self.messages if self.messages else 0.0,
+                'words': self.words,
+                'rejected_words': self.rejected_words,
+                'word_reject_rate': self.rejected_words / self.words if self.words else 0.0,
+            }
@@ -0,0 +1,74 @@
+import threading
+import bisect
+
+class prefix_index:
+    """
+    A sorted list of (lowercased key, value) pairs, so everything starting with some text can be found with a
+    binary search instead of a LIKE scan over the table. Used for slash command autocomplete.
+
+    The same value can be added more than once (eg, a category used by many triggers and facts), it's only removed
+    once it has been removed as many times as it was added.
+    """
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.entries = []  # sorted (lowercased key, value)
+        self.counts = {}  # (lowercased key, value) -> how many times it was added
+
+    def __len__(self):
+        return len(self.entries)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.counts.clear()
+
+    def add(self, key: str, value=None):
+        entry = (key.lower(), key if value is None else value)
+        with self.lock:
+            count = self.counts.get(entry, 0)
+            self.counts[entry] = count + 1
+            if count == 0:
+                bisect.insort(self.entries, entry)
+
+    def remove(self, key: str, value=None):
+        entry = (key.lower(), key if value is None else value)
+        with self.lock:
+            count = self.counts.get(entry, 0)
+            if count > 1:
+                self.counts[entry] = count - 1
+                return
+            if count == 0:
+                return
+
+            del self.counts[entry]
+            index = bisect.bisect_left(self.entries, entry)
+            if index < len(self.entries) and self.entries[index] == entry:
+                del self.entries[index]
+
+    def load(self, entries):
+        """
+        Replaces everything in the index at once, which is a lot faster than adding them one by one.
+        :param entries: (key, value) pairs
+        """
+        with self.lock:
+            self.counts = {}
+            for key, value in entries:
+                entry = (key.lower(), key if value is None else value)
+                self.counts[entry] = self.counts.get(entry, 0) + 1
+            self.entries = sorted(self.counts)
+
+    def search(self, prefix: str, limit=25) -> list:
+        """
+        :return: Up to limit values whose key starts with prefix (case-insensitive), in alphabetical order
+        """
+        prefix = prefix.lower()
+        with self.lock:
+            index = bisect.bisect_left(self.entries, (prefix,))
+            results = []
+            while index < len(self.entries) and len(results) < limit:
+                key, value = self.entries[index]
+                if not key.startswith(prefix):
+                    break
+                results.append(value)
+                index += 1
+        return results
@@ -0,0 +1,121 @@
+from collections import OrderedDict
+from library import config
+import time
+
+class token_bucket:
+    """
+    Holds up to 'burst' tokens and refills at 'rate' tokens per second. Each reply costs one token.
+    """
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def has_token(self, now) -> bool:
+        self.refill(now)
+        return self.tokens >= 1
+
+    def take(self, now):
+        self.refill(now)
+        self.tokens -= 1
+
+class rate_limiter:
+    """
+    Stops the bot replying too often in the same channel or guild, or with the same trigger in a channel.
+
+    Checking costs a couple of dict lookups, so it's done before any matching: a channel or guild that's out of
+    replies doesn't get its messages matched at all. A rate of 0 or less turns that limit off.
+    """
+    def __init__(self, channel_rate, channel_burst, guild_rate, guild_burst, trigger_cooldown, max_buckets=10_000):
+        self.channel_rate = channel_rate
+        self.channel_burst = channel_burst
+        self.guild_rate = guild_rate
+        self.guild_burst = guild_burst
+        self.trigger_cooldown = trigger_cooldown
+        self.max_buckets = max_buckets
+        self.channels = OrderedDict()  # channel id -> token_bucket, least recently used first
+        self.guilds = OrderedDict()  # guild id -> token_bucket
+        self.last_trigger = OrderedDict()  # (channel id, trigger) -> time of the last reply
+        self.allowed = 0
+        self.suppressed = {'channel': 0, 'guild': 0, 'trigger': 0}
+
+    @classmethod
+    def from_config(cls):
+        return cls(
+            channel_rate=config.get_float('CHANNEL_REPLIES_PER_MINUTE', 6) / 60,
+            channel_burst=config.get_int('CHANNEL_REPLY_BURST', 3),
+            guild_rate=config.get_float('GUILD_REPLIES_PER_MINUTE', 30) / 60,
+            guild_burst=config.get_int('GUILD_REPLY_BURST', 10),
+            trigger_cooldown=config.get_float('TRIGGER_COOLDOWN_SECONDS', 30),
+        )
+
+    def get_bucket(self, buckets, key, rate, burst, now):
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = token_bucket(rate, burst, now)
+            buckets[key] = bucket
+            while len(buckets) > self.max_buckets:
+                buckets.popitem(last=False)
+        else:
+            buckets.move_to_end(key)
+        return bucket
+
+    def can_reply(self, guild_id, channel_id) -> bool:
+        """
+        Checks the channel and guild limits, without using up a reply. Call this before matching a message.
+        """
+        now = time.monotonic()
+        if self.channel_rate > 0:
+            bucket = self.get_bucket(self.channels, channel_id, self.channel_rate, self.channel_burst, now)
+            if not bucket.has_token(now):
+                self.suppressed['channel'] += 1
+                return False
+
+        if self.guild_rate > 0:
+            bucket = self.get_bucket(self.guilds, guild_id, self.guild_rate, self.guild_burst, now)
+            if not bucket.has_token(now):
+                self.suppressed['guild'] += 1
+                return False
+
+        return True
+
+    def take(self, guild_id, channel_id, trigger) -> bool:
+        """
+        Checks the trigger's cooldown in the channel and, if it's not cooling down, uses up a reply.
+        Call this once a trigger was matched, before fetching the fact.
+        :return: True if the bot may reply
+        """
+        now = time.monotonic()
+        key = (channel_id, trigger)
+        if self.trigger_cooldown > 0:
+            last = self.last_trigger.get(key)
+            if last is not None and now - last < self.trigger_cooldown:
+                self.suppressed['trigger'] += 1
+                return False
+
+            self.last_trigger[key] = now
+            self.last_trigger.move_to_end(key)
+            while len(self.last_trigger) > self.max_buckets:
+                self.last_trigger.popitem(last=False)
+
+        if self.channel_rate > 0:
+            self.get_bucket(self.channels, channel_id, self.channel_rate, self.channel_burst, now).take(now)
+        if self.guild_rate > 0:
+            self.get_bucket(self.guilds, guild_id, self.guild_rate, self.guild_burst, now).take(now)
+
+        self.allowed += 1
+        return True
+
+    def stats(self) -> dict:
+        return {
+            'allowed': self.allowed,
+            'suppressed': dict(self.suppressed),
+            'suppressed_total': sum(self.suppressed.values()),
+        }
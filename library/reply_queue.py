@@ -0,0 +1,104 @@
+from collections import deque
+from library import config, metrics
+import asyncio
+import logging
+import time
+
+class reply_queue:
+    """
+    Sends the bot's replies in the background, so the message listener can move on as soon as it has a reply ready.
+
+    Each channel gets its own small queue and worker task. The worker only lives while the channel has replies
+    waiting. When a channel is flooded, its oldest waiting reply is dropped to make room for the newest one, and
+    replies that waited longer than max_age seconds are thrown away instead of being sent late.
+    The total number of waiting replies across all channels is capped too.
+    """
+    def __init__(self, per_channel=2, max_total=500, max_age=15.0):
+        # A channel has to be able to hold at least the reply that's being queued
+        self.per_channel = max(1, per_channel)
+        self.max_total = max_total
+        self.max_age = max_age
+        self.channels = {}  # channel id -> deque of (time queued, send coroutine function)
+        self.workers = {}  # channel id -> worker task
+        self.depth = 0
+        self.sent = 0
+        self.failed = 0
+        self.dropped = {'coalesced': 0, 'stale': 0, 'full': 0}
+        self.latencies = deque(maxlen=1000)  # Seconds between queueing and the reply being sent, most recent last
+
+    @classmethod
+    def from_config(cls):
+        return cls(
+            per_channel=config.get_int('REPLY_QUEUE_PER_CHANNEL', 2),
+            max_total=config.get_int('REPLY_QUEUE_MAX', 500),
+            max_age=config.get_float('REPLY_MAX_AGE_SECONDS', 15),
+        )
+
+    def put(self, channel_id, send) -> bool:
+        """
+        Queues a reply.
+        :param send: A function taking no arguments that returns the coroutine sending the reply.
+        :return: False if the reply was dropped straight away because every queue was full
+        """
+        if self.depth >= self.max_total:
+            self.dropped['full'] += 1
+            return False
+
+        queue = self.channels.get(channel_id)
+        if queue is None:
+            queue = deque()
+            self.channels[channel_id] = queue
+        if len(queue) >= self.per_channel:
+            # The channel is flooded, the newest reply is the one worth sending
+            queue.popleft()
+            self.depth -= 1
+            self.dropped['coalesced'] += 1
+
+        queue.append((time.monotonic(), send))
+        self.depth += 1
+
+        if channel_id not in self.workers:
+            self.workers[channel_id] = asyncio.create_task(self.worker(channel_id))
+        return True
+
+    async def worker(self, channel_id):
+        queue = self.channels[channel_id]
+        try:
+            while queue:
+                queued_at, send = queue.popleft()
+                self.depth -= 1
+                if time.monotonic() - queued_at > self.max_age:
+                    self.dropped['stale'] += 1
+                    continue
+
+                metrics.observe('reply.wait', time.monotonic() - queued_at)
+                try:
+                    with metrics.timer('reply.respond'):
+                        await send()
+                except Exception as err:
+                    self.failed += 1
+                    logging.error(err, exc_info=True)
+                else:
+                    self.sent += 1
+                    self.latencies.append(time.monotonic() - queued_at)
+        finally:
+            del self.workers[channel_id]
+            if not queue:
+                del self.channels[channel_id]
+
+    def stats(self) -> dict:
+        latencies = sorted(self.latencies)
+        def percentile(p):
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+
+        return {
+            'depth': self.depth,
+            'active_channels': len(self.workers),
+            'sent': self.sent,
+            'failed': self.failed,
+            'dropped': dict(self.dropped),
+            'latency_p50': percentile(0.5),
+            'latency_p99': percentile(0.99),
+        }
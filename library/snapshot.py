@@ -0,0 +1,365 @@
+import threading
+import logging
+import struct
+import json
+import time
+import bisect
+import mmap
+import os
+
+# A snapshot is every trigger and fact written to one file, which each bot process maps into memory read-only.
+# The operating system keeps a single copy of the file's pages for all of the processes, so running more processes
+# doesn't mean more copies of the facts.
+#
+# Layout (native byte order, every offset is from the start of the file):
+#   header:     MAGIC, VERSION, then the counts and offsets below
+#   guilds:     (i64 guild id, u64 offset of its triggers, u64 number of triggers) for each guild with triggers
+#   triggers:   (u32 length, trigger, u32 length, category) for each trigger, grouped by guild
+#   categories: (i64 guild id, u32 length, category, u64 offset of its ids, u64 number of ids) for each guild's
+#               categories of facts
+#   ids:        u64 fact ids, grouped by guild and category, each group sorted
+#   fact ids:   u64 id of every fact, sorted
+#   offsets:    u64 offset of each fact's record, in the same order as fact ids
+#   records:    (u32 length, fact, u32 length, added_by) for each fact
+
+MAGIC = b'FACTSNAP'
+VERSION = 2
+HEADER = struct.Struct('=8sI4x7Q')
+LENGTH = struct.Struct('=I')
+ID = struct.Struct('=Q')
+GUILD_ID = struct.Struct('=q')
+GUILD = struct.Struct('=qQQ')
+CATEGORY = struct.Struct('=QQ')
+
+# How long shared_snapshot.schedule waits for more changes before publishing them, in seconds
+PUBLISH_DELAY = 0.5
+
+def pack_text(text: str) -> bytes:
+    data = text.encode('utf-8')
+    return LENGTH.pack(len(data)) + data
+
+def write_snapshot(conn, path):
+    """
+    Writes everything in the triggers and category_facts tables to a new snapshot file.
+    The file is written next to path first and then renamed, so nobody can ever open a half written snapshot.
+    :return:
+    """
+    cur = conn.cursor()
+    cur.execute('''
+        SELECT guild_id, trigger, category
+        FROM triggers
+        ORDER BY guild_id;
+    ''')
+    triggers = cur.fetchall()
+    cur.execute('''
+        SELECT id, guild_id, category, fact, added_by
+        FROM category_facts
+        ORDER BY id;
+    ''')
+    facts = cur.fetchall()
+
+    category_ids = {}  # (guild id, category) -> [fact ids]
+    for fact_id, guild_id, category, _, _ in facts:
+        category_ids.setdefault((guild_id, category), []).append(fact_id)
+
+    guild_triggers = {}  # guild id -> [packed triggers]
+    for guild_id, trigger, category in triggers:
+        guild_triggers.setdefault(guild_id, []).append(pack_text(trigger) + pack_text(category))
+
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(b'\0' * HEADER.size)
+
+        guilds_offset = f.tell()
+        position = guilds_offset + len(guild_triggers) * GUILD.size
+        for guild_id, packed in guild_triggers.items():
+            f.write(GUILD.pack(guild_id, position, len(packed)))
+            position += sum(len(trigger) for trigger in packed)
+        for packed in guild_triggers.values():
+            f.write(b''.join(packed))
+
+        # The category table needs to know where the id groups start, so their size is worked out first
+        categories_offset = f.tell()
+        names = [GUILD_ID.pack(guild_id) + pack_text(category) for guild_id, category in category_ids]
+        ids_offset = categories_offset + sum(len(name) + CATEGORY.size for name in names)
+        ids_offset += -ids_offset % ID.size  # 8 byte aligned
+        position = ids_offset
+        for name, ids in zip(names, category_ids.values()):
+            f.write(name + CATEGORY.pack(position, len(ids)))
+            position += len(ids) * ID.size
+
+        f.write(b'\0' * (ids_offset - f.tell()))
+        for ids in category_ids.values():
+            f.write(b''.join(ID.pack(fact_id) for fact_id in ids))
+
+        fact_ids_offset = f.tell()
+        f.write(b''.join(ID.pack(fact[0]) for fact in facts))
+
+        offsets_offset = f.tell()
+        position = offsets_offset + len(facts) * ID.size
+        records = []
+        offsets = []
+        for _, _, _, fact, added_by in facts:
+            record = pack_text(fact) + pack_text(str(added_by))
+            records.append(record)
+            offsets.append(ID.pack(position))
+            position += len(record)
+        f.write(b''.join(offsets))
+        f.write(b''.join(records))
+
+        f.seek(0)
+        f.write(HEADER.pack(
+            MAGIC, VERSION,
+            len(guild_triggers), guilds_offset,
+            len(category_ids), categories_offset,
+            len(facts), fact_ids_offset, offsets_offset,
+        ))
+
+    os.replace(temp_path, path)
+
+class snapshot:
+    """
+    A snapshot file, mapped into memory. Facts are read straight out of the mapping when they're asked for.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (
+            magic, version,
+            guild_count, guilds_offset,
+            category_count, categories_offset,
+            fact_count, fact_ids_offset, offsets_offset,
+        ) = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.map.close()
+            raise ValueError(f"{path} is not a snapshot this version of the bot can read")
+
+        view = memoryview(self.map)
+        self.fact_ids = view[fact_ids_offset:fact_ids_offset + fact_count * ID.size].cast('Q')
+        self.offsets = view[offsets_offset:offsets_offset + fact_count * ID.size].cast('Q')
+        view.release()
+
+        self.guilds = {}  # guild id -> (offset of its triggers, number of triggers)
+        for i in range(guild_count):
+            guild_id, offset, count = GUILD.unpack_from(self.map, guilds_offset + i * GUILD.size)
+            self.guilds[guild_id] = (offset, count)
+
+        self.categories = {}  # (guild id, category) -> (offset of its ids, number of ids)
+        position = categories_offset
+        for _ in range(category_count):
+            (guild_id,) = GUILD_ID.unpack_from(self.map, position)
+            category, position = self.read_text(position + GUILD_ID.size)
+            self.categories[(guild_id, category)] = CATEGORY.unpack_from(self.map, position)
+            position += CATEGORY.size
+
+    def __len__(self):
+        return len(self.fact_ids)
+
+    def read_text(self, position) -> tuple:
+        """
+        :return: The text at position and the position right after it
+        """
+        (length,) = LENGTH.unpack_from(self.map, position)
+        position += LENGTH.size
+        return self.map[position:position + length].decode('utf-8'), position + length
+
+    def triggers(self, guild_id=0) -> list:
+        """
+        :return: A list of (trigger, category) tuples of one guild (only its own, not the global ones)
+        """
+        results = []
+        position, count = self.guilds.get(guild_id, (0, 0))
+        for _ in range(count):
+            trigger, position = self.read_text(position)
+            category, position = self.read_text(position)
+            results.append((trigger, category))
+        return results
+
+    def category_fact_ids(self, category, guild_id=0) -> list:
+        """
+        :return: The ids of one guild's facts in the category (only its own, not the global ones)
+        """
+        if (guild_id, category) not in self.categories:
+            return []
+        offset, count = self.categories[(guild_id, category)]
+        return [ID.unpack_from(self.map, offset + i * ID.size)[0] for i in range(count)]
+
+    def get_fact(self, fact_id) -> tuple:
+        """
+        :return: (fact, added_by), or None if the fact isn't in the snapshot
+        """
+        index = bisect.bisect_left(self.fact_ids, fact_id)
+        if index == len(self.fact_ids) or self.fact_ids[index] != fact_id:
+            return None
+        fact, position = self.read_text(self.offsets[index])
+        added_by, _ = self.read_text(position)
+        return fact, added_by
+
+    def close(self):
+        self.fact_ids.release()
+        self.offsets.release()
+        self.map.close()
+
+class shared_snapshot:
+    """
+    The snapshot shared by every bot process, and how they tell each other it changed.
+
+    generation is a multiprocessing.Value that every process was given, and publishing is a multiprocessing.Lock.
+    Publishing writes a new snapshot file (path.<generation>), together with a list of what changed since the last
+    one (path.<generation>.changes), and then bumps the generation. Every process checks the generation without any
+    lock, and when it moved, opens the new file and applies the changes to what it has loaded instead of dropping
+    everything. Old files are deleted once nobody should be reading them anymore.
+
+    Only processes publishing wait on each other, and writes don't publish straight away: schedule collects the
+    changes for PUBLISH_DELAY seconds on a background thread, so a burst of writes only writes one new file.
+    """
+    def __init__(self, path, generation, publishing):
+        self.path = path
+        self.generation = generation
+        self.publishing = publishing
+        self.lock = threading.Lock()
+        self.seen = None
+        self.current = None
+        self.pending_lock = threading.Lock()
+        self.pending = []  # Changes waiting for the next publish
+        self.pending_unknown = False  # Something changed that isn't in pending, so everyone has to reload
+        self.wake = threading.Event()
+        self.publisher = None
+
+    def file_for(self, generation) -> str:
+        return f'{self.path}.{generation}'
+
+    def latest(self) -> int:
+        # Read without the lock, it's a single 64-bit number that only ever goes up
+        return self.generation.get_obj().value
+
+    def publish(self, conn, changes=None):
+        """
+        Writes a new snapshot from the database and tells every process about it.
+        :param changes: What changed since the last publish, for the processes to apply (see memory.apply_changes).
+        None if it isn't known, and then every process drops everything it loaded instead.
+        :return:
+        """
+        # Held while reading the database too, so a slower process can't publish an older snapshot over a newer one.
+        # Only publishers take it, checking for a new snapshot never waits on it.
+        with self.publishing:
+            generation = self.latest() + 1
+            path = self.file_for(generation)
+            write_snapshot(conn, path)
+            temp_path = f'{path}.changes.{os.getpid()}.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'pid': os.getpid(), 'changes': changes}, f)
+            os.replace(temp_path, f'{path}.changes')
+
+            with self.generation.get_lock():
+                self.generation.value = generation
+
+        for old in range(max(generation - 10, 0), generation - 1):
+            for old_path in (self.file_for(old), f'{self.file_for(old)}.changes'):
+                try:
+                    os.remove(old_path)
+                except FileNotFoundError:
+                    pass
+                except OSError:
+                    # Windows won't delete a file that's still mapped somewhere, it'll go on a later publish
+                    pass
+
+    def schedule(self, connect, changes=None):
+        """
+        Publishes soon on a background thread, along with anything else that changes before then.
+        :param connect: Function returning a database connection the background thread can use
+        :param changes: A list of what changed, or None if it isn't known (see publish)
+        :return:
+        """
+        with self.pending_lock:
+            if changes is None:
+                self.pending_unknown = True
+            else:
+                self.pending.extend(changes)
+            if self.publisher is None:
+                self.publisher = threading.Thread(
+                    target=self.run_publisher, args=(connect,), name='snapshot-publisher', daemon=True
+                )
+                self.publisher.start()
+        self.wake.set()
+
+    def run_publisher(self, connect):
+        while True:
+            self.wake.wait()
+            # Anything else written in the meantime goes in the same snapshot
+            time.sleep(PUBLISH_DELAY)
+            with self.pending_lock:
+                self.wake.clear()
+                changes = None if self.pending_unknown else self.pending
+                self.pending = []
+                self.pending_unknown = False
+            try:
+                self.publish(connect(), changes)
+            except Exception as err:
+                logging.error(err, exc_info=True)
+
+    def read_changes(self, generation):
+        """
+        :return: (True if this process published it, change) for every change published after the snapshot that's
+        open, up to generation, or None if any of them isn't known (or its file was already cleaned up)
+        """
+        changes = []
+        for number in range(self.seen + 1, generation + 1):
+            try:
+                with open(f'{self.file_for(number)}.changes', 'r', encoding='utf-8') as f:
+                    published = json.load(f)
+            except (FileNotFoundError, ValueError):
+                return None
+            if published['changes'] is None:
+                return None
+            own = published['pid'] == os.getpid()
+            changes.extend((own, change) for change in published['changes'])
+        return changes
+
+    def changed(self) -> bool:
+        """
+        :return: True if there's a newer snapshot than the one that's open. Cheap, it doesn't take any lock.
+        """
+        return self.latest() != self.seen
+
+    def refresh(self) -> tuple:
+        """
+        Opens the newest snapshot, if it isn't open already.
+        :return: (True if a different snapshot was opened, the changes to apply to whatever was loaded from the old
+        one, or None if it all has to be thrown away)
+        """
+        generation = self.latest()
+        if generation == self.seen:
+            return False, []
+
+        with self.lock:
+            if generation == self.seen:
+                return False, []
+            try:
+                current = snapshot(self.file_for(generation))
+            except FileNotFoundError:
+                # Published again and cleaned up in the meantime, the next check will pick up the newest one
+                logging.warning(f"Snapshot {generation} was gone before it could be opened")
+                return False, []
+
+            changes = None if self.seen is None else self.read_changes(generation)
+            # The old mapping is closed when nothing is using it anymore
+            self.current = current
+            self.seen = generation
+            return True, changes
+
+    def cleanup(self):
+        """
+        Deletes every snapshot file, called by the main process on exit.
+        :return:
+        """
+        directory = os.path.dirname(self.path) or '.'
+        prefix = os.path.basename(self.path) + '.'
+        for name in os.listdir(directory):
+            if name.startswith(prefix):
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError:
+                    pass
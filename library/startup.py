@@ -0,0 +1,35 @@
+from contextlib import contextmanager
+from library import metrics
+import threading
+import logging
+import time
+
+# The bot connects to Discord first and seeds the database and fills its indexes afterwards, in the background.
+# This keeps track of how long each part of starting up took, and whether the background part is done yet.
+
+started = time.perf_counter()
+phases = {}  # phase name -> seconds it took, in the order they finished
+# Set once the indexes are loaded. Until then, messages are only matched against exact one-word triggers.
+warm = threading.Event()
+
+@contextmanager
+def phase(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases[name] = time.perf_counter() - start
+        logging.info(f"Startup phase '{name}' took {phases[name]:.3f}s")
+
+def mark(name):
+    """
+    Records how long it's been since the bot started, for things that aren't timed on their own (eg, the gateway
+    being connected).
+    """
+    phases[name] = time.perf_counter() - started
+    logging.info(f"Startup reached '{name}' after {phases[name]:.3f}s")
+
+def report() -> dict:
+    return {**phases, 'warm': warm.is_set()}
+
+metrics.register_collector('startup', report)
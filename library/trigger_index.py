@@ -0,0 +1,194 @@
+from difflib import SequenceMatcher
+import threading
+
+# Used to pad the words so the first and last letters also get their own bigram.
+PAD = '\x00'
+
+def bigrams(word: str) -> dict:
+    """
+    Splits a word into its (padded) bigrams.
+    :return: A dict of bigram -> how many times it shows up in the word
+    """
+    word = f'{PAD}{word}{PAD}'
+    grams = {}
+    for i in range(len(word) - 1):
+        gram = word[i:i + 2]
+        grams[gram] = grams.get(gram, 0) + 1
+    return grams
+
+class trigger_index:
+    """
+    An in-memory index of words (triggers or categories) that can find every word similar to a message word
+    without running a SequenceMatcher over every row of the database.
+
+    Every word is split into padded bigrams and each bigram keeps a list of the words that contain it.
+    For two words to have a SequenceMatcher ratio of at least 0.75, they must share a minimum number of bigrams,
+    which depends only on their lengths. So a lookup only counts shared bigrams through the postings and runs the
+    real SequenceMatcher on the few words that pass, keeping the exact same similarity contract as before.
+    """
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.postings = {}  # bigram -> {word length: {word: count of bigram in word}}
+        self.values = {}  # word -> value (eg, the category of a trigger)
+        self.counts = {}  # word -> how many times it was added (categories are shared by many triggers)
+        self.order = {}  # word -> insertion number, so ties resolve the same way the old table scan did
+        self.next_order = 0
+
+    def __len__(self):
+        return len(self.values)
+
+    def __contains__(self, word):
+        return word in self.values
+
+    def get(self, word, default=None):
+        return self.values.get(word, default)
+
+    def add(self, word: str, value=None):
+        with self.lock:
+            if word in self.counts:
+                self.counts[word] += 1
+                self.values[word] = value
+                return
+
+            self.counts[word] = 1
+            self.values[word] = value
+            self.order[word] = self.next_order
+            self.next_order += 1
+            for gram, count in bigrams(word).items():
+                self.postings.setdefault(gram, {}).setdefault(len(word), {})[word] = count
+
+    def remove(self, word: str):
+        with self.lock:
+            if word not in self.counts:
+                return
+
+            self.counts[word] -= 1
+            if self.counts[word] > 0:
+                return
+
+            del self.counts[word]
+            del self.values[word]
+            del self.order[word]
+            for gram in bigrams(word):
+                lengths = self.postings.get(gram, {})
+                words = lengths.get(len(word))
+                if words is None:
+                    continue
+                words.pop(word, None)
+                if not words:
+                    del lengths[len(word)]
+                if not lengths:
+                    del self.postings[gram]
+
+    def clear(self):
+        with self.lock:
+            self.postings.clear()
+            self.values.clear()
+            self.counts.clear()
+            self.order.clear()
+
+    def search(self, query: str, threshold: float = 0.8, inclusive: bool = False) -> list:
+        """
+        Finds every word in the index that is similar to the query.
+        :param threshold: The SequenceMatcher ratio the words need to beat. Must be at least 0.75, below that the
+        bigram filter can no longer promise it hasn't skipped a match.
+        :param inclusive: If True, a ratio equal to the threshold also counts as a match.
+        :return: A list of (word, ratio) tuples, best match first
+        """
+        assert threshold >= 0.75, "The bigram filter is only exact for thresholds of 0.75 and above"
+        if not query:
+            return []
+
+        query_len = len(query)
+        # Words too much shorter or longer than the query can never reach the threshold, so they aren't even counted.
+        min_len = int(query_len * threshold / (2 - threshold) - 1e-9)
+        max_len = int(query_len * (2 - threshold) / threshold + 1e-9)
+        with self.lock:
+            # Counts how many bigrams each word shares with the query
+            shared = {}
+            for gram, query_count in bigrams(query).items():
+                for word_len, words in self.postings.get(gram, {}).items():
+                    if word_len < min_len or word_len > max_len:
+                        continue
+                    for word, count in words.items():
+                        shared[word] = shared.get(word, 0) + min(count, query_count)
+
+            results = []
+            for word, shared_count in shared.items():
+                word_len = len(word)
+                # The most unmatched letters the two words can have and still reach the threshold
+                max_unmatched = int((1 - threshold) * (query_len + word_len) + 1e-9)
+                if abs(query_len - word_len) > max_unmatched:
+                    continue
+                # Every unmatched letter can break at most two bigrams
+                if shared_count < max(query_len, word_len) + 1 - 2 * max_unmatched:
+                    continue
+
+                ratio = SequenceMatcher(None, word, query).ratio()
+                if ratio > threshold or (inclusive and ratio == threshold):
+                    results.append((word, ratio))
+
+            results.sort(key=lambda result: (-result[1], self.order[result[0]]))
+        return results
+
+    def lookup(self, query: str, threshold: float = 0.8, inclusive: bool = False):
+        """
+        Finds the most similar word in the index to the query.
+        :return: A (word, ratio) tuple, or None if nothing was similar enough
+        """
+        if query in self.values:
+            return query, 1.0
+
+        results = self.search(query, threshold, inclusive)
+        if not results:
+            return None
+        return results[0]
+
+    def similar_pairs(self, threshold: float = 0.8) -> list:
+        """
+        Finds every pair of words in the index that are similar to each other, the same as calling search() for
+        every word, but each pair is only looked at once.
+
+        Words are added to a fresh set of postings one at a time, and each word only counts the bigrams it shares
+        with the words added before it, within the lengths it could be similar to. So every pair is counted once,
+        pairs that share no bigrams are never looked at, and only the pairs that pass the same filters as search()
+        get a SequenceMatcher.
+
+        :return: A list of (word, other word, ratio) tuples, where ratio is the higher of the two directions
+        """
+        assert threshold >= 0.75, "The bigram filter is only exact for thresholds of 0.75 and above"
+        with self.lock:
+            words = sorted(self.order, key=self.order.get)
+
+        postings = {}  # bigram -> {word length: {word: count of bigram in word}}, of the words seen so far
+        results = []
+        for word in words:
+            word_len = len(word)
+            grams = bigrams(word)
+            min_len = int(word_len * threshold / (2 - threshold) - 1e-9)
+            max_len = int(word_len * (2 - threshold) / threshold + 1e-9)
+
+            shared = {}
+            for gram, word_count in grams.items():
+                for other_len, others in postings.get(gram, {}).items():
+                    if other_len < min_len or other_len > max_len:
+                        continue
+                    for other, count in others.items():
+                        shared[other] = shared.get(other, 0) + min(count, word_count)
+
+            for other, shared_count in shared.items():
+                other_len = len(other)
+                max_unmatched = int((1 - threshold) * (word_len + other_len) + 1e-9)
+                if abs(word_len - other_len) > max_unmatched:
+                    continue
+                if shared_count < max(word_len, other_len) + 1 - 2 * max_unmatched:
+                    continue
+
+                ratio = max(SequenceMatcher(None, other, word).ratio(), SequenceMatcher(None, word, other).ratio())
+                if ratio > threshold:
+                    results.append((other, word, ratio))
+
+            for gram, count in grams.items():
+                postings.setdefault(gram, {}).setdefault(word_len, {})[word] = count
+
+        return results
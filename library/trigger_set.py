@@ -0,0 +1,48 @@
+from library.phrase_matcher import phrase_matcher, normalize
+from library.trigger_index import trigger_index
+from library.prefilter import message_prefilter
+import itertools
+
+# Shared by every trigger_set, so a set that was thrown away and built again never reuses a generation
+generations = itertools.count(1)
+
+class trigger_set:
+    """
+    Everything message matching needs to know about one guild's triggers (or the global ones):
+    - triggers: Fuzzy index of the triggers, with their category as the value
+    - categories: Fuzzy index of the categories the triggers belong to
+    - phrases: Exact (normalized) matching of every trigger, including multi-word ones, in a single pass
+    - prefilter: Throws out the words that share no letter pairs with any trigger before any matching is done
+    - generation: Changes every time a trigger is added or removed, so results worked out from the triggers can
+      tell when they're out of date
+    """
+    def __init__(self):
+        self.triggers = trigger_index()
+        self.categories = trigger_index()
+        self.phrases = phrase_matcher()
+        self.prefilter = message_prefilter()
+        self.generation = next(generations)
+
+    def __len__(self):
+        return len(self.triggers)
+
+    def add(self, trigger, category):
+        self.triggers.add(trigger, category)
+        self.categories.add(category)
+        self.phrases.add(trigger)
+        self.prefilter.add(trigger, category, normalize(trigger))
+        self.generation = next(generations)
+
+    def remove(self, trigger, category):
+        self.triggers.remove(trigger)
+        self.categories.remove(category)
+        self.phrases.remove(trigger)
+        self.prefilter.remove(trigger, category, normalize(trigger))
+        self.generation = next(generations)
+
+    def load(self, rows):
+        """
+        :param rows: (trigger, category) tuples
+        """
+        for trigger, category in rows:
+            self.add(trigger, category)
@@ -0,0 +1,31 @@
+import os
+import sys
+
+import pytest
+
+# So the tests can be run from anywhere, not just the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from library import memory
+from library.memory import mem
+
+def drop_conns():
+    memory.close_all_conns()
+    # The closed connections are still cached on the thread, so they're forgotten too
+    vars(memory.thread_conns).clear()
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """
+    A fresh, migrated database in a temporary directory, with the caches emptied. The real memory.sqlite3 is never
+    touched.
+    :return: The temporary directory, which is also the working directory while the test runs
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(memory, 'DB_PATH', str(tmp_path / 'memory.sqlite3'))
+    drop_conns()
+    mem.modernize()
+    mem.reload_caches()
+    yield tmp_path
+    drop_conns()
+    mem.reload_caches()
@@ -0,0 +1,48 @@
+import asyncio
+import threading
+
+from library.memory import mem
+from library.async_memory import amem, run_read, run_write, run_write_steps
+
+def test_reads_and_writes_run_off_the_event_loop():
+    async def run():
+        return await run_read(lambda: threading.current_thread().name), await run_write(
+            lambda: threading.current_thread().name
+        )
+
+    reader, writer = asyncio.run(run())
+    assert reader.startswith('memory-reader') and writer.startswith('memory-writer')
+
+def test_write_steps_let_other_writes_in():
+    done = []
+    queued = threading.Event()
+    def steps():
+        for step in range(3):
+            if step == 0:
+                # Still on the first step when the command's write comes in
+                queued.wait(5)
+            done.append(f'step {step}')
+            yield
+
+    async def run():
+        long_write = asyncio.ensure_future(run_write_steps(steps()))
+        await asyncio.sleep(0)
+        command = asyncio.ensure_future(run_write(done.append, 'command'))
+        await asyncio.sleep(0)
+        queued.set()
+        await asyncio.gather(long_write, command)
+
+    asyncio.run(run())
+    assert done == ['step 0', 'command', 'step 1', 'step 2']
+
+def test_amem_matches_mem(database):
+    # The executor threads keep their connections between tests, so this is the only test that uses the database
+    # through amem
+    async def run():
+        await amem.add_trigger('sun', 'space', 1)
+        await amem.add_fact('space', 1, 'The sun is a star.')
+        return await amem.is_trigger('sun'), await amem.get_random_fact('space')
+
+    match, fact = asyncio.run(run())
+    assert match == mem.is_trigger('sun')
+    assert fact['fact'] == 'The sun is a star.'
@@ -0,0 +1,33 @@
+import sqlite3
+import threading
+
+import pytest
+
+from library.memory import get_conn
+
+def test_connections_are_reused_per_thread(database):
+    writer = get_conn()
+    reader = get_conn(readonly=True)
+    assert get_conn() is writer and get_conn(readonly=True) is reader
+    assert reader is not writer
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(get_conn()))
+    thread.start()
+    thread.join()
+    assert other[0] is not writer
+
+def test_connections_are_tuned(database):
+    conn = get_conn()
+    assert conn.execute('PRAGMA journal_mode;').fetchone()[0] == 'wal'
+    assert conn.execute('PRAGMA synchronous;').fetchone()[0] == 1  # NORMAL
+
+def test_reader_cant_write(database):
+    with pytest.raises(sqlite3.OperationalError):
+        with get_conn(readonly=True) as conn:
+            conn.execute("INSERT INTO triggers (trigger, added_by, category) VALUES ('sun', '1', 'space');")
+
+def test_reader_sees_committed_writes(database):
+    with get_conn() as conn:
+        conn.execute("INSERT INTO triggers (trigger, added_by, category) VALUES ('sun', '1', 'space');")
+    assert get_conn(readonly=True).execute('SELECT trigger FROM triggers;').fetchall() == [('sun',)]
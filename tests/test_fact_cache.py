@@ -0,0 +1,57 @@
+from library import memory
+from library.memory import mem
+from library.fact_cache import fact_cache
+
+def test_least_recently_used_category_is_dropped():
+    cache = fact_cache(max_facts=4)
+    cache.put('a', [(1, 'a1', 7), (2, 'a2', 7)])
+    cache.put('b', [(3, 'b1', 7), (4, 'b2', 7)])
+    assert cache.get('a', 1) == ('a1', 7)
+
+    # 'b' wasn't used since 'a' was, so it goes
+    cache.put('c', [(5, 'c1', 7)])
+    assert 'a' in cache and 'c' in cache and 'b' not in cache
+    assert cache.stats()['facts'] == 3
+
+def test_category_bigger_than_the_cache_isnt_kept():
+    cache = fact_cache(max_facts=2)
+    assert not cache.put('a', [(1, 'a1', 7), (2, 'a2', 7), (3, 'a3', 7)])
+    assert 'a' not in cache
+    assert cache.get('a', 1) is None
+
+def test_add_and_remove_only_touch_cached_categories():
+    cache = fact_cache()
+    cache.add('a', 1, 'a1', 7)
+    assert 'a' not in cache
+
+    cache.put('a', [])
+    cache.add('a', 1, 'a1', 7)
+    cache.add('a', 1, 'a1', 7)
+    assert cache.stats()['facts'] == 1
+    cache.remove('a', 1)
+    cache.remove('a', 1)
+    assert cache.get('a', 1) is None and cache.stats()['facts'] == 0
+
+def test_added_facts_come_with_their_author(database):
+    mem.add_fact('space', 1, 'The sun is a star.')
+    mem.get_random_fact('space')
+
+    mem.add_fact('space', 2, 'Venus spins the other way around.')
+    mem.remove_fact('The sun is a star.')
+    assert memory.facts_cache.get((0, 'space'), 1) is None
+
+    # Everything is answered from the cache now, with the author of the new fact
+    misses = memory.facts_cache.stats()['misses']
+    for _ in range(3):
+        fact = mem.get_random_fact('space')
+        assert (fact['fact'], fact['added_by']) == ('Venus spins the other way around.', '2')
+    assert memory.facts_cache.stats()['misses'] == misses
+
+def test_reload_empties_the_cache(database):
+    mem.add_fact('space', 1, 'The sun is a star.')
+    mem.get_random_fact('space')
+    assert (0, 'space') in memory.facts_cache
+
+    mem.reload_caches()
+    assert memory.facts_cache.stats()['facts'] == 0
+    assert mem.get_random_fact('space')['fact'] == 'The sun is a star.'
@@ -0,0 +1,65 @@
+import asyncio
+
+from library.fact_files import file_format, read_records, format_rows
+from library.memory import mem, get_conn
+
+def read_all(data: bytes, name: str, chunk_size=7) -> list:
+    # Sent in small chunks, so lines (and characters) get split between them like they would be over the network
+    async def chunks():
+        for i in range(0, len(data), chunk_size):
+            yield data[i:i + chunk_size]
+
+    async def run():
+        return [record async for record in read_records(chunks(), file_format(name))]
+    return asyncio.run(run())
+
+def test_file_format():
+    assert file_format('facts.JSONL') == 'jsonl' and file_format('facts.json') == 'jsonl'
+    assert file_format('facts.csv') == 'csv'
+    assert file_format('facts.txt') is None
+
+def test_read_jsonl():
+    data = '\n'.join([
+        '{"category": "space", "fact": " The sun is a star. "}',
+        '',
+        '{"category": "space"}',
+        'not json',
+        '["space", "a list"]',
+        '{"category": "café", "fact": "Crème brûlée is French."}',
+    ]).encode('utf-8')
+    assert read_all(data, 'facts.jsonl') == [
+        ('space', 'The sun is a star.'), None, None, None, ('café', 'Crème brûlée is French.'),
+    ]
+
+def test_read_csv():
+    # Starts with a byte order mark, like a csv saved from Excel
+    data = '\ufeffFact,Category\r\n"Line one,\nline two",space\r\n\r\nonly one column\r\n"Mars is red.",space'
+    assert read_all(data.encode('utf-8'), 'facts.csv') == [
+        ('space', 'Line one,\nline two'), None, ('space', 'Mars is red.'),
+    ]
+    # No header, so it's category then fact
+    assert read_all(b'space,The sun is a star.\n"space","unclosed', 'facts.csv') == [
+        ('space', 'The sun is a star.'), None,
+    ]
+
+def test_export_reads_back():
+    rows = [(1, 'space', 'The sun is a star, "mostly".', '1'), (2, 'space', 'Line one\nline two', '2')]
+    for name in ('facts.jsonl', 'facts.csv'):
+        data = format_rows(rows[:1], file_format(name), header=True) + format_rows(rows[1:], file_format(name))
+        assert read_all(data, name) == [(category, fact) for _, category, fact, _ in rows]
+
+def test_import_counts(database):
+    mem.add_fact('space', 1, 'The sun is a star.')
+    mem.add_fact('space', 1, 'Venus spins the other way around.', guild_id=5)
+    counts = mem.add_facts([
+        ('space', 'The sun is a star.'),
+        ('space', 'Venus spins the other way around.'),
+        ('space', 'Mars has the tallest volcano.'),
+        ('space', 'Mars has the tallest volcano.'),
+        ('space', 'Mars has the tallest volcano!'),
+    ], 2, guild_id=5)
+    assert counts == {'inserted': 1, 'exists': 3, 'near_duplicates': 1}
+
+    cur = get_conn(readonly=True).execute("SELECT guild_id, added_by FROM category_facts WHERE fact LIKE 'Mars%';")
+    assert cur.fetchall() == [(5, '2')]
+    assert mem.search_facts('volcano', guild_id=5)[0][2] == 'Mars has the tallest volcano.'
@@ -0,0 +1,37 @@
+import pytest
+
+from library.fact_sampler import fact_sampler, shuffled_index
+
+@pytest.mark.parametrize('size', [1, 2, 3, 5, 16, 17, 100, 1000])
+def test_shuffled_index_is_a_permutation(size):
+    for seed in range(5):
+        assert sorted(shuffled_index(i, size, seed) for i in range(size)) == list(range(size))
+
+def test_shuffled_index_depends_on_seed():
+    orders = {tuple(shuffled_index(i, 50, seed) for i in range(50)) for seed in range(5)}
+    assert len(orders) == 5
+
+def test_bag_hands_out_every_fact_once():
+    sampler = fact_sampler()
+    sampler.load('space', range(100, 140))
+    first_round = [sampler.pick('space', channel_id=1) for _ in range(40)]
+    assert sorted(first_round) == list(range(100, 140))
+    # Then it starts over with a new order
+    assert sorted(sampler.pick('space', channel_id=1) for _ in range(40)) == list(range(100, 140))
+
+def test_bag_after_removing_facts():
+    sampler = fact_sampler()
+    sampler.load('space', range(10))
+    sampler.pick('space', channel_id=1)
+    for fact_id in (3, 4, 5):
+        sampler.remove('space', fact_id)
+
+    picked = [sampler.pick('space', channel_id=1) for _ in range(20)]
+    assert set(picked) <= {0, 1, 2, 6, 7, 8, 9}
+
+def test_bags_are_capped():
+    sampler = fact_sampler(max_bags=3)
+    sampler.load('space', range(10))
+    for channel_id in range(10):
+        sampler.pick('space', channel_id=channel_id)
+    assert [key[0] for key in sampler.bags] == [7, 8, 9]
@@ -0,0 +1,79 @@
+import sqlite3
+
+import pytest
+
+from library import memory
+from library.memory import mem
+
+def add_facts(category, count, guild_id=0):
+    # They only differ by a number, so they have to be let through the near duplicate check
+    for i in range(count):
+        mem.add_fact(category, 1, f"{category} fact number {i} from guild {guild_id}", True, guild_id)
+
+def test_guild_sees_own_and_global_facts(database):
+    add_facts('space', 3)
+    add_facts('space', 2, guild_id=5)
+    add_facts('space', 4, guild_id=6)
+
+    facts = {mem.get_random_fact('space', channel_id=1, guild_id=5)['fact'] for _ in range(5)}
+    assert facts == {f"space fact number {i} from guild 0" for i in range(3)} | {
+        f"space fact number {i} from guild 5" for i in range(2)
+    }
+    facts = {mem.get_random_fact('space', channel_id=1)['fact'] for _ in range(3)}
+    assert facts == {f"space fact number {i} from guild 0" for i in range(3)}
+
+def test_global_facts_are_loaded_once(database):
+    add_facts('space', 50)
+    add_facts('space', 1, guild_id=5)
+    for guild_id in range(1, 10):
+        mem.get_random_fact('space', guild_id=guild_id)
+
+    assert memory.sampler.count((0, 'space')) == 50
+    assert memory.sampler.count((5, 'space')) == 1
+    assert all(memory.sampler.count((guild_id, 'space')) == 0 for guild_id in range(1, 10) if guild_id != 5)
+    assert memory.facts_cache.stats()['facts'] == 51
+
+def test_added_and_removed_facts_are_picked_up(database):
+    add_facts('space', 1)
+    mem.get_random_fact('space', guild_id=5)
+
+    mem.add_fact('space', 1, 'A guild only fact about space.', guild_id=5)
+    assert {mem.get_random_fact('space', channel_id=2, guild_id=5)['fact'] for _ in range(2)} == {
+        'space fact number 0 from guild 0', 'A guild only fact about space.',
+    }
+    # Other guilds don't get it
+    assert mem.get_random_fact('space', guild_id=6)['fact'] == 'space fact number 0 from guild 0'
+
+    mem.remove_fact('A guild only fact about space.', guild_id=5)
+    assert {mem.get_random_fact('space', guild_id=5)['fact'] for _ in range(10)} == {'space fact number 0 from guild 0'}
+
+def test_guild_can_only_remove_its_own(database):
+    add_facts('space', 1)
+    mem.add_fact('space', 1, 'A guild only fact about space.', guild_id=5)
+    with pytest.raises(sqlite3.IntegrityError):
+        mem.remove_fact('space fact number 0 from guild 0', guild_id=5)
+    with pytest.raises(sqlite3.IntegrityError):
+        mem.remove_fact('A guild only fact about space.', guild_id=6)
+
+    mem.add_trigger('rocket', 'space', 1, guild_id=5)
+    with pytest.raises(sqlite3.IntegrityError):
+        mem.remove_trigger('rocket', guild_id=6)
+    assert mem.match_message('i like rockets', guild_id=5)['trigger'] == 'rocket'
+    assert not mem.match_message('i like rockets', guild_id=6)['result']
+
+    mem.remove_trigger('rocket', guild_id=5)
+    assert not mem.match_message('i like rockets', guild_id=5)['result']
+
+def test_evicted_guild_drops_its_facts(database, monkeypatch):
+    monkeypatch.setattr(memory.trigger_sets, 'max_guilds', 2)
+    for guild_id in (1, 2, 3):
+        add_facts('space', 2, guild_id=guild_id)
+        mem.match_message('hello', guild_id=guild_id)
+        mem.get_random_fact('space', guild_id=guild_id)
+    mem.match_message('hello', guild_id=4)
+
+    # Guilds 1 and 2 were used the longest ago, with guild 4 in they're past the limit
+    assert 1 not in memory.trigger_sets
+    assert not memory.sampler.is_loaded((1, 'space'))
+    assert (1, 'space') not in memory.facts_cache
+    assert memory.sampler.is_loaded((3, 'space')) and memory.sampler.is_loaded((0, 'space'))
@@ -0,0 +1,165 @@
+import hashlib
+import os
+
+from library.importer import BATCH_SIZE, import_categories, sync_categories, import_steps, new_report
+from library import memory
+from library.memory import mem, get_conn
+
+DIRECTORY = 'categories'
+
+def write_category(name, *lines):
+    os.makedirs(DIRECTORY, exist_ok=True)
+    path = os.path.join(DIRECTORY, f'{name}.txt')
+    # Moved along every write, so a rewrite that happens to be the same size still looks changed
+    mtime = os.stat(path).st_mtime_ns + 1_000_000 if os.path.exists(path) else None
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+    if mtime is not None:
+        os.utime(path, ns=(mtime, mtime))
+    return path
+
+def distinct_facts(count, start=0):
+    # Made of unrelated words, so none of them are near duplicates of each other
+    facts = []
+    for i in range(start, start + count):
+        digest = hashlib.sha1(str(i).encode()).hexdigest()
+        facts.append(' '.join(digest[j:j + 5] for j in range(0, 40, 5)) + '.')
+    return facts
+
+def facts_in(category):
+    cur = get_conn().cursor()
+    cur.execute('SELECT fact FROM category_facts WHERE category = ? AND guild_id = 0;', (category,))
+    return {fact for (fact,) in cur.fetchall()}
+
+def test_sync_adds_and_removes_lines(database):
+    write_category('space', 'The sun is a star.', 'Mars is red.', '', 'Venus spins backwards.')
+    report = sync_categories(DIRECTORY)
+    assert report['inserted'] == 3 and report['imported_files'] == 1
+    assert facts_in('space') == {'The sun is a star.', 'Mars is red.', 'Venus spins backwards.'}
+    assert mem.is_trigger('space')['category'] == 'space'
+
+    write_category('space', 'The sun is a star.', 'Venus spins backwards.', 'Jupiter has dozens of moons.')
+    report = sync_categories(DIRECTORY)
+    assert report['inserted'] == 1 and report['removed'] == 1
+    assert facts_in('space') == {'The sun is a star.', 'Venus spins backwards.', 'Jupiter has dozens of moons.'}
+
+def test_unchanged_files_are_skipped(database):
+    write_category('space', 'The sun is a star.')
+    sync_categories(DIRECTORY)
+    report = sync_categories(DIRECTORY)
+    assert report['unchanged_files'] == 1 and report['imported_files'] == 0
+
+def test_deleted_file_removes_its_facts(database):
+    path = write_category('space', 'The sun is a star.', 'Mars is red.')
+    write_category('oceans', 'The ocean is salty.')
+    sync_categories(DIRECTORY)
+
+    os.remove(path)
+    report = sync_categories(DIRECTORY)
+    assert report['removed'] == 2
+    assert facts_in('space') == set()
+    assert facts_in('oceans') == {'The ocean is salty.'}
+
+def test_removed_line_keeps_seed_fact(database):
+    # A default fact (from the category dict at startup) that a category file has a line for as well
+    import_categories({'cats': ['Cats sleep most of the day.']}, DIRECTORY)
+    write_category('cats', 'Cats sleep most of the day.', 'Cats have whiskers on their legs.')
+    report = sync_categories(DIRECTORY)
+    assert report['inserted'] == 1
+
+    write_category('cats', 'Cats have whiskers on their legs.')
+    report = sync_categories(DIRECTORY)
+    assert report['removed'] == 0
+    assert facts_in('cats') == {'Cats sleep most of the day.', 'Cats have whiskers on their legs.'}
+
+def test_removed_line_keeps_fact_added_by_command(database):
+    mem.add_fact('cats', 1, 'A group of cats is called a clowder.')
+    write_category('cats', 'A group of cats is called a clowder.')
+    sync_categories(DIRECTORY)
+
+    write_category('cats', 'Cats have whiskers on their legs.')
+    sync_categories(DIRECTORY)
+    assert 'A group of cats is called a clowder.' in facts_in('cats')
+
+def test_line_shared_by_two_files(database):
+    write_category('cats', 'Cats and dogs can be friends.')
+    write_category('dogs', 'Cats and dogs can be friends.', 'Dogs can smell fear.')
+    sync_categories(DIRECTORY)
+
+    # Still in dogs.txt, so the fact stays
+    write_category('cats', 'Cats have whiskers on their legs.')
+    sync_categories(DIRECTORY)
+    assert facts_in('cats') == {'Cats and dogs can be friends.', 'Cats have whiskers on their legs.'}
+
+    # Now it's in neither
+    write_category('dogs', 'Dogs can smell fear.')
+    report = sync_categories(DIRECTORY)
+    assert report['removed'] == 1
+    assert facts_in('cats') == {'Cats have whiskers on their legs.'}
+
+def test_near_duplicate_lines(database):
+    write_category(
+        'octopuses', 'Octopuses have three hearts and blue blood.', 'Octopuses have three hearts and blue blood!',
+    )
+    report = sync_categories(DIRECTORY)
+    assert report['inserted'] == 1 and report['near_duplicates'] == 1
+
+    # The near duplicate line is remembered too, so it isn't looked at again when something else in the file changes
+    write_category(
+        'octopuses', 'Octopuses have three hearts and blue blood.', 'Octopuses have three hearts and blue blood!',
+        'Octopuses can taste with their arms.',
+    )
+    report = sync_categories(DIRECTORY)
+    assert report['inserted'] == 1 and report['near_duplicates'] == 0
+
+def test_sync_updates_what_is_loaded(database):
+    write_category('space', 'The sun is a star.', 'Mars is red.')
+    sync_categories(DIRECTORY)
+    triggers = mem.load_indexes()
+    mem.get_random_fact('space')
+
+    write_category('space', 'The sun is a star.', 'Venus spins backwards.')
+    write_category('oceans', 'The ocean is salty.')
+    sync_categories(DIRECTORY)
+
+    # Changed in place instead of being thrown away and loaded again
+    assert memory.trigger_sets.peek(0) is triggers
+    assert mem.match_message('the oceans are deep')['category'] == 'oceans'
+    assert memory.sampler.count((0, 'space')) == 2
+    assert {mem.get_random_fact('space', channel_id=1)['fact'] for _ in range(2)} == {
+        'The sun is a star.', 'Venus spins backwards.',
+    }
+
+def count_facts():
+    return get_conn(readonly=True).execute('SELECT COUNT(*) FROM category_facts;').fetchone()[0]
+
+def test_import_commits_every_batch(database):
+    report = new_report()
+    steps = import_steps({'hashes': distinct_facts(BATCH_SIZE * 2 + 10)}, DIRECTORY, report)
+
+    # Each batch can be seen (and used) by everything else as soon as it's done, not only at the end
+    next(steps)
+    assert count_facts() == BATCH_SIZE
+    assert mem.is_trigger('hashes')['result']
+    assert mem.get_random_fact('hashes') is not None
+    next(steps)
+    assert count_facts() == BATCH_SIZE * 2
+
+    for _ in steps:
+        pass
+    assert count_facts() == BATCH_SIZE * 2 + 10
+    assert report['inserted'] == BATCH_SIZE * 2 + 10
+
+def test_stopped_import_carries_on(database):
+    write_category('hashes', *distinct_facts(BATCH_SIZE * 2 + 10))
+    steps = import_steps({}, DIRECTORY, new_report())
+    next(steps)
+    # Like the bot being stopped partway through
+    steps.close()
+    assert count_facts() == BATCH_SIZE
+
+    # The file wasn't marked as imported, so it's gone through again and only the rest is added
+    report = sync_categories(DIRECTORY)
+    assert report['inserted'] == BATCH_SIZE + 10
+    assert count_facts() == BATCH_SIZE * 2 + 10
+    assert sync_categories(DIRECTORY)['unchanged_files'] == 1
@@ -0,0 +1,58 @@
+import threading
+
+from library import memory
+from library.memory import mem
+
+def race_with_load(monkeypatch, name, guild_id):
+    """
+    Makes the next call to memory.<name> try to load the guild's indexes on another thread first, the moment the
+    change was committed, the same as a message coming in at just the wrong time would.
+    :return: The threads, to join once the change is done
+    """
+    real = getattr(memory, name)
+    threads = []
+
+    def racing(*args):
+        if threads:
+            real(*args)
+            return
+        thread = threading.Thread(target=load_everything, args=(guild_id,))
+        thread.start()
+        # Gives the load every chance to get in first, it can only finish once the change is done
+        thread.join(0.2)
+        threads.append(thread)
+        real(*args)
+
+    monkeypatch.setattr(memory, name, racing)
+    return threads
+
+def load_everything(guild_id):
+    mem.load_indexes(guild_id=guild_id)
+    mem.load_autocomplete(guild_id=guild_id)
+    mem.load_category_facts('space', guild_id)
+
+def test_trigger_added_while_loading(database, monkeypatch):
+    threads = race_with_load(monkeypatch, 'trigger_changed', 5)
+    mem.add_trigger('rocket', 'space', 1, guild_id=5)
+    for thread in threads:
+        thread.join()
+    assert mem.match_message('a rocket', guild_id=5)['trigger'] == 'rocket'
+
+    mem.remove_trigger('rocket', guild_id=5)
+    # Nothing left behind that still matches or autocompletes
+    assert not mem.match_message('a rocket', guild_id=5)['result']
+    assert len(memory.trigger_sets.peek(5)) == 0
+    assert mem.autocomplete_triggers('ro', guild_id=5) == []
+    assert mem.autocomplete_categories('sp', guild_id=5) == []
+
+def test_fact_added_while_loading(database, monkeypatch):
+    threads = race_with_load(monkeypatch, 'facts_changed', 5)
+    mem.add_fact('space', 1, 'Mars has two small moons.', guild_id=5)
+    for thread in threads:
+        thread.join()
+    assert mem.autocomplete_facts('mars', guild_id=5) == [(1, 'Mars has two small moons.')]
+
+    mem.remove_fact('Mars has two small moons.', guild_id=5)
+    assert mem.autocomplete_facts('mars', guild_id=5) == []
+    assert mem.autocomplete_categories('sp', guild_id=5) == []
+    assert mem.get_random_fact('space', guild_id=5) is None
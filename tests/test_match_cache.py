@@ -0,0 +1,41 @@
+from library import memory
+from library.memory import mem
+from library.match_cache import match_cache, missing
+
+def test_results_from_other_generations_arent_used():
+    cache = match_cache()
+    cache.put('mangoo', 1, None)
+    # No match is a result too
+    assert cache.get('mangoo', 1) is None
+    assert cache.get('mangoo', 2) is missing
+    # And the stale one was dropped
+    assert cache.get('mangoo', 1) is missing
+    assert cache.stats()['stale'] == 1 and cache.stats()['hits'] == 1
+
+def test_least_recently_used_word_is_dropped():
+    cache = match_cache(max_words=2)
+    cache.put('a', 1, 'a')
+    cache.put('b', 1, 'b')
+    cache.get('a', 1)
+    cache.put('c', 1, 'c')
+    assert list(cache.words) == ['a', 'c']
+
+def test_matches_are_cached_until_the_triggers_change(database):
+    mem.add_trigger('mango', 'fruit', 1)
+    assert mem.match_message('I love mangoo')['trigger'] == 'mango'
+    hits = memory.word_matches.stats()['hits']
+    assert mem.match_message('mangoo again')['trigger'] == 'mango'
+    assert memory.word_matches.stats()['hits'] == hits + 1
+
+    mem.remove_trigger('mango')
+    mem.add_trigger('mangoos', 'fruit', 1)
+    assert mem.match_message('I love mangoo')['trigger'] == 'mangoos'
+
+def test_guild_triggers_change_the_guilds_matches(database):
+    mem.add_trigger('mango', 'fruit', 1)
+    assert mem.match_message('mangooo', guild_id=5)['category'] == 'fruit'
+
+    # The guild's own trigger is closer now, so what was worked out before it was added can't be used
+    mem.add_trigger('mangoo', 'guild fruit', 1, guild_id=5)
+    assert mem.match_message('mangooo', guild_id=5)['category'] == 'guild fruit'
+    assert mem.match_message('mangooo', guild_id=6)['category'] == 'fruit'
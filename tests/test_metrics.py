@@ -0,0 +1,49 @@
+import threading
+
+from library import memory, metrics
+from library.memory import mem
+
+def test_histogram_percentiles():
+    hist = metrics.histogram()
+    for _ in range(98):
+        hist.observe(0.0003)
+    hist.observe(0.02)
+    hist.observe(3)
+    assert hist.percentile(0.5) == 0.0005
+    assert hist.percentile(0.99) == 0.025
+    assert hist.percentile(1) == 5.0
+    assert hist.summary()['count'] == 100
+
+def test_collect_while_an_index_is_building(database):
+    mem.add_trigger('rocket', 'space', 1)
+    mem.match_message('a rocket')
+
+    holding, release = threading.Event(), threading.Event()
+
+    def build():
+        # The lock is held like this for the whole build of a big guild's indexes
+        with memory.trigger_sets.lock:
+            holding.set()
+            release.wait(5)
+
+    builder = threading.Thread(target=build)
+    builder.start()
+    holding.wait()
+    try:
+        collected = []
+        reader = threading.Thread(target=lambda: collected.append(metrics.collect()))
+        reader.start()
+        reader.join(1)
+        assert collected, "collect() waited for the trigger_sets lock"
+        assert collected[0]['prefilter']['messages'] > 0
+        assert collected[0]['prefilter']['bigrams'] > 0
+    finally:
+        release.set()
+        builder.join()
+
+def test_prometheus_text():
+    metrics.observe('test.render', 0.001)
+    text = metrics.render_prometheus()
+    assert '# TYPE factry_test_render_seconds histogram' in text
+    assert 'factry_test_render_seconds_bucket{le="+Inf"}' in text
+    assert '\nfactry_prefilter_messages ' in text
@@ -0,0 +1,122 @@
+import sqlite3
+import os
+
+import pytest
+
+from library.default_categories import SEED_AUTHOR, category_fact_dict
+from library.migrations import MIGRATIONS, get_version, migrate
+from library.near_duplicates import NearDuplicateFact
+from library.memory import mem
+
+def make_baseline(path):
+    """
+    A database the way the bot made it before migrations: no version, and the tables from the first create_tables.
+    """
+    conn = sqlite3.connect(path)
+    conn.executescript('''
+        CREATE TABLE triggers (
+            trigger TEXT NOT NULL UNIQUE PRIMARY KEY,
+            added_by TEXT NOT NULL,
+            category TEXT NOT NULL REFERENCES category_facts(category)
+        );
+        CREATE TABLE category_facts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            category TEXT NOT NULL,
+            added_by TEXT NOT NULL,
+            fact TEXT NOT NULL UNIQUE
+        );
+        INSERT INTO triggers VALUES ('space', '1', 'space'), ('stars', '1', 'space');
+        INSERT INTO category_facts (id, category, added_by, fact) VALUES
+            (3, 'space', '1', 'The sun is a star in the Milky Way galaxy.'),
+            (7, 'space', '2', 'A day on Venus is longer than its year.');
+        -- Deleted facts leave the sequence ahead of the ids that are left
+        UPDATE sqlite_sequence SET seq = 10 WHERE name = 'category_facts';
+    ''')
+    conn.commit()
+    return conn
+
+@pytest.fixture
+def baseline(database):
+    # A fresh file next to the fixture's database, so modernize hasn't touched it yet
+    conn = make_baseline(str(database / 'baseline.sqlite3'))
+    yield conn
+    conn.close()
+
+def test_migrates_baseline(baseline):
+    assert get_version(baseline) == 0
+    assert migrate(baseline) == len(MIGRATIONS)
+
+    rows = baseline.execute('SELECT id, guild_id, category, added_by, fact FROM category_facts ORDER BY id;').fetchall()
+    assert rows == [
+        (3, 0, 'space', '1', 'The sun is a star in the Milky Way galaxy.'),
+        (7, 0, 'space', '2', 'A day on Venus is longer than its year.'),
+    ]
+    triggers = baseline.execute('SELECT trigger, guild_id, category FROM triggers ORDER BY trigger;').fetchall()
+    assert triggers == [('space', 0, 'space'), ('stars', 0, 'space')]
+
+    # The ids of deleted facts still aren't handed out again
+    baseline.execute("INSERT INTO category_facts (category, added_by, fact) VALUES ('space', '1', 'Mars is red.');")
+    assert baseline.execute("SELECT id FROM category_facts WHERE fact = 'Mars is red.';").fetchone() == (11,)
+
+    # The facts that were there are in the search and near duplicate indexes
+    assert baseline.execute("SELECT rowid FROM facts_search WHERE facts_search MATCH 'venus';").fetchall() == [(7,)]
+    assert baseline.execute('SELECT DISTINCT fact_id FROM fact_bands ORDER BY fact_id;').fetchall() == [(3,), (7,)]
+
+def test_migrating_again_does_nothing(baseline):
+    migrate(baseline)
+    schema = baseline.execute('SELECT sql FROM sqlite_master ORDER BY name;').fetchall()
+    assert migrate(baseline) == len(MIGRATIONS)
+    assert baseline.execute('SELECT sql FROM sqlite_master ORDER BY name;').fetchall() == schema
+
+def test_same_fact_in_two_guilds(baseline):
+    migrate(baseline)
+    # Only unique within a guild now
+    baseline.execute('''
+        INSERT INTO category_facts (category, added_by, fact, guild_id)
+        VALUES ('space', '1', 'A day on Venus is longer than its year.', 5);
+    ''')
+    baseline.execute("INSERT INTO triggers (trigger, added_by, category, guild_id) VALUES ('space', '1', 'space', 5);")
+    with pytest.raises(sqlite3.IntegrityError):
+        baseline.execute('''
+            INSERT INTO category_facts (category, added_by, fact, guild_id)
+            VALUES ('space', '1', 'A day on Venus is longer than its year.', 0);
+        ''')
+
+def test_leftover_tables_from_stopped_migration(baseline):
+    # What partition_by_guild leaves behind if the bot is stopped in the middle of it
+    baseline.execute('CREATE TABLE triggers_new (trigger TEXT);')
+    baseline.execute('CREATE TABLE category_facts_new (id INTEGER);')
+    baseline.commit()
+    assert migrate(baseline) == len(MIGRATIONS)
+    assert baseline.execute('SELECT COUNT(*) FROM category_facts;').fetchone() == (2,)
+
+def test_migrated_database_works(database):
+    # The fixture's database was migrated from nothing by mem.modernize
+    mem.add_trigger('space', 'space', 1)
+    mem.add_fact('space', 1, 'The sun is a star in the Milky Way galaxy.')
+    with pytest.raises(NearDuplicateFact):
+        mem.add_fact('space', 1, 'The sun is a star in the milky way galaxy!!')
+    assert mem.get_fact('space') == 'The sun is a star in the Milky Way galaxy.'
+    assert [row[2] for row in mem.search_facts('milky')] == ['The sun is a star in the Milky Way galaxy.']
+
+def test_imported_lines_only_tie_facts_from_files(baseline):
+    default_fact = category_fact_dict['space'][0]
+    os.makedirs('categories')
+    with open(os.path.join('categories', 'space.txt'), 'w', encoding='utf-8') as f:
+        f.write(f"{default_fact}\nThe sun is a star in the Milky Way galaxy.\nFrom the file.\nNot imported yet.\n")
+    baseline.executescript(f'''
+        CREATE TABLE imported_files (path TEXT PRIMARY KEY, hash TEXT, size INTEGER, mtime INTEGER);
+        INSERT INTO imported_files VALUES ('{os.path.join('categories', 'space.txt')}', '', 0, 0);
+        INSERT INTO category_facts (id, category, added_by, fact) VALUES
+            (20, 'space', '{SEED_AUTHOR}', '{default_fact.replace("'", "''")}'),
+            (21, 'space', '{SEED_AUTHOR}', 'From the file.');
+    ''')
+    migrate(baseline)
+
+    lines = dict(baseline.execute('SELECT line, fact_id FROM imported_lines;').fetchall())
+    # The default fact, and the one added by someone (fact 3), aren't the file's to delete
+    assert lines == {
+        default_fact: None,
+        'The sun is a star in the Milky Way galaxy.': None,
+        'From the file.': 21,
+    }
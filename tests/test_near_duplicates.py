@@ -0,0 +1,72 @@
+import sqlite3
+
+import pytest
+
+from library.near_duplicates import NearDuplicateFact, SIMILARITY, signature, similarity, word_set
+from library.near_duplicates import find_near_duplicate, split_near_duplicates
+from library.memory import mem, get_conn
+
+FACT = "Octopuses have three hearts and blue blood in their bodies"
+# 9 of the 10 words in FACT, 0.9 similar
+CLOSE = "Octopuses have three hearts and blue blood in bodies"
+# 9 of the 12 different words, exactly SIMILARITY
+AT_THRESHOLD = "Octopuses have three hearts and blue blood in their arms and veins"
+# 6 of 13 words in total
+FAR = "Octopuses have three hearts but squids are different"
+
+def test_similarity():
+    assert similarity(word_set(FACT), word_set(CLOSE)) == 0.9
+    assert similarity(word_set(FACT), word_set(AT_THRESHOLD)) == pytest.approx(SIMILARITY)
+    assert similarity(word_set(FACT), word_set(FAR)) < SIMILARITY
+    assert similarity(set(), word_set(FACT)) == 0.0
+
+def test_signature_ignores_case_and_symbols():
+    assert signature(FACT) == signature(FACT.upper() + '!!')
+    assert signature('?!') == (set(), [])
+
+def test_find_near_duplicate(database):
+    mem.add_fact('octopuses', 1, FACT)
+    cur = get_conn().cursor()
+
+    match = find_near_duplicate(cur, *signature(CLOSE))
+    assert match is not None and match[1] == FACT and match[2] == 0.9
+    assert find_near_duplicate(cur, *signature(AT_THRESHOLD))[1] == FACT
+    assert find_near_duplicate(cur, *signature(FAR)) is None
+
+def test_add_fact_refuses_near_duplicates(database):
+    mem.add_fact('octopuses', 1, FACT)
+    with pytest.raises(NearDuplicateFact) as raised:
+        mem.add_fact('octopuses', 1, CLOSE)
+    assert raised.value.fact == FACT
+    # It's an IntegrityError, so the commands that only catch those still handle it
+    assert isinstance(raised.value, sqlite3.IntegrityError)
+
+    assert mem.add_fact('octopuses', 1, CLOSE, allow_similar=True)
+    assert mem.add_fact('octopuses', 1, FAR)
+
+def test_near_duplicates_are_per_guild(database):
+    mem.add_fact('octopuses', 1, FACT, guild_id=5)
+    # Another guild's facts don't count
+    assert mem.add_fact('octopuses', 1, CLOSE, guild_id=6)
+    # A global fact counts for every guild
+    mem.add_fact('octopuses', 1, FAR)
+    with pytest.raises(NearDuplicateFact):
+        mem.add_fact('octopuses', 1, FAR + '!', guild_id=7)
+
+def test_split_near_duplicates(database):
+    mem.add_fact('octopuses', 1, FACT)
+    cur = get_conn().cursor()
+
+    other = "Honey never spoils even after thousands of years in a jar"
+    other_close = "Honey never spoils even after thousands of years in jars"
+    new_facts, near_duplicates = split_near_duplicates(cur, [CLOSE, other, other_close, FAR])
+    assert set(new_facts) == {other, FAR}
+    assert near_duplicates[CLOSE][1] == FACT
+    # Only a near duplicate of one earlier in the same batch
+    assert near_duplicates[other_close] is None
+    assert new_facts[FAR] == signature(FAR)[1]
+
+def test_add_facts_counts(database):
+    mem.add_fact('octopuses', 1, FACT)
+    counts = mem.add_facts([('octopuses', FACT), ('octopuses', CLOSE), ('octopuses', FAR), ('octopuses', FAR)], 1)
+    assert counts == {'inserted': 1, 'exists': 2, 'near_duplicates': 1}
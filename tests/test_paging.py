@@ -0,0 +1,109 @@
+from library.memory import mem
+
+def walk_forward(fetch_page, key, limit):
+    rows, after = [], None
+    while True:
+        page = fetch_page(after=after, before=None, limit=limit)
+        rows += page
+        if len(page) < limit:
+            return rows
+        after = key(page[-1])
+
+def walk_back(fetch_page, key, limit, last):
+    rows, before = [last], key(last)
+    while True:
+        page = fetch_page(after=None, before=before, limit=limit)
+        rows = page + rows
+        if len(page) < limit:
+            return rows
+        before = key(page[0])
+
+def test_triggers_with_the_same_name_in_guild_and_global(database):
+    for trigger in ('apple', 'banana', 'cherry', 'date'):
+        mem.add_trigger(trigger, 'fruit', 1)
+    for trigger in ('banana', 'cherry', 'elderberry'):
+        mem.add_trigger(trigger, 'guild fruit', 1, guild_id=5)
+
+    expected = [
+        ('apple', 'fruit', 0), ('banana', 'fruit', 0), ('banana', 'guild fruit', 5), ('cherry', 'fruit', 0),
+        ('cherry', 'guild fruit', 5), ('date', 'fruit', 0), ('elderberry', 'guild fruit', 5),
+    ]
+    key = lambda row: (row[0], row[2])
+    fetch_page = lambda **kwargs: mem.list_triggers_page(guild_id=5, **kwargs)
+    for limit in (1, 2, 3, 10):
+        assert walk_forward(fetch_page, key, limit) == expected
+        assert walk_back(fetch_page, key, limit, expected[-1]) == expected
+
+    # Other guilds only see the global ones
+    assert walk_forward(lambda **kwargs: mem.list_triggers_page(guild_id=6, **kwargs), key, 2) == [
+        row for row in expected if row[2] == 0
+    ]
+
+def test_facts_pages_mix_guild_and_global(database):
+    mem.add_facts([('fruit', f"Global fact {i}") for i in range(5)], 1, allow_similar=True)
+    mem.add_facts([('fruit', f"Guild fact {i}") for i in range(3)], 1, allow_similar=True, guild_id=5)
+    mem.add_facts([('fruit', f"Global fact {i}") for i in range(5, 8)], 1, allow_similar=True)
+    mem.add_fact('fruit', 1, 'Another guild has this one.', guild_id=6)
+
+    key = lambda row: row[0]
+    fetch_page = lambda after, before, limit: mem.list_facts_page(after, before, limit, guild_id=5)
+    expected = walk_forward(fetch_page, key, 100)
+    assert len(expected) == 11 and [row[0] for row in expected] == sorted(row[0] for row in expected)
+    assert 'Another guild has this one.' not in [row[2] for row in expected]
+    for limit in (1, 3, 4):
+        assert walk_forward(fetch_page, key, limit) == expected
+        assert walk_back(fetch_page, key, limit, expected[-1]) == expected
+
+def test_categories_are_listed_once(database):
+    for category in ('apple', 'cherry', 'elderberry'):
+        mem.add_trigger(category, category, 1)
+    for category in ('banana', 'cherry'):
+        mem.add_trigger(f'{category} guild', category, 1, guild_id=5)
+
+    key = lambda row: row[0]
+    fetch_page = lambda **kwargs: mem.list_categories_page(guild_id=5, **kwargs)
+    expected = [('apple',), ('banana',), ('cherry',), ('elderberry',)]
+    for limit in (1, 2, 10):
+        assert walk_forward(fetch_page, key, limit) == expected
+        assert walk_back(fetch_page, key, limit, expected[-1]) == expected
+
+def test_export_only_has_the_guilds_own_facts(database):
+    mem.add_fact('fruit', 1, 'A global fact about fruit.')
+    mem.add_facts([('fruit', f"Guild fact {i}") for i in range(5)], 2, allow_similar=True, guild_id=5)
+
+    rows, after = [], None
+    while True:
+        page = mem.export_facts_page(after, limit=2, guild_id=5)
+        if not page:
+            break
+        rows += page
+        after = page[-1][0]
+    assert [(category, fact, added_by) for _, category, fact, added_by in rows] == [
+        ('fruit', f"Guild fact {i}", '2') for i in range(5)
+    ]
+
+def test_search_ranks_every_match(database):
+    # Lots of facts that only mention bananas in passing, then the one that's all about them, added last
+    rows = [('fruit', f"Fact {i} is mostly about other things but it says banana once, among many other words")
+            for i in range(1200)]
+    mem.add_facts(rows, 1, allow_similar=True)
+    mem.add_fact('fruit', 1, 'Banana banana banana.', allow_similar=True)
+
+    assert mem.search_facts('banana', limit=1)[0][2] == 'Banana banana banana.'
+    # Only the start of the last word is needed
+    assert mem.search_facts('bana', limit=1)[0][2] == 'Banana banana banana.'
+
+def test_search_pages(database):
+    mem.add_facts([('fruit', f"Banana fact {i}" + ' filler' * (i % 7)) for i in range(40)], 1, allow_similar=True)
+    mem.add_fact('fruit', 1, 'A guild banana fact.', guild_id=5)
+
+    key = lambda row: (row[3], row[0])
+    fetch_page = lambda **kwargs: mem.search_facts('banana', **kwargs)
+    rows = walk_forward(fetch_page, key, 7)
+    assert len(rows) == 40 and len({row[0] for row in rows}) == 40
+    assert [key(row) for row in rows] == sorted(key(row) for row in rows)
+    assert walk_back(fetch_page, key, 7, rows[-1]) == rows
+
+    # The guild's own facts are searched too, but not another guild's
+    assert len(walk_forward(lambda **kwargs: mem.search_facts('banana', guild_id=5, **kwargs), key, 10)) == 41
+    assert mem.search_facts('guild banana', guild_id=6) == []
@@ -0,0 +1,42 @@
+from library.phrase_matcher import phrase_matcher, normalize
+
+def make_matcher(*triggers):
+    matcher = phrase_matcher()
+    for trigger in triggers:
+        matcher.add(trigger)
+    return matcher
+
+def test_overlapping_triggers():
+    matcher = make_matcher('ice', 'ice cream', 'cream', 'cream cheese', 'ice cream cake')
+    text = normalize('I love ICE cream cheese!')
+    assert matcher.scan(text) == [
+        (7, 16, 'ice cream'),
+        (7, 10, 'ice'),
+        (11, 23, 'cream cheese'),
+        (11, 16, 'cream'),
+    ]
+
+def test_only_whole_words():
+    matcher = make_matcher('cat', 'at')
+    assert matcher.scan(normalize('concatenate that')) == []
+    assert matcher.scan(normalize('a cat at home')) == [(2, 5, 'cat'), (6, 8, 'at')]
+
+def test_prefix_and_suffix_of_a_longer_trigger():
+    # "day" is only found through the output links, since the scan is partway into "good day" at the time
+    matcher = make_matcher('good day', 'day', 'good')
+    assert matcher.scan(normalize('Good day!')) == [(0, 8, 'good day'), (0, 4, 'good'), (5, 8, 'day')]
+    assert matcher.scan(normalize('good dayz')) == [(0, 4, 'good')]
+
+def test_triggers_that_normalize_the_same():
+    matcher = make_matcher('Ice Cream', 'ice  cream!')
+    found = {trigger for _, _, trigger in matcher.scan(normalize('ice cream'))}
+    assert found == {'Ice Cream', 'ice  cream!'}
+
+def test_remove_and_add_again():
+    matcher = make_matcher('ice', 'ice cream', 'cream')
+    matcher.remove('ice cream')
+    assert matcher.scan('ice cream') == [(0, 3, 'ice'), (4, 9, 'cream')]
+    assert len(matcher) == 2
+
+    matcher.add('ice cream')
+    assert (0, 9, 'ice cream') in matcher.scan('ice cream')
@@ -0,0 +1,66 @@
+import types
+
+import pytest
+
+from library import rate_limit
+from library.rate_limit import rate_limiter
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    A clock the test moves by hand, instead of waiting for the buckets to refill.
+    """
+    now = types.SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(rate_limit, 'time', types.SimpleNamespace(monotonic=lambda: now.value))
+    return now
+
+def reply(limiter, guild_id, channel_id, trigger):
+    return limiter.can_reply(guild_id, channel_id) and limiter.take(guild_id, channel_id, trigger)
+
+def test_channel_burst_then_refill(clock):
+    limiter = rate_limiter(1, 3, 0, 0, 0)
+    assert [reply(limiter, 1, 10, 'sun') for _ in range(4)] == [True, True, True, False]
+    # Other channels have their own replies
+    assert reply(limiter, 1, 11, 'sun')
+
+    clock.value += 1
+    assert reply(limiter, 1, 10, 'sun')
+    assert not reply(limiter, 1, 10, 'sun')
+    assert limiter.stats() == {
+        'allowed': 5, 'suppressed': {'channel': 2, 'guild': 0, 'trigger': 0}, 'suppressed_total': 2
+    }
+
+def test_guild_limit_covers_every_channel(clock):
+    limiter = rate_limiter(0, 0, 1, 2, 0)
+    assert reply(limiter, 1, 10, 'sun')
+    assert reply(limiter, 1, 11, 'sun')
+    assert not reply(limiter, 1, 12, 'sun')
+    assert reply(limiter, 2, 12, 'sun')
+    assert limiter.stats()['suppressed']['guild'] == 1
+
+def test_trigger_cooldown_is_per_channel(clock):
+    limiter = rate_limiter(0, 0, 0, 0, 30)
+    assert reply(limiter, 1, 10, 'sun')
+    assert not reply(limiter, 1, 10, 'sun')
+    assert reply(limiter, 1, 10, 'moon')
+    assert reply(limiter, 1, 11, 'sun')
+
+    clock.value += 30
+    assert reply(limiter, 1, 10, 'sun')
+    assert limiter.stats()['suppressed']['trigger'] == 1
+
+def test_cooling_down_doesnt_use_up_replies(clock):
+    limiter = rate_limiter(1, 2, 0, 0, 30)
+    assert reply(limiter, 1, 10, 'sun')
+    for _ in range(5):
+        assert not reply(limiter, 1, 10, 'sun')
+    assert reply(limiter, 1, 10, 'moon')
+
+def test_buckets_are_capped(clock):
+    limiter = rate_limiter(1, 1, 0, 0, 30, max_buckets=2)
+    for channel_id in range(5):
+        assert reply(limiter, 1, channel_id, 'sun')
+    assert list(limiter.channels) == [3, 4]
+    assert len(limiter.last_trigger) == 2
+    # The first channel was forgotten, so it starts over with a full bucket
+    assert reply(limiter, 1, 0, 'sun')
@@ -0,0 +1,100 @@
+import asyncio
+import types
+
+from library import reply_queue as reply_queue_module
+from library.reply_queue import reply_queue
+
+def sender(sent, text, fail=False):
+    async def send():
+        await asyncio.sleep(0)
+        if fail:
+            raise RuntimeError(text)
+        sent.append(text)
+    return send
+
+async def drain(queue):
+    while queue.workers:
+        await asyncio.gather(*queue.workers.values())
+
+def test_replies_are_sent_in_order():
+    sent = []
+    async def run():
+        queue = reply_queue(per_channel=3)
+        for text in ('a', 'b', 'c'):
+            queue.put(1, sender(sent, text))
+        queue.put(2, sender(sent, 'd'))
+        assert queue.depth == 4 and len(queue.workers) == 2
+        await drain(queue)
+        return queue
+
+    queue = asyncio.run(run())
+    assert [text for text in sent if text != 'd'] == ['a', 'b', 'c'] and 'd' in sent
+    # Nothing is kept around for a channel once it's quiet
+    assert queue.channels == {} and queue.depth == 0
+    assert queue.stats()['sent'] == 4
+
+def test_flooded_channel_keeps_the_newest():
+    sent = []
+    async def run():
+        queue = reply_queue(per_channel=2)
+        for text in ('a', 'b', 'c', 'd'):
+            queue.put(1, sender(sent, text))
+        await drain(queue)
+        return queue
+
+    queue = asyncio.run(run())
+    assert sent == ['c', 'd']
+    assert queue.stats()['dropped'] == {'coalesced': 2, 'stale': 0, 'full': 0}
+
+def test_per_channel_below_one_still_sends():
+    sent = []
+    async def run():
+        queue = reply_queue(per_channel=0)
+        queue.put(1, sender(sent, 'a'))
+        queue.put(1, sender(sent, 'b'))
+        await drain(queue)
+
+    asyncio.run(run())
+    assert sent == ['b']
+
+def test_total_is_capped():
+    sent = []
+    async def run():
+        queue = reply_queue(max_total=2)
+        results = [queue.put(channel_id, sender(sent, str(channel_id))) for channel_id in range(3)]
+        await drain(queue)
+        return queue, results
+
+    queue, results = asyncio.run(run())
+    assert results == [True, True, False]
+    assert sorted(sent) == ['0', '1']
+    assert queue.stats()['dropped']['full'] == 1
+
+def test_stale_replies_are_dropped(monkeypatch):
+    now = types.SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(reply_queue_module, 'time', types.SimpleNamespace(monotonic=lambda: now.value))
+    sent = []
+    async def run():
+        queue = reply_queue(max_age=15)
+        queue.put(1, sender(sent, 'a'))
+        now.value += 16
+        queue.put(1, sender(sent, 'b'))
+        await drain(queue)
+        return queue
+
+    queue = asyncio.run(run())
+    assert sent == ['b']
+    assert queue.stats()['dropped']['stale'] == 1
+
+def test_failed_reply_doesnt_stop_the_channel():
+    sent = []
+    async def run():
+        queue = reply_queue()
+        queue.put(1, sender(sent, 'a', fail=True))
+        queue.put(1, sender(sent, 'b'))
+        await drain(queue)
+        return queue
+
+    queue = asyncio.run(run())
+    assert sent == ['b']
+    assert queue.stats()['failed'] == 1 and queue.stats()['sent'] == 1
@@ -0,0 +1,127 @@
+import multiprocessing
+
+import pytest
+
+from library import memory
+from library.memory import mem, get_conn
+from library.snapshot import snapshot, shared_snapshot, write_snapshot
+
+def add_rows(triggers=(), facts=()):
+    """
+    Writes straight to the tables, the way another process would, without touching anything loaded in this one.
+    :return: The changes to publish, like memory.apply_changes takes them
+    """
+    changes = []
+    with get_conn() as conn:
+        cur = conn.cursor()
+        for guild_id, trigger, category in triggers:
+            cur.execute('''
+                INSERT INTO triggers (trigger, added_by, category, guild_id)
+                VALUES (?, '1', ?, ?);
+            ''', (trigger, category, guild_id))
+            changes.append(('trigger', True, guild_id, trigger, category))
+        rows = []
+        for guild_id, category, fact in facts:
+            cur.execute('''
+                INSERT INTO category_facts (guild_id, category, added_by, fact)
+                VALUES (?, ?, '1', ?);
+            ''', (guild_id, category, fact))
+            rows.append((cur.lastrowid, guild_id, category, fact, '1'))
+        if rows:
+            changes.append(('facts', True, rows))
+    return changes
+
+@pytest.fixture
+def snapshots(database, monkeypatch):
+    """
+    Two processes sharing a snapshot, this one (which mem reads from) and another one that publishes.
+    """
+    generation = multiprocessing.Value('Q', 0)
+    publishing = multiprocessing.Lock()
+    path = str(database / 'snapshot')
+    ours = shared_snapshot(path, generation, publishing)
+    theirs = shared_snapshot(path, generation, publishing)
+    theirs.publish(get_conn(readonly=True))
+    # Put back when the test is over, so the other tests go to the database again
+    monkeypatch.setattr(memory, 'shared', None)
+    mem.use_snapshot(ours)
+    return ours, theirs
+
+def test_snapshot_reads_back(database):
+    add_rows(
+        triggers=[(0, 'sun', 'space'), (5, 'moon', 'space')],
+        facts=[(0, 'space', 'The sun is a star.'), (5, 'space', 'The moon has moonquakes.')]
+    )
+    write_snapshot(get_conn(readonly=True), str(database / 'snapshot'))
+    current = snapshot(str(database / 'snapshot'))
+
+    assert current.triggers() == [('sun', 'space')]
+    assert current.triggers(5) == [('moon', 'space')]
+    assert current.triggers(6) == []
+    assert current.category_fact_ids('space') == [1]
+    assert current.category_fact_ids('space', 5) == [2]
+    assert current.get_fact(2) == ('The moon has moonquakes.', '1')
+    assert current.get_fact(3) is None
+    current.close()
+
+def test_refresh_reads_what_changed(database):
+    generation = multiprocessing.Value('Q', 0)
+    publishing = multiprocessing.Lock()
+    ours = shared_snapshot(str(database / 'snapshot'), generation, publishing)
+    theirs = shared_snapshot(str(database / 'snapshot'), generation, publishing)
+
+    theirs.publish(get_conn(readonly=True))
+    # Nothing was loaded from an older one, so there's nothing to apply
+    assert ours.refresh() == (True, None)
+    assert ours.refresh() == (False, [])
+
+    first = add_rows(triggers=[(0, 'sun', 'space')])
+    theirs.publish(get_conn(readonly=True), first)
+    second = add_rows(facts=[(0, 'space', 'The sun is a star.')])
+    theirs.publish(get_conn(readonly=True), second)
+    opened, changes = ours.refresh()
+    assert opened
+    # Lists come back from json, and it was published from this same process
+    assert changes == [(True, list(change)) for change in first] + [
+        (True, ['facts', True, [list(row) for row in second[0][2]]])
+    ]
+
+    # One publish that isn't known means everything has to be reloaded
+    theirs.publish(get_conn(readonly=True), add_rows(triggers=[(0, 'moon', 'space')]))
+    theirs.publish(get_conn(readonly=True))
+    assert ours.refresh() == (True, None)
+
+def test_other_process_changes_are_applied(snapshots):
+    _, theirs = snapshots
+    assert not mem.is_trigger('sun')['result']
+    assert mem.get_random_fact('space') is None
+    loaded = memory.trigger_sets.peek(0)
+
+    theirs.publish(get_conn(readonly=True), add_rows(
+        triggers=[(0, 'sun', 'space')], facts=[(0, 'space', 'The sun is a star.')]
+    ))
+    assert mem.is_trigger('sun')['category'] == 'space'
+    assert mem.get_random_fact('space')['fact'] == 'The sun is a star.'
+    # Updated in place, not thrown away and loaded again
+    assert memory.trigger_sets.peek(0) is loaded
+
+    fact = mem.get_random_fact('space')
+    with get_conn() as conn:
+        conn.execute('DELETE FROM category_facts WHERE id = ?;', (fact['id'],))
+        conn.execute("DELETE FROM triggers WHERE trigger = 'sun';")
+    theirs.publish(get_conn(readonly=True), [
+        ('trigger', False, 0, 'sun', 'space'), ('facts', False, [(fact['id'], 0, 'space', fact['fact'], '1')])
+    ])
+    assert not mem.is_trigger('sun')['result']
+    assert mem.get_random_fact('space') is None
+    assert memory.trigger_sets.peek(0) is loaded
+
+def test_unknown_changes_reload_everything(snapshots):
+    _, theirs = snapshots
+    assert not mem.is_trigger('sun')['result']
+    loaded = memory.trigger_sets.peek(0)
+
+    add_rows(triggers=[(0, 'sun', 'space')])
+    theirs.publish(get_conn(readonly=True))
+    assert mem.is_trigger('sun')['category'] == 'space'
+    assert memory.trigger_sets.peek(0) is not loaded
@@ -0,0 +1,23 @@
+from library import startup
+from library.memory import mem
+
+def test_exact_match_before_the_indexes_load(database):
+    mem.add_trigger('sun', 'space', 1)
+    mem.add_trigger('moon', 'space', 1)
+    mem.add_trigger('moon', 'guild moon', 1, guild_id=5)
+    mem.add_trigger('black hole', 'space', 1)
+
+    assert mem.match_exact('Look at the MOON and the sun!')['trigger'] == 'moon'
+    assert mem.match_exact('look at the moon', guild_id=5)['category'] == 'guild moon'
+    assert mem.match_exact('look at the moon', guild_id=6)['category'] == 'space'
+    # Only one word triggers, spelled right, are found this early
+    assert not mem.match_exact('a black hole')['result']
+    assert not mem.match_exact('the suns')['result']
+
+def test_startup_report(monkeypatch):
+    monkeypatch.setattr(startup, 'phases', {})
+    with startup.phase('seed'):
+        pass
+    startup.mark('gateway')
+    report = startup.report()
+    assert list(report) == ['seed', 'gateway', 'warm'] and report['warm'] == startup.warm.is_set()
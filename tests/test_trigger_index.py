@@ -0,0 +1,76 @@
+from difflib import SequenceMatcher
+import random
+
+from library.trigger_index import trigger_index
+
+SYLLABLES = ['ka', 'lo', 'mi', 'ne', 'ru', 'sa', 'to', 'vi', 'ain', 'sp', 'ace', 'str', 'on', 'ing', 'er', 'ous']
+
+def make_word(rng):
+    return ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 4)))
+
+def typo(rng, word):
+    """
+    Changes, adds or removes a letter or two, so plenty of queries land just over or under the threshold.
+    """
+    letters = list(word)
+    for _ in range(rng.randint(1, 2)):
+        spot = rng.randrange(len(letters) + 1)
+        action = rng.choice(('add', 'remove', 'change'))
+        if action == 'add' or not letters:
+            letters.insert(spot, rng.choice('abcdefghijklmnopqrstuvwxyz '))
+        elif action == 'remove':
+            del letters[min(spot, len(letters) - 1)]
+        else:
+            letters[min(spot, len(letters) - 1)] = rng.choice('abcdefghijklmnopqrstuvwxyz')
+    return ''.join(letters)
+
+def linear_scan(words, query):
+    # How is_trigger used to work, before the index: a SequenceMatcher against every trigger
+    return {word for word in words if SequenceMatcher(None, word, query).ratio() > 0.8}
+
+def test_search_matches_linear_scan():
+    rng = random.Random(1234)
+    words = list({make_word(rng) for _ in range(600)})
+    index = trigger_index()
+    for word in words:
+        index.add(word, 'category')
+
+    queries = [typo(rng, rng.choice(words)) for _ in range(400)] + [make_word(rng) for _ in range(200)]
+    for query in queries:
+        found = {word for word, _ in index.search(query, 0.8)}
+        assert found == linear_scan(words, query), query
+
+def test_search_is_best_first():
+    index = trigger_index()
+    for word in ('space', 'spaces', 'spice', 'place'):
+        index.add(word, word)
+
+    results = index.search('spaces')
+    assert results[0] == ('spaces', 1.0)
+    assert [ratio for _, ratio in results] == sorted((ratio for _, ratio in results), reverse=True)
+
+def test_lookup_exact_and_removed():
+    index = trigger_index()
+    index.add('volcano', 'volcanoes')
+    assert index.lookup('volcano') == ('volcano', 1.0)
+    assert index.lookup('volcanos')[0] == 'volcano'
+
+    index.remove('volcano')
+    assert index.lookup('volcano') is None
+    assert index.search('volcanos') == []
+
+def test_similar_pairs_matches_search():
+    rng = random.Random(99)
+    index = trigger_index()
+    words = list({make_word(rng) for _ in range(300)})
+    for word in words:
+        index.add(word, 'category')
+
+    pairs = {frozenset((a, b)) for a, b, _ in index.similar_pairs(0.8)}
+    expected = set()
+    for i, word in enumerate(words):
+        for other in words[i + 1:]:
+            ratio = max(SequenceMatcher(None, word, other).ratio(), SequenceMatcher(None, other, word).ratio())
+            if ratio > 0.8:
+                expected.add(frozenset((word, other)))
+    assert pairs == expected